@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 class ChatRequest(BaseModel):
     project_id: str
@@ -7,9 +7,23 @@ class ChatRequest(BaseModel):
     mode: Optional[str] = "auto"  # "auto" | "chat" | "mcp"
     chat_room_id: str
     system_prompt: Optional[str] = None
+    async_job: Optional[bool] = None  # meeting_create 를 백그라운드 작업으로(None 이면 MEETING_JOB_MODE 설정)
 
 class ChatResponse(BaseModel):
     project_id: str
-    route: str                # "chat" | "mcp" | "clarify"
+    route: str                # "chat" | "mcp" | "http" | "clarify" | "job"
     output: Any
-    missing: Optional[List[str]] = None
\ No newline at end of file
+    missing: Optional[List[str]] = None
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    project_id: Optional[str] = None
+    status: str               # "queued" | "running" | "done" | "failed"
+    step: Optional[str] = None  # "fetch" | "summarize" | "save"
+    steps: List[str] = []
+    progress: Dict[str, int] = {}
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    result: Any = None
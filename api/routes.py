@@ -1,11 +1,82 @@
-from fastapi import APIRouter
-from capstone_ai.api.models import ChatRequest, ChatResponse
-from capstone_ai.service.chat_service import ChatService
+import json
+import logging
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from capstone_ai.api.models import ChatRequest, ChatResponse, JobStatus
+from capstone_ai.core.metrics import REGISTRY
+from capstone_ai.service.jobs import job_view
+from capstone_ai.service.lifecycle import NotReady, ServiceLifecycle
+
+log = logging.getLogger("dna.api")
 
 router = APIRouter()
 
-service = ChatService()
+# 모델 로드는 app.py 의 lifespan 에서 lifecycle.start() 로 시작(import 시점에는 torch 도 불러오지 않음)
+lifecycle = ServiceLifecycle()
+
+def _service():
+    try:
+        return lifecycle.get()
+    except NotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@router.get("/healthz")
+async def healthz():
+    """liveness: 프로세스가 살아 있으면 200(로드 중 포함). 로드 실패 시 500."""
+    report = lifecycle.report()
+    return JSONResponse(status_code=500 if report["status"] == "failed" else 200, content=report)
+
+@router.get("/readyz")
+async def readyz():
+    """readiness: 모델 로드와 워밍업이 끝나면 200, 그 전에는 503 + 단계별 진행 상황."""
+    report = lifecycle.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식. 요청/단계별 지연, LLM 토큰 수·토큰/초, 대기열 대기, HTTP 백엔드 지연(워커 프로세스별)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @router.post("/ai/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    return service.handle(req)
\ No newline at end of file
+async def chat(req: ChatRequest):
+    return await _service().ahandle(req)
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+@router.post("/ai/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """SSE: `delta`({"text"}) 이벤트를 생성되는 대로, 마지막에 `done`(ChatResponse 와 동일한 JSON)."""
+    service = _service()
+    async def events():
+        try:
+            async for kind, data in service.astream(req):
+                if kind == "delta":
+                    yield _sse("delta", {"text": data})
+                else:
+                    yield _sse("done", data)
+        except Exception:
+            log.exception("[STREAM] failed project_id=%s", req.project_id)
+            yield _sse("error", {"message": "요청 처리 중 오류가 발생했습니다."})
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/ai/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str):
+    """백그라운드 작업 상태: status(queued/running/done/failed), 현재 step(fetch/summarize/save), progress."""
+    job = _service().job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job_view(job)
+
+@router.get("/ai/jobs/{job_id}/result", response_model=JobStatus)
+async def job_result(job_id: str):
+    """끝난 작업은 200 + result, 아직 진행 중이면 202 + 현재 상태."""
+    job = _service().job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    view = job_view(job)
+    if job["status"] not in ("done", "failed"):
+        return JSONResponse(status_code=202, content=view)
+    return {**view, "result": job["result"]}
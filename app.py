@@ -1,10 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from capstone_ai.api.routes import router as chat_router
+from capstone_ai.api.routes import router as chat_router, lifecycle
 import logging
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 
-app = FastAPI(title="DNA Chatbot (Auto-route + Clarify + Multi-turn)")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 모델 로드/워밍업은 백그라운드로: 서버는 바로 연결을 받고 /readyz 가 준비 여부를 알림
+    lifecycle.start()
+    yield
+    await lifecycle.shutdown()
+
+
+app = FastAPI(title="DNA Chatbot (Auto-route + Clarify + Multi-turn)", lifespan=lifespan)
 app.include_router(chat_router, prefix="")
 
 if __name__ == "__main__":
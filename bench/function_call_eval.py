@@ -0,0 +1,107 @@
+"""
+합친 function calling 경로(ROUTER_FUNCTION_CALL) vs 기존 2단계(라우터 → 스키마 추출) 비교.
+
+    python -m capstone_ai.bench.function_call_eval [labeled.jsonl] [--fast]
+
+라벨 파일: {"text": ..., "label": "CHAT" | tool_name, "arguments": {...}(선택)} JSONL
+- 라우팅 정확도, 인자 정확도(기대 키별 일치 비율), 지연(mean/p50/p95), 요청당 LLM 호출 수를 경로별로 출력
+- 기본은 빠른 단계(규칙/분류기)를 끄고 LLM 경로끼리 비교. --fast 면 운영과 같이 빠른 단계 포함
+"""
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from capstone_ai.bench.router_eval import load_labeled
+
+DEFAULT_LABELED = os.path.join(os.path.dirname(__file__), "data", "function_call_utterances.jsonl")
+CONTEXT = {"projectId": 1, "chatRoomId": 1}
+
+
+def load_arguments(path: str) -> List[Optional[Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line).get("arguments") for line in f if line.strip()]
+
+
+def _percentile(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))] if s else 0.0
+
+
+def evaluate(run: Callable[[str], Tuple[str, Optional[Dict[str, Any]], int]],
+             rows: List[Tuple[str, str]], expected_args: List[Optional[Dict[str, Any]]]) -> Dict:
+    """run(text) -> (route, arguments, llm_calls)."""
+    latencies, calls, errors = [], 0, []
+    route_ok, arg_hits, arg_total = 0, 0, 0
+    for (text, label), exp in zip(rows, expected_args):
+        t0 = time.perf_counter()
+        route, args, n = run(text)
+        latencies.append(time.perf_counter() - t0)
+        calls += n
+        if route == label:
+            route_ok += 1
+        else:
+            errors.append({"text": text, "label": label, "pred": route})
+        if exp and route == label:
+            arg_total += len(exp)
+            arg_hits += sum(1 for k, v in exp.items() if (args or {}).get(k) == v)
+        elif exp:
+            arg_total += len(exp)
+    n = len(rows)
+    return {
+        "route_accuracy": route_ok / n if n else 0.0,
+        "argument_accuracy": arg_hits / arg_total if arg_total else None,
+        "latency_ms": {
+            "mean": 1000 * sum(latencies) / n if n else 0.0,
+            "p50": 1000 * _percentile(latencies, 0.5),
+            "p95": 1000 * _percentile(latencies, 0.95),
+        },
+        "llm_calls_per_request": calls / n if n else 0.0,
+        "errors": errors,
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    fast = "--fast" in args
+    args = [a for a in args if a != "--fast"]
+    path = args[0] if args else DEFAULT_LABELED
+    rows, expected = load_labeled(path), load_arguments(path)
+
+    from capstone_ai.core.router import AutoRouter
+    from capstone_ai.service.chat_service import ChatService
+    from capstone_ai.utils.params import apply_defaults_and_coerce
+
+    svc = ChatService()
+    router = AutoRouter(svc.llm, svc.catalog, fast_path=fast)
+
+    def coerce(route: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return apply_defaults_and_coerce(svc.catalog.find(route), params)
+
+    def two_step(text: str):
+        route = router.decide(text, context=CONTEXT)
+        n = 0 if (fast and router.fast.decide(text)) else 1
+        schema = svc.catalog.find(route)
+        if route == "CHAT" or schema is None:
+            return "CHAT", None, n
+        return route, coerce(route, svc._extract_params(schema, text, context=CONTEXT)), n + 1
+
+    def merged(text: str):
+        route, params = router.decide_call(text, context=CONTEXT)
+        n = 0 if (fast and router.fast.decide(text)) else 1
+        schema = svc.catalog.find(route)
+        if route == "CHAT" or schema is None:
+            return "CHAT", None, n
+        if params is None:
+            return route, coerce(route, svc._extract_params(schema, text, context=CONTEXT)), n + 1
+        return route, coerce(route, params), n
+
+    # 워밍업(토큰 클래스 계산, 접두 KV 등록)
+    two_step(rows[0][0]); merged(rows[0][0])
+    report = {"two_step": evaluate(two_step, rows, expected), "function_call": evaluate(merged, rows, expected)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
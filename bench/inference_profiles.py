@@ -0,0 +1,146 @@
+"""
+추론 프로파일(LLM_PROFILE) 비교: 로드 시간, 메모리, prefill 지연, decode 토큰/초, fp32 대비 출력 일치율.
+
+    python -m capstone_ai.bench.inference_profiles [--model PATH] [--profiles fp32,bf16,int8,int8+compile]
+                                                   [--threads N] [--inter-threads N] [--prompt 128] [--tokens 32] [--batch 1]
+
+- --model 이 없으면 고정 시드의 작은 랜덤 Llama 를 임시 디렉터리에 만들어 사용(네트워크/가중치 불필요, CI 재현용)
+- 프로파일마다 별도 프로세스에서 실행(스레드 설정·메모리 측정이 서로 섞이지 않도록)
+- "+compile" 을 붙이면 torch.compile 경로(예: fp32+compile). 컴파일이 길어 기본 목록에서는 제외.
+  첫 호출의 컴파일 시간은 warmup 으로 분리해 compile_s 로 보고
+- 생성은 greedy. match_fp32 는 fp32 프로파일과 같은 토큰을 낸 비율(양자화/bf16 품질 확인용)
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PROFILES = "fp32,bf16,int8"
+SEED = 0
+
+
+def make_tiny_llama(path: str, seed: int = SEED) -> str:
+    """고정 시드 랜덤 가중치의 작은 Llama(약 5M 파라미터)를 path 에 저장."""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    config = LlamaConfig(
+        vocab_size=4096, hidden_size=256, intermediate_size=688, num_hidden_layers=4,
+        num_attention_heads=8, num_key_value_heads=4, max_position_embeddings=1024,
+        bos_token_id=1, eos_token_id=2, pad_token_id=0,
+    )
+    torch.manual_seed(seed)
+    LlamaForCausalLM(config).save_pretrained(path)
+    return path
+
+
+def _greedy(model, input_ids, new_tokens: int) -> Dict[str, Any]:
+    """prefill 1회 + greedy decode. EOS 에서 멈추지 않고 new_tokens 개를 생성(측정 길이 고정)."""
+    import torch
+
+    with torch.no_grad():
+        t0 = time.perf_counter()
+        out = model(input_ids=input_ids, use_cache=True)
+        prefill_s = time.perf_counter() - t0
+        past, nxt = out.past_key_values, out.logits[:, -1, :].argmax(-1, keepdim=True)
+        generated = [nxt]
+        t0 = time.perf_counter()
+        for _ in range(new_tokens - 1):
+            out = model(input_ids=nxt, past_key_values=past, use_cache=True)
+            past, nxt = out.past_key_values, out.logits[:, -1, :].argmax(-1, keepdim=True)
+            generated.append(nxt)
+        decode_s = time.perf_counter() - t0
+    ids = torch.cat(generated, dim=1)
+    return {"prefill_s": prefill_s, "decode_s": decode_s, "ids": ids.tolist()}
+
+
+def run_profile(model_path: str, spec: str, threads: int, inter_threads: int, prompt_len: int, new_tokens: int, batch: int) -> Dict[str, Any]:
+    """한 프로파일을 현재 프로세스에서 로드·측정."""
+    import torch
+    from capstone_ai.core.inference_profile import load_model, resolve_profile
+
+    name, _, flag = spec.partition("+")
+    profile = resolve_profile(name, compile=(flag == "compile"), intra_threads=threads, inter_threads=inter_threads)
+    model, stats = load_model(model_path, profile)
+
+    g = torch.Generator().manual_seed(SEED)
+    vocab = int(model.config.vocab_size)
+    prompt = torch.randint(3, vocab, (batch, prompt_len), generator=g)
+    warm = _greedy(model, prompt[:, : max(1, prompt_len // 4)], 2)   # 커널 준비/컴파일
+    run = _greedy(model, prompt, new_tokens)
+    tokens = batch * (new_tokens - 1)
+    return {
+        **stats,
+        "spec": spec,
+        "resolved": profile.name,
+        "compile_s": warm["prefill_s"] + warm["decode_s"] if profile.compile else 0.0,
+        "prefill_ms": run["prefill_s"] * 1000,
+        "decode_tok_s": tokens / run["decode_s"] if run["decode_s"] else 0.0,
+        "ids": run["ids"],
+    }
+
+
+def _spawn(model_path: str, spec: str, threads: int, inter_threads: int, prompt_len: int, new_tokens: int, batch: int) -> Dict[str, Any]:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (root, os.environ.get("PYTHONPATH")) if p))
+    cmd = [sys.executable, "-m", "capstone_ai.bench.inference_profiles", "--worker", spec, "--model", model_path,
+           "--threads", str(threads), "--inter-threads", str(inter_threads),
+           "--prompt", str(prompt_len), "--tokens", str(new_tokens), "--batch", str(batch)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"spec": spec, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """fp32 결과 기준 일치율/속도 비율을 붙이고 토큰 목록은 뺀 요약."""
+    base = next((r for r in results if r.get("spec") == "fp32" and "ids" in r), None)
+    out = []
+    for r in results:
+        r = dict(r)
+        ids = r.pop("ids", None)
+        if base is not None and ids is not None:
+            pairs = [(a, b) for ra, rb in zip(ids, base["ids"]) for a, b in zip(ra, rb)]
+            r["match_fp32"] = sum(a == b for a, b in pairs) / len(pairs) if pairs else 0.0
+            r["speedup_vs_fp32"] = r["decode_tok_s"] / base["decode_tok_s"] if base["decode_tok_s"] else 0.0
+        out.append(r)
+    return out
+
+
+def _opt(args: List[str], name: str, default: Optional[str]) -> Optional[str]:
+    return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    threads = int(_opt(args, "--threads", "0"))
+    inter_threads = int(_opt(args, "--inter-threads", "0"))
+    prompt_len = int(_opt(args, "--prompt", "128"))
+    new_tokens = max(2, int(_opt(args, "--tokens", "32")))
+    batch = int(_opt(args, "--batch", "1"))
+    model_path = _opt(args, "--model", None)
+
+    worker = _opt(args, "--worker", None)
+    if worker is not None:
+        print(json.dumps(run_profile(model_path, worker, threads, inter_threads, prompt_len, new_tokens, batch)))
+        return
+
+    specs = [s.strip() for s in _opt(args, "--profiles", DEFAULT_PROFILES).split(",") if s.strip()]
+    if "fp32" not in specs:
+        specs.insert(0, "fp32")
+    with tempfile.TemporaryDirectory() as tmp:
+        if model_path is None:
+            model_path = make_tiny_llama(os.path.join(tmp, "tiny-llama"))
+        results = [_spawn(model_path, s, threads, inter_threads, prompt_len, new_tokens, batch) for s in specs]
+    print(json.dumps({
+        "model": _opt(args, "--model", "tiny-random-llama"),
+        "prompt_tokens": prompt_len, "new_tokens": new_tokens, "batch": batch,
+        "profiles": compare(results),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
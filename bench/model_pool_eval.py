@@ -0,0 +1,111 @@
+"""
+모델 풀(MODEL_POOL) 후보 비교: 모델별로 용도(route/extract/nlg)의 정확도와 지연을 측정.
+
+    python -m capstone_ai.bench.model_pool_eval [--models ID1,ID2] [--labeled labeled.jsonl] [--limit N]
+
+- --models 가 없으면 MODEL_ID 와 MODEL_POOL 에 지정된 모델 전부
+- route: LLM 라우터(빠른 단계 끔) 정확도 / extract: 정답 도구 스키마로 추출한 인자의 키별 일치 비율 /
+  nlg: 도구 결과 문장화 지연(정답이 없어 정확도는 없음)
+- 라벨 파일 형식은 function_call_eval 과 같음({"text", "label", "arguments"(선택)})
+- 모델마다 별도 프로세스에서 실행(배처 스레드가 모델을 잡고 있어 한 프로세스에서는 메모리가 해제되지 않음)
+- 작은 모델을 route/extract/nlg 에 배정해도 되는지(정확도 손실 대비 지연 이득) 판단용
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from capstone_ai.bench.function_call_eval import CONTEXT, DEFAULT_LABELED, _percentile, load_arguments
+from capstone_ai.bench.router_eval import load_labeled
+from capstone_ai.bench.inference_profiles import _opt
+from capstone_ai.config import MODEL_ID, MODEL_POOL, MODEL_POOL_PROFILES
+
+
+def _latency(xs: List[float]) -> Dict[str, float]:
+    return {
+        "mean": 1000 * sum(xs) / len(xs) if xs else 0.0,
+        "p50": 1000 * _percentile(xs, 0.5),
+        "p95": 1000 * _percentile(xs, 0.95),
+    }
+
+
+def _timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def evaluate_model(model_id: str, rows: List[Tuple[str, str]], expected: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """모델 하나를 모든 용도에 배정한 서비스로 route/extract/nlg 를 측정."""
+    from capstone_ai.core.model_pool import ModelPool
+    from capstone_ai.core.router import AutoRouter
+    from capstone_ai.service.chat_service import ChatService
+    from capstone_ai.utils.params import apply_defaults_and_coerce
+
+    svc = ChatService(pool=ModelPool(default_model=model_id, profiles=MODEL_POOL_PROFILES))
+    router = AutoRouter(svc.pool.get("route"), svc.catalog, fast_path=False)
+    router.decide(rows[0][0], context=CONTEXT)   # 워밍업(접두 KV, 토큰 클래스)
+
+    route_lat, route_ok = [], 0
+    for text, label in rows:
+        pred, dt = _timed(lambda: router.decide(text, context=CONTEXT))
+        route_lat.append(dt)
+        route_ok += pred == label
+
+    extract_lat, nlg_lat, hits, total = [], [], 0, 0
+    for (text, label), exp in zip(rows, expected):
+        schema = svc.catalog.find(label)
+        if schema is None or not exp:
+            continue
+        params, dt = _timed(lambda: svc._extract_params(schema, text, context=CONTEXT))
+        extract_lat.append(dt)
+        params = apply_defaults_and_coerce(schema, params)
+        total += len(exp)
+        hits += sum(1 for k, v in exp.items() if params.get(k) == v)
+        history = [{"role": "user", "content": text}]
+        _, dt = _timed(lambda: svc.synth.compose(history, label, params, {"ok": True, "http_status": 200}))
+        nlg_lat.append(dt)
+
+    report = {
+        "route": {"n": len(rows), "accuracy": route_ok / len(rows) if rows else 0.0, "latency_ms": _latency(route_lat)},
+        "extract": {"n": len(extract_lat), "accuracy": hits / total if total else None, "latency_ms": _latency(extract_lat)},
+        "nlg": {"n": len(nlg_lat), "accuracy": None, "latency_ms": _latency(nlg_lat)},
+        "load": svc.llm.load_stats,
+    }
+    return report
+
+
+def _spawn(model_id: str, path: str, limit: int) -> Dict[str, Any]:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (root, os.environ.get("PYTHONPATH")) if p))
+    cmd = [sys.executable, "-m", "capstone_ai.bench.model_pool_eval", "--worker", model_id,
+           "--labeled", path, "--limit", str(limit)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    path = _opt(args, "--labeled", DEFAULT_LABELED)
+    limit = int(_opt(args, "--limit", "0"))
+    models = _opt(args, "--models", None)
+    model_ids = [m.strip() for m in models.split(",") if m.strip()] if models else list(dict.fromkeys([MODEL_ID, *MODEL_POOL.values()]))
+
+    worker = _opt(args, "--worker", None)
+    if worker is not None:
+        rows, expected = load_labeled(path), load_arguments(path)
+        if limit > 0:
+            rows, expected = rows[:limit], expected[:limit]
+        print(json.dumps(evaluate_model(worker, rows, expected), ensure_ascii=False, default=str))
+        return
+
+    results = {model_id: _spawn(model_id, path, limit) for model_id in model_ids}
+    print(json.dumps({"labeled": path, "models": results}, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+라우터 오프라인 정확도 점검(라벨 파일: {"text": ..., "label": "CHAT" | tool_name} JSONL).
+
+    python -m capstone_ai.bench.router_eval [labeled.jsonl] [--llm]
+
+- 기본: 규칙/분류기 단계만 평가(모델 불필요). 결정 못 한 발화는 'deferred' 로 집계
+- 규칙/분류기를 만든 예시(CHAT_EXAMPLES, 도구 description/examples)와 같은 발화는 평가에서 제외(held-out 만 집계)
+- --llm: 미결정 발화를 실제 LLM 라우터로 판정해 전체 정확도까지 계산
+"""
+import json
+import os
+import sys
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from capstone_ai.config import ROUTER_CLASSIFIER_MIN_SCORE, ROUTER_CLASSIFIER_MIN_MARGIN
+from capstone_ai.core.fast_router import CHAT_EXAMPLES, FastRouter
+from capstone_ai.mcp.tools import TOOLS
+
+DEFAULT_LABELED = os.path.join(os.path.dirname(__file__), "data", "router_utterances.jsonl")
+
+
+def load_labeled(path: str) -> List[Tuple[str, str]]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                d = json.loads(line)
+                rows.append((d["text"], d["label"]))
+    return rows
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+def held_out(rows: List[Tuple[str, str]], tools: List[Dict] = TOOLS) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """학습(센트로이드/규칙) 예시와 겹치는 발화를 뺀 행과 뺀 발화 목록."""
+    seen = {_norm(t) for t in CHAT_EXAMPLES}
+    for t in tools:
+        seen.update(_norm(x) for x in [t.get("description", "")] + list(t.get("examples", [])))
+    keep = [(text, label) for text, label in rows if _norm(text) not in seen]
+    return keep, [text for text, _ in rows if _norm(text) in seen]
+
+
+def evaluate(fast: FastRouter, rows: List[Tuple[str, str]],
+             llm_decide: Optional[Callable[[str], str]] = None) -> Dict:
+    per_tier: Dict[str, Counter] = {}
+    errors = []
+    correct = 0
+    for text, label in rows:
+        hit = fast.decide(text)
+        if hit is not None:
+            tier, pred = hit.tier, hit.label
+        elif llm_decide is not None:
+            tier, pred = "llm", llm_decide(text)
+        else:
+            tier, pred = "deferred", None
+        c = per_tier.setdefault(tier, Counter())
+        c["n"] += 1
+        if pred == label:
+            c["correct"] += 1
+            correct += 1
+        elif pred is not None:
+            errors.append({"text": text, "label": label, "pred": pred, "tier": tier})
+    return {
+        "n": len(rows),
+        "accuracy": correct / len(rows) if rows else 0.0,
+        "tiers": {
+            t: {"hit_rate": c["n"] / len(rows), "accuracy": (c["correct"] / c["n"]) if t != "deferred" else None}
+            for t, c in per_tier.items()
+        },
+        "errors": errors,
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    use_llm = "--llm" in args
+    args = [a for a in args if a != "--llm"]
+    rows, excluded = held_out(load_labeled(args[0] if args else DEFAULT_LABELED))
+    fast = FastRouter.from_catalog(TOOLS, ROUTER_CLASSIFIER_MIN_SCORE, ROUTER_CLASSIFIER_MIN_MARGIN)
+
+    llm_decide = None
+    if use_llm:
+        from capstone_ai.core.llm import LLMClient
+        from capstone_ai.core.router import AutoRouter
+        from capstone_ai.mcp.catalog import ToolCatalog
+        router = AutoRouter(LLMClient(), ToolCatalog(TOOLS), fast_path=False)
+        llm_decide = router.decide
+
+    print(json.dumps({**evaluate(fast, rows, llm_decide), "excluded_train_overlap": excluded}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
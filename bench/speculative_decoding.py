@@ -0,0 +1,91 @@
+"""
+추측 디코딩(SPEC_DECODING) 비교: 일반 decode vs ngram(프롬프트 조회) vs draft(초안 모델).
+
+    python -m capstone_ai.bench.speculative_decoding --model PATH [--draft PATH] [--modes off,ngram,draft]
+                                                     [--tokens 128] [--k 6] [--transcript FILE]
+
+- 회의록 요약과 같은 형태(긴 대화 원문 → 요약) 프롬프트를 greedy 로 생성해 decode 토큰/초, 수락률, 라운드당 토큰 수,
+  일반 decode 와의 출력 일치 여부(identical)를 출력
+- --model: 토크나이저/채팅 템플릿이 있는 모델(기본 MODEL_ID). --draft 가 없으면 SPEC_DRAFT_MODEL,
+  그것도 없으면 대상 모델 자신을 초안 모델로 씀(수락률 상한 확인용)
+- --transcript 가 없으면 반복이 많은 합성 대화를 사용
+"""
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+from capstone_ai.bench.inference_profiles import _opt
+from capstone_ai.config import MODEL_ID, SPEC_DRAFT_MODEL
+
+SPEAKERS = ["김민수", "이서연", "박지훈"]
+TOPICS = ["로그인 API 응답 지연", "배포 일정", "결제 모듈 테스트", "디자인 시안 검토"]
+
+
+def synthetic_transcript(lines: int = 60) -> str:
+    out = []
+    for i in range(lines):
+        topic = TOPICS[(i // 5) % len(TOPICS)]
+        out.append(f"[2025-08-20T10:{i % 60:02d}:00] {SPEAKERS[i % 3]}: {topic} 관련해서 이번 주 안에 정리하고 공유하겠습니다.")
+    return "\n".join(out)
+
+
+def run(client: Any, messages: List[Dict[str, str]], mode: str, new_tokens: int) -> Dict[str, Any]:
+    before = client.spec_stats.as_dict().get(mode, {})
+    t0 = time.perf_counter()
+    text = client.complete(messages, max_new_tokens=new_tokens, do_sample=False,
+                           speculate=None if mode == "off" else mode)
+    elapsed = time.perf_counter() - t0
+    after = client.spec_stats.as_dict().get(mode, {})
+    drafted = after.get("drafted", 0) - before.get("drafted", 0)
+    accepted = after.get("accepted", 0) - before.get("accepted", 0)
+    rounds = after.get("rounds", 0) - before.get("rounds", 0)
+    tokens = len(client.tokenizer(text, add_special_tokens=False)["input_ids"])
+    return {
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "acceptance_rate": accepted / drafted if drafted else None,
+        "tokens_per_round": (after.get("tokens", 0) - before.get("tokens", 0)) / rounds if rounds else None,
+        "text": text,
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    new_tokens = int(_opt(args, "--tokens", "128"))
+    modes = [m.strip() for m in _opt(args, "--modes", "off,ngram,draft").split(",") if m.strip()]
+    transcript_path = _opt(args, "--transcript", None)
+
+    model_path = _opt(args, "--model", MODEL_ID)
+
+    from capstone_ai.core.llm import LLMClient
+    client = LLMClient(model_path)
+    client.batcher = None   # 단건 비교(배처 없이)
+    client.spec_draft_model = _opt(args, "--draft", None) or SPEC_DRAFT_MODEL or model_path
+    client.spec_num_tokens = int(_opt(args, "--k", str(client.spec_num_tokens)))
+
+    if transcript_path:
+        with open(transcript_path, encoding="utf-8") as f:
+            transcript = f.read()
+    else:
+        transcript = synthetic_transcript()
+    messages = [
+        {"role": "system", "content": "다음 회의 대화를 요약해 회의록을 작성하세요."},
+        {"role": "user", "content": transcript},
+    ]
+    run(client, messages, "off", 4)   # 워밍업
+    results = [run(client, messages, m, new_tokens) for m in modes]
+
+    texts = [r.pop("text") for r in results]
+    base = next((i for i, r in enumerate(results) if r["mode"] == "off"), None)
+    if base is not None:
+        for r, text in zip(results, texts):
+            r["identical"] = text == texts[base]
+            r["speedup"] = r["tokens_per_s"] / results[base]["tokens_per_s"] if results[base]["tokens_per_s"] else 0.0
+    print(json.dumps({"model": model_path, "draft": client.spec_draft_model, "new_tokens": new_tokens,
+                      "k": client.spec_num_tokens, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
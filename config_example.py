@@ -16,4 +16,113 @@ DEFAULT_HTTP_HEADERS = {MCP_AUTH_HEADER: MCP_AUTH_TOKEN} if MCP_AUTH_TOKEN else
 ROLE_CHANGE_URL = "api_url"
 TODO_CREATE_URL = "api_url"
 MEETING_CHAT_URL = "api_url"
-MEETING_SAVE_URL = "api_url"
\ No newline at end of file
+MEETING_SAVE_URL = "api_url"
+
+# 백엔드 HTTP 호출(공유 연결 풀): 호스트당 최대 연결 수, 타임아웃(연결/응답 분리), 멱등 호출 재시도
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "3"))
+HTTP_READ_TIMEOUT_S = float(os.getenv("HTTP_READ_TIMEOUT_S", "30"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF_S = float(os.getenv("HTTP_RETRY_BACKOFF_S", "0.2"))
+
+# 동적 배칭(동시 complete() 호출을 한 번의 배치 디코딩으로 처리)
+LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "1") == "1"
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))
+# 추론 프로파일: default(기존: device_map=auto) | fp32 | bf16(지원 시, 아니면 fp32) | int8(Linear 동적 양자화, CPU)
+LLM_PROFILE = os.getenv("LLM_PROFILE", "default")
+LLM_COMPILE = os.getenv("LLM_COMPILE", "0") == "1"                    # torch.compile(실패 시 eager)
+LLM_INTRA_OP_THREADS = int(os.getenv("LLM_INTRA_OP_THREADS", "0"))    # 0 = torch 기본값
+LLM_INTER_OP_THREADS = int(os.getenv("LLM_INTER_OP_THREADS", "0"))
+# 용도별 모델 풀(core/model_pool.py): "용도=모델ID" 목록. 용도는 route/extract/nlg/chat/summarize, 없는 용도는 MODEL_ID
+# 예: MODEL_POOL="route=Qwen/Qwen2.5-0.5B-Instruct,extract=Qwen/Qwen2.5-1.5B-Instruct,nlg=Qwen/Qwen2.5-0.5B-Instruct"
+def _pairs(value: str) -> dict:
+    return {k.strip(): v.strip() for k, v in (p.split("=", 1) for p in value.split(",") if "=" in p) if k.strip() and v.strip()}
+MODEL_POOL = _pairs(os.getenv("MODEL_POOL", ""))
+MODEL_POOL_PROFILES = _pairs(os.getenv("MODEL_POOL_PROFILES", ""))                  # "모델ID=int8" (없으면 LLM_PROFILE)
+MODEL_POOL_MAX_INFLIGHT = {k: int(v) for k, v in _pairs(os.getenv("MODEL_POOL_MAX_INFLIGHT", "")).items()}  # "모델ID=N" 동시 호출 상한
+# 추측 디코딩(긴 생성의 decode 지연 단축): "용도=모드" 목록. ngram(프롬프트 조회, 모델 불필요) | draft(SPEC_DRAFT_MODEL)
+# 예: SPEC_DECODING="summarize=ngram,chat=draft". 단건 complete() 에만 적용(배처 밖에서 실행), 없는 용도는 끔
+SPEC_DECODING = _pairs(os.getenv("SPEC_DECODING", ""))
+SPEC_DRAFT_MODEL = os.getenv("SPEC_DRAFT_MODEL", "")              # 대상 모델과 같은 어휘의 작은 모델
+SPEC_NUM_TOKENS = int(os.getenv("SPEC_NUM_TOKENS", "6"))           # 라운드당 초안 토큰 수
+SPEC_NGRAM_MAX = int(os.getenv("SPEC_NGRAM_MAX", "3"))             # 프롬프트 조회 최대 n-gram
+# 시작/워밍업: 모델은 FastAPI lifespan 에서 백그라운드로 로드(/healthz, /readyz 로 진행 상황). 준비 완료 전에 실행할 경로
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_PATHS = [p.strip() for p in os.getenv("WARMUP_PATHS", "router,schema,chat").split(",") if p.strip()]
+WARMUP_MAX_NEW_TOKENS = int(os.getenv("WARMUP_MAX_NEW_TOKENS", "8"))
+# 단계별 지연 추적 + /metrics(Prometheus 텍스트 형식, 워커 프로세스별 집계). 요청이 TRACE_SLOW_MS 를 넘으면 단계별 소요를 경고 로그로(0=끔)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "10000"))
+# 배치 안에서 백그라운드 작업(회의록 job) 행이 차지할 수 있는 최대 자리 수(0 이면 MAX_SIZE 의 절반)
+LLM_BATCH_BACKGROUND_SLOTS = int(os.getenv("LLM_BATCH_BACKGROUND_SLOTS", "0"))
+
+# 정적 프롬프트 접두(KV) 캐시: 시스템 프롬프트/라우터 카탈로그/스키마 지침 prefill 재사용
+PREFIX_CACHE_ENABLED = os.getenv("PREFIX_CACHE_ENABLED", "1") == "1"
+PREFIX_CACHE_MIN_TOKENS = int(os.getenv("PREFIX_CACHE_MIN_TOKENS", "16"))
+
+# 세션별 멀티턴 KV 캐시(새 턴은 추가된 메시지만 prefill). 메모리 예산 초과 시 LRU 제거
+SESSION_KV_ENABLED = os.getenv("SESSION_KV_ENABLED", "0") == "1"
+SESSION_KV_BUDGET_MB = float(os.getenv("SESSION_KV_BUDGET_MB", "2048"))
+
+# 비동기 요청 경로: 모델 호출 전용 스레드 풀 크기 / 도구 호출 동시 실행 수(비동기 실행기) / 도구 호출별 마감(초)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "16"))
+TOOL_IO_WORKERS = int(os.getenv("TOOL_IO_WORKERS", "32"))
+TOOL_CALL_DEADLINE_S = float(os.getenv("TOOL_CALL_DEADLINE_S", "60"))
+
+# 라우터 1단계(규칙/경량 분류기). 확신할 때만 결정하고 나머지는 LLM 라우터로
+ROUTER_FAST_PATH = os.getenv("ROUTER_FAST_PATH", "1") == "1"
+ROUTER_CLASSIFIER_MIN_SCORE = float(os.getenv("ROUTER_CLASSIFIER_MIN_SCORE", "0.2"))
+ROUTER_CLASSIFIER_MIN_MARGIN = float(os.getenv("ROUTER_CLASSIFIER_MIN_MARGIN", "0.1"))
+
+# LLM 라우터 방식: "generate"(기본, 자유 생성 후 정규화) | "score"(라벨 집합으로 제한한 확률 판정, 선택)
+# score 에서 확신도가 ROUTER_MIN_CONFIDENCE 미만이면 generate 방식으로 다시 판정
+ROUTER_MODE = os.getenv("ROUTER_MODE", "generate")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.5"))
+# 라우팅 + 파라미터 추출을 한 번의 생성으로(function calling). 비교: python -m capstone_ai.bench.function_call_eval
+ROUTER_FUNCTION_CALL = os.getenv("ROUTER_FUNCTION_CALL", "0") == "1"
+
+# 도구 파라미터 추출 시 parameters 스키마로 제약한 JSON 디코딩(0 이면 자유 생성 후 파싱)
+CONSTRAINED_JSON_ENABLED = os.getenv("CONSTRAINED_JSON_ENABLED", "1") == "1"
+
+# 대화 히스토리 상한: 세션별 토큰 예산(system/[CONTEXT] 제외 오래된 턴부터 제거), 세션 수(LRU), 유휴 TTL(초, 0=끔)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3072"))
+HISTORY_MAX_SESSIONS = int(os.getenv("HISTORY_MAX_SESSIONS", "1000"))
+HISTORY_SESSION_TTL_S = float(os.getenv("HISTORY_SESSION_TTL_S", str(3 * 24 * 3600)))
+HISTORY_TOOL_MAX_ITEMS = int(os.getenv("HISTORY_TOOL_MAX_ITEMS", "50"))
+# 오래된 턴 백그라운드 압축([SUMMARY]): 고정 메시지 뒤 대화가 TRIGGER 토큰을 넘으면 최근 KEEP 개를 제외하고 요약
+HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "1") == "1"
+HISTORY_COMPACT_TRIGGER_TOKENS = int(os.getenv("HISTORY_COMPACT_TRIGGER_TOKENS", "1536"))
+HISTORY_COMPACT_KEEP_MESSAGES = int(os.getenv("HISTORY_COMPACT_KEEP_MESSAGES", "6"))
+HISTORY_COMPACT_BATCH = int(os.getenv("HISTORY_COMPACT_BATCH", "8"))
+# 세션 상태(히스토리/clarify) 저장소: memory(단일 워커) | sqlite(여러 워커가 SESSION_STORE_PATH 공유, WAL)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.db")
+# sqlite: 이 시간(초) 동안 쓰이지 않은 세션 행 삭제(0=끔) / 워커 간 같은 project 턴 직렬화 임대 유지 시간(초, 처리 중에는 자동 연장)
+SESSION_STORE_TTL_S = float(os.getenv("SESSION_STORE_TTL_S", str(HISTORY_SESSION_TTL_S)))
+SESSION_LEASE_S = float(os.getenv("SESSION_LEASE_S", "30"))
+
+# MCP 세션: JSON-RPC 배치 한 번에 보낼 최대 호출 수 / 서버 도구 목록(tools/list) 캐시 유지 시간(초)
+MCP_BATCH_MAX = int(os.getenv("MCP_BATCH_MAX", "32"))
+MCP_TOOLS_CACHE_TTL_S = float(os.getenv("MCP_TOOLS_CACHE_TTL_S", "300"))
+
+# 회의록 요약(map-reduce): 한 번에 요약할 대화 구간 토큰 예산 / 구간별 부분 요약 최대 생성 토큰
+MEETING_CHUNK_TOKENS = int(os.getenv("MEETING_CHUNK_TOKENS", "3000"))
+MEETING_CHUNK_SUMMARY_TOKENS = int(os.getenv("MEETING_CHUNK_SUMMARY_TOKENS", "300"))
+# 회의록 요약 전 대화 정리(시스템 메시지/이모지/반복/긴 URL/시각·발언자 표기 압축, 규칙별 절약 토큰 보고)
+MEETING_PREPROCESS_ENABLED = os.getenv("MEETING_PREPROCESS_ENABLED", "1") == "1"
+# 회의록 요약 캐시: 채팅방·시간 버킷(분) 단위 구간 요약 재사용(겹치는/반복 요청), 최대 항목 수, 유지 시간(초, 0 이면 무제한)
+MEETING_SUMMARY_CACHE_ENABLED = os.getenv("MEETING_SUMMARY_CACHE_ENABLED", "1") == "1"
+MEETING_SEGMENT_MINUTES = int(os.getenv("MEETING_SEGMENT_MINUTES", "30"))
+MEETING_SUMMARY_CACHE_SIZE = int(os.getenv("MEETING_SUMMARY_CACHE_SIZE", "2048"))
+MEETING_SUMMARY_CACHE_TTL_S = float(os.getenv("MEETING_SUMMARY_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+# 회의록 백그라운드 작업: 1 이면 meeting_create 가 작업 id 를 바로 반환하고 워커 풀이 처리(요청별 async_job 으로 덮어쓰기 가능)
+MEETING_JOB_MODE = os.getenv("MEETING_JOB_MODE", "0") == "1"
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))         # 하트비트가 이 시간 끊기면 다른 워커가 회수
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "1.0"))
+JOB_RETENTION_S = float(os.getenv("JOB_RETENTION_S", str(7 * 24 * 3600)))  # 끝난 작업 보관 기간
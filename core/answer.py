@@ -1,25 +1,27 @@
 # capstone_ai/core/answer.py
 from typing import Dict, Any, List, Optional
-from capstone_ai.core.llm import LLMClient
+from capstone_ai.core.stopping import SentenceEnd
 import re
 
+_KV_ID_PATTERN = re.compile(r'("?(?:projectId|chatRoomId|userId|token)"?\s*:\s*)\d+')
+_ID_PATTERNS = [re.compile(p) for p in [
+    r"프로젝트\s*ID\s*[:：]?\s*\d+",
+    r"프로젝트\s*[#:]?\s*\d+(?=\D)",
+    r"projectId\s*[:=]\s*\d+",
+    r"chatRoomId\s*[:=]\s*\d+",
+    r"userId\s*[:=]\s*\d+",
+    r"(?i)authorization\s*[:=]\s*\S+",
+    r"(?i)bearer\s+[A-Za-z0-9\-\._]+",
+]]
+
 class AnswerSynthesizer:
     def __init__(self, llm):
         self.llm = llm
 
     def _sanitize(self, text: str) -> str:
-        text = re.sub(r'("?(?:projectId|chatRoomId|userId|token)"?\s*:\s*)\d+',
-                      r'\1"***"', text)
-        for pat in [
-            r"프로젝트\s*ID\s*[:：]?\s*\d+",
-            r"프로젝트\s*[#:]?\s*\d+(?=\D)",
-            r"projectId\s*[:=]\s*\d+",
-            r"chatRoomId\s*[:=]\s*\d+",
-            r"userId\s*[:=]\s*\d+",
-            r"(?i)authorization\s*[:=]\s*\S+",
-            r"(?i)bearer\s+[A-Za-z0-9\-\._]+",
-        ]:
-            text = re.sub(pat, lambda m: re.sub(r"\d+|[A-Za-z0-9\-\._]+", "***", m.group(0)), text)
+        text = _KV_ID_PATTERN.sub(r'\1"***"', text)
+        for pat in _ID_PATTERNS:
+            text = pat.sub(lambda m: re.sub(r"\d+|[A-Za-z0-9\-\._]+", "***", m.group(0)), text)
         return text
 
     def _fmt_ko_date(self, s: Optional[str]) -> Optional[str]:
@@ -79,7 +81,43 @@ class AnswerSynthesizer:
             {"role":"system","content":f"입력:{safe_params} 결과:{outline}"},
             {"role":"user","content":"사용자에게 한 문장으로 결과만 정중히 알려 주세요."}
         ]
-        out = self.llm.complete(messages, max_new_tokens=60, temperature=0.4).strip()
+        out = self.llm.complete(messages, max_new_tokens=60, temperature=0.4, stop=[SentenceEnd()]).strip()
         if not out or len(out) < 3:
             out = "요청하신 작업을 처리했습니다."
-        return self._sanitize(out)
\ No newline at end of file
+        return self._sanitize(out)
+
+
+class StreamSanitizer:
+    """
+    스트리밍 출력용 마스킹. 청크 경계에서 ID 가 나뉘어도 가려지도록
+    - 꼬리 HOLD 글자는 보류하고
+    - 보류 경계에 걸치거나 경계에서 끝나는(뒤에 이어질 수 있는) 매치는 통째로 다음 청크로 넘김
+    """
+    HOLD = 48
+
+    def __init__(self, synth: AnswerSynthesizer):
+        self.synth = synth
+        self._buf = ""
+
+    def _safe_cut(self) -> int:
+        cut = len(self._buf) - self.HOLD
+        moved = True
+        while cut > 0 and moved:
+            moved = False
+            for pat in [_KV_ID_PATTERN, *_ID_PATTERNS]:
+                for m in pat.finditer(self._buf):
+                    if m.start() < cut <= m.end():
+                        cut, moved = m.start(), True
+        return max(cut, 0)
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        cut = self._safe_cut()
+        if cut <= 0:
+            return ""
+        out, self._buf = self._buf[:cut], self._buf[cut:]
+        return self.synth._sanitize(out)
+
+    def flush(self) -> str:
+        out, self._buf = self._buf, ""
+        return self.synth._sanitize(out) if out else ""
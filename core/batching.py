@@ -0,0 +1,217 @@
+import itertools
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+log = logging.getLogger("dna.batch")
+
+
+@dataclass
+class GenRequest:
+    """complete() 한 건. 배치 안에서도 호출별 샘플링 파라미터를 그대로 유지합니다."""
+    input_ids: List[int]
+    max_new_tokens: int
+    temperature: float = 0.7
+    do_sample: bool = True
+    session: Optional[str] = None
+    on_token: Optional[Callable[[str], None]] = None  # 스트리밍: 새 텍스트 조각 콜백(배처 스레드에서 호출)
+    decoder: Any = None
+    stop: Any = None        # 중단 조건(StopChecker). 새 텍스트 조각마다 feed
+    constraint: Any = None  # 제약 디코딩(mask()/advance()/done). 예: JsonObjectConstraint
+    priority: int = 0       # 0=대화(우선), 1 이상=백그라운드 작업. 같은 우선순위는 도착 순
+    output_ids: List[int] = field(default_factory=list)
+    future: Optional[Future] = None
+    error: Optional[BaseException] = None  # 이 행만 실패(엔진이 배치에서 빼고 끝난 행으로 반환)
+    # 단계별 지표(perf_counter): 생성 → prefill 시작(배처 대기) → 첫 토큰 → 끝
+    created_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class GenerationCancelled(Exception):
+    """on_token 이 던지면 그 행은 다음 토큰에서 끝남(스트림 소비자가 사라져 더 생성할 필요가 없을 때)."""
+
+
+class BatchStepError(Exception):
+    """
+    engine.step 이 행에 토큰을 추가한 뒤 forward 에서 실패. state 는 그 토큰을 아직 넣지 않은 재시도용 상태,
+    finished 는 이번 스텝에서 이미 끝난 행.
+    """
+
+    def __init__(self, state: Any, finished: List["GenRequest"], cause: BaseException):
+        super().__init__(f"decode step failed: {cause!r}")
+        self.state = state
+        self.finished = finished
+        self.cause = cause
+
+
+class BatchScheduler:
+    """
+    동시 complete() 호출을 모아 하나의 배치로 디코딩하는 스케줄러(iteration 단위 연속 배칭).
+    - 실행 중인 배치가 없으면 첫 요청 도착 후 window_ms 동안 대기열을 모아 함께 prefill
+    - 실행 중이면 매 디코딩 스텝 사이에 새 요청을 prefill 하여 배치에 합류
+    - 끝난 행은 즉시 결과를 돌려주고 배치에서 빠짐(짧은 라우터 호출이 긴 대화 생성을 기다리지 않음)
+    - 대기열은 priority 순. 백그라운드 행(priority>0)은 background_slots 개까지만 배치에 들어가
+      나머지 자리는 항상 대화 요청 몫으로 남음
+
+    - 실패 격리: 여러 행의 prefill/스텝이 실패하면 행마다 다시 실행해 실패한 행만 예외로 끝내고 나머지는 계속
+
+    engine 은 prefill(reqs) / merge(a, b) / step(state) / split(state) / size(state) / requests(state) 를
+    제공해야 합니다(LLMClient).
+    """
+
+    def __init__(self, engine: Any, max_batch_size: int = 8, window_ms: float = 10.0, background_slots: Optional[int] = None):
+        self.engine = engine
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        if background_slots is None:
+            background_slots = self.max_batch_size // 2
+        self.background_slots = max(1, min(int(background_slots), self.max_batch_size))
+        self._queue: "queue.PriorityQueue[Tuple[int, int, GenRequest]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._held: List[GenRequest] = []  # 백그라운드 자리가 없어 보류된 요청(배처 스레드 전용)
+        self.stats = {"requests": 0, "prefills": 0, "steps": 0, "max_batch": 0, "background": 0, "failed_rows": 0}
+        self._thread = threading.Thread(target=self._loop, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, req: GenRequest) -> Future:
+        req.future = Future()
+        self._queue.put((int(req.priority), next(self._seq), req))
+        return req.future
+
+    def _get(self, timeout: Optional[float]) -> GenRequest:
+        if timeout is None:
+            return self._queue.get()[2]
+        if timeout <= 0:
+            return self._queue.get_nowait()[2]
+        return self._queue.get(timeout=timeout)[2]
+
+    def _collect(self, block: bool, capacity: int, background: int = 0) -> List[GenRequest]:
+        """
+        최대 capacity 개를 우선순위 순으로 꺼냄. background: 이미 배치에서 실행 중인 백그라운드 행 수.
+        백그라운드 자리가 찬 상태에서 꺼낸 백그라운드 요청은 보류했다가 다음 수집 때 다시 넣음.
+        """
+        for r in self._held:
+            self._queue.put((int(r.priority), next(self._seq), r))
+        self._held = []
+        batch: List[GenRequest] = []
+        if capacity <= 0:
+            return batch
+        # 긴 백그라운드 prefill 이 한 번에 몰려 대화 행의 디코딩을 오래 멈추지 않도록 수집마다 하나씩만 합류
+        bg_free = min(1, self.background_slots - background)
+        deadline = None
+        while len(batch) < capacity:
+            if block and not batch:
+                timeout = None
+                deadline = time.monotonic() + self.window
+            elif deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            else:
+                timeout = 0
+            try:
+                r = self._get(timeout)
+            except queue.Empty:
+                break
+            if r.priority > 0:
+                if bg_free <= 0:
+                    self._held.append(r)
+                    break  # 우선순위 순이라 뒤에는 백그라운드뿐
+                bg_free -= 1
+            batch.append(r)
+        return batch
+
+    def _fail(self, reqs: List[GenRequest], exc: BaseException) -> None:
+        for r in reqs:
+            if r.future is not None and not r.future.done():
+                self.stats["failed_rows"] += 1
+                r.future.set_exception(exc)
+
+    def _resolve(self, finished: List[GenRequest]) -> None:
+        for r in finished:
+            if r.error is not None:
+                self._fail([r], r.error)
+            elif r.future is not None and not r.future.done():
+                r.future.set_result(r.output_ids)
+
+    def _join(self, state: Any, fresh: Any) -> Any:
+        return fresh if state is None else self.engine.merge(state, fresh)
+
+    def _prefill(self, state: Any, new: List[GenRequest]) -> Any:
+        """새 요청 prefill 후 합류. 여러 건이 함께 실패하면 한 건씩 다시 시도해 실패한 요청만 예외로."""
+        try:
+            state = self._join(state, self.engine.prefill(new))
+            self.stats["prefills"] += 1
+            return state
+        except Exception as e:
+            log.exception("[BATCH] prefill failed (%d rows)", len(new))
+            if len(new) == 1:
+                self._fail(new, e)
+                return state
+        for r in new:
+            try:
+                state = self._join(state, self.engine.prefill([r]))
+                self.stats["prefills"] += 1
+            except Exception as e:
+                log.exception("[BATCH] prefill failed for one row")
+                self._fail([r], e)
+        return state
+
+    def _step(self, state: Any) -> Any:
+        """디코딩 한 스텝. 실패하면 행마다 다시 실행해 실패한 행만 예외로 끝내고 나머지로 배치를 다시 구성."""
+        try:
+            state, finished = self.engine.step(state)
+            self.stats["steps"] += 1
+            self._resolve(finished)
+            return state
+        except BatchStepError as e:
+            log.exception("[BATCH] decode step failed")
+            self._resolve(e.finished)
+            state, cause = e.state, e.cause
+        except Exception as e:
+            log.exception("[BATCH] decode step failed")
+            cause = e
+        if self.engine.size(state) == 1:
+            self._fail(self.engine.requests(state), cause)
+            return None
+        survivors = None
+        for row in self.engine.split(state):
+            try:
+                row, finished = self.engine.step(row)
+            except BatchStepError as e:
+                self._resolve(e.finished)
+                self._fail(self.engine.requests(e.state), e.cause)
+                continue
+            except Exception as e:
+                self._fail(self.engine.requests(row), e)
+                continue
+            self._resolve(finished)
+            if row is not None:
+                try:
+                    survivors = self._join(survivors, row)
+                except Exception as e:
+                    log.exception("[BATCH] merge failed")
+                    self._fail(self.engine.requests(row), e)
+        self.stats["steps"] += 1
+        return survivors
+
+    def _loop(self) -> None:
+        state = None
+        while True:
+            running = self.engine.size(state) if state is not None else 0
+            background = sum(1 for r in self.engine.requests(state) if r.priority > 0) if state is not None else 0
+            new = self._collect(block=state is None, capacity=self.max_batch_size - running, background=background)
+            if new:
+                self.stats["requests"] += len(new)
+                self.stats["background"] += sum(1 for r in new if r.priority > 0)
+                state = self._prefill(state, new)
+            if state is None:
+                continue
+            self.stats["max_batch"] = max(self.stats["max_batch"], self.engine.size(state))
+            state = self._step(state)
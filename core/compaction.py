@@ -0,0 +1,70 @@
+import logging
+import threading
+from typing import Any
+
+from capstone_ai.core import tracing
+from capstone_ai.core.memory import InMemoryHistory
+from capstone_ai.core.prompts import build_compaction_prompt
+
+log = logging.getLogger("dna.compaction")
+
+
+class HistoryCompactor:
+    """
+    요청 경로 밖에서 오래된 대화 턴을 [SUMMARY] 로 접는 백그라운드 작업자.
+    - 대기 세션을 최대 batch_size 개씩 모아 complete_many 로 한 번에 요약(배처가 켜져 있으면 같은 배치로 디코딩)
+    - 요약 중 세션이 바뀌면(트리밍/재작성) 결과를 버리고, 다음 append 때 다시 대기열에 오름
+    """
+
+    def __init__(self, memory: InMemoryHistory, llm: Any, batch_size: int = 8, interval_s: float = 2.0,
+                 max_new_tokens: int = 256):
+        self.memory = memory
+        self.llm = llm
+        self.batch_size = max(1, int(batch_size))
+        self.interval_s = float(interval_s)
+        self.max_new_tokens = int(max_new_tokens)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="history-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """정지 후 진행 중인 배치가 끝나기를 timeout 초까지 기다림(요약 반영이 저장소를 닫은 뒤로 밀리지 않도록)."""
+        self._stop.set()
+        self.memory.compaction_ready.set()
+        self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.memory.compaction_ready.wait(self.interval_s)
+            if self._stop.is_set():
+                return
+            try:
+                self.run_once()
+            except Exception:
+                log.exception("[COMPACT] batch failed")
+
+    def run_once(self) -> int:
+        """대기 중인 세션 한 배치를 요약해 반영. 반영된 세션 수 반환."""
+        batch = self.memory.take_compaction_batch(self.batch_size)
+        if not batch:
+            return 0
+        calls = [
+            {
+                "messages": [{"role": "user", "content": build_compaction_prompt(prev, turns)}],
+                "max_new_tokens": self.max_new_tokens,
+                "temperature": 0.2,
+            }
+            for _, prev, turns in batch
+        ]
+        try:
+            with tracing.span("compaction"):
+                summaries = self.llm.complete_many(calls)
+        except Exception:
+            for cid, _, turns in batch:
+                self.memory.apply_compaction(cid, turns, None)
+            raise
+        applied = 0
+        for (cid, _, turns), summary in zip(batch, summaries):
+            applied += bool(self.memory.apply_compaction(cid, turns, summary))
+        log.info("[COMPACT] sessions=%d applied=%d", len(batch), applied)
+        return applied
@@ -0,0 +1,30 @@
+from typing import List
+
+
+class IncrementalDecoder:
+    """
+    토큰을 하나씩 받아 새로 확정된 텍스트 조각만 돌려주는 디코더.
+    - 전체 출력을 매번 다시 디코딩하지 않고, 직전 확정 지점 이후의 짧은 구간만 디코딩
+    - 멀티바이트 문자가 토큰 사이에 걸쳐 미완성(�)이면 다음 토큰까지 보류
+    """
+
+    def __init__(self, tokenizer, skip_special_tokens: bool = True):
+        self.tokenizer = tokenizer
+        self.skip_special_tokens = skip_special_tokens
+        self.ids: List[int] = []
+        self._prefix_offset = 0
+        self._read_offset = 0
+
+    def push(self, token_id: int) -> str:
+        self.ids.append(token_id)
+        prefix = self.tokenizer.decode(
+            self.ids[self._prefix_offset:self._read_offset], skip_special_tokens=self.skip_special_tokens
+        )
+        full = self.tokenizer.decode(
+            self.ids[self._prefix_offset:], skip_special_tokens=self.skip_special_tokens
+        )
+        if len(full) > len(prefix) and not full.endswith("�"):
+            self._prefix_offset = self._read_offset
+            self._read_offset = len(self.ids)
+            return full[len(prefix):]
+        return ""
@@ -0,0 +1,155 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+CHAT_LABEL = "CHAT"
+
+# 일반 대화 예시(분류기의 CHAT 클래스). 도구 예시는 TOOLS[*]["examples"] 에서 가져옴.
+CHAT_EXAMPLES = [
+    "안녕하세요",
+    "고마워요 덕분에 해결했어요",
+    "너는 누구야?",
+    "오늘 기분 어때?",
+    "프로젝트 관리 잘하는 팁 알려줘",
+    "회의를 효율적으로 진행하는 방법이 뭐야?",
+    "REST API가 뭐야?",
+    "이 에러 메시지 무슨 뜻이야?",
+    "팀원들과 협업할 때 주의할 점은?",
+    "좋은 아침입니다",
+    "설명 좀 해줄 수 있어?",
+    "ㅋㅋ 재밌네요",
+]
+
+# (label, pattern). 도구 규칙은 정확히 한 도구만 가리키고, 요청형(…해줘/…해 주세요)이며 질문형이 아닐 때만 확정.
+# CHAT 규칙은 도구 규칙이 하나도 걸리지 않을 때만.
+DEFAULT_RULES: List[Tuple[str, str]] = [
+    ("meeting_create", r"회의록|(회의|미팅|대화|채팅)\s*(내용)?.{0,10}(요약|정리)|\d{1,2}\s*시.{0,12}(요약|정리)"),
+    ("todo_create", r"(일정|회의(?!록)|미팅|약속|스케줄).{0,12}(잡아|예약|생성|만들어|추가|등록)"),
+    ("change_role", r"역할.{0,12}(변경|바꿔|바꾸|추가|지정|부여)"),
+    (CHAT_LABEL, r"^\s*(안녕|하이|hello|hi|고마워|고맙|감사|ㅎㅎ|ㅋㅋ|반가워|좋은\s*(아침|하루|저녁))[^\n]{0,20}$"),
+    (CHAT_LABEL, r"(뭐야|뭐예요|뭔가요|무엇인가요|어떻게 하|차이가|방법|요령|팁)"),
+]
+
+# 질문/방법 문의("일정 추가하는 방법 알려줘", "회의록 기능은 어떻게 써?", "어제 회의 어땠어"): 도구 키워드가 있어도
+# 빠른 단계에서 도구로 보내지 않음(LLM 단계가 판정)
+QUESTION_PATTERN = (r"\?|어떻게|어때|어땠|방법|요령|팁|차이|누가|누구|무슨|뭐야|뭐예요|뭔가요|무엇|왜|언제|"
+                    r"가능(해|한가|할까)|인가요|나요|까요|을까|는지|궁금")
+# 요청형 어미: 규칙이 도구를 확정하려면 문장이 이렇게 끝나야 함
+IMPERATIVE_PATTERN = r"(줘|줘요|주세요|주십시오|주시겠어요|줄래|줄래요|부탁(해|해요|드려요|드립니다|합니다)?)\s*[.!~]*\s*$"
+# 규칙 적중의 보고 신뢰도(확률이 아니라 고정값. 분류기 점수와 구분)
+RULE_CONFIDENCE = 0.9
+
+
+@dataclass
+class FastDecision:
+    label: str
+    tier: str          # "rule" | "classifier"
+    confidence: float
+
+
+class RuleRouter:
+    """
+    키워드/정규식 규칙. 애매하면(여러 도구 매치, 질문형, 요청형이 아님) 결정을 미룸.
+    도구 키워드가 걸렸는데 미룬 경우 CHAT 규칙으로도 확정하지 않음.
+    """
+
+    def __init__(self, rules: List[Tuple[str, str]], tool_names: List[str],
+                 question: str = QUESTION_PATTERN, imperative: str = IMPERATIVE_PATTERN):
+        names = set(tool_names) | {CHAT_LABEL}
+        self.rules = [(label, re.compile(p, re.IGNORECASE)) for label, p in rules if label in names]
+        self.question = re.compile(question)
+        self.imperative = re.compile(imperative)
+
+    def is_question(self, text: str) -> bool:
+        return bool(self.question.search(text))
+
+    def decide(self, text: str) -> Optional[str]:
+        tools = {label for label, pat in self.rules if label != CHAT_LABEL and pat.search(text)}
+        if tools:
+            if len(tools) == 1 and not self.is_question(text) and self.imperative.search(text):
+                return tools.pop()
+            return None
+        for label, pat in self.rules:
+            if label == CHAT_LABEL and pat.search(text):
+                return CHAT_LABEL
+        return None
+
+
+def _ngrams(text: str) -> Counter:
+    t = re.sub(r"\s+", " ", text.lower()).strip()
+    return Counter(t[i:i + n] for n in (2, 3) for i in range(len(t) - n + 1))
+
+
+class CentroidClassifier:
+    """
+    문자 2~3-gram TF-IDF 센트로이드 분류기(외부 의존성 없음).
+    도구 설명/예시로 클래스별 센트로이드를 만들고 코사인 유사도로 판정.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]]):
+        docs = [(label, _ngrams(t)) for label, texts in examples.items() for t in texts]
+        df: Counter = Counter()
+        for _, grams in docs:
+            df.update(grams.keys())
+        n = len(docs)
+        self.idf = {g: math.log((1 + n) / (1 + c)) + 1.0 for g, c in df.items()}
+        self.centroids: Dict[str, Dict[str, float]] = {}
+        for label in examples:
+            acc: Counter = Counter()
+            for l, grams in docs:
+                if l == label:
+                    for g, w in self._vector(grams).items():
+                        acc[g] += w
+            self.centroids[label] = self._normalize(acc)
+
+    def _vector(self, grams: Counter) -> Dict[str, float]:
+        return self._normalize({g: (1 + math.log(c)) * self.idf.get(g, 0.0) for g, c in grams.items()})
+
+    @staticmethod
+    def _normalize(vec: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {g: v / norm for g, v in vec.items()}
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        q = self._vector(_ngrams(text))
+        out = [(label, sum(w * c.get(g, 0.0) for g, w in q.items())) for label, c in self.centroids.items()]
+        return sorted(out, key=lambda x: x[1], reverse=True)
+
+
+class FastRouter:
+    """
+    LLM 라우터 앞단의 저비용 판정.
+    1) 규칙 → 2) 센트로이드 분류기(점수·격차가 임계 이상일 때만) → 그 외에는 None(LLM 으로)
+    질문형 입력은 분류기도 CHAT 만 확정(도구로 보낼지는 LLM 이 판정).
+    """
+
+    def __init__(self, rules: RuleRouter, classifier: CentroidClassifier, min_score: float, min_margin: float):
+        self.rules = rules
+        self.classifier = classifier
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+    @classmethod
+    def from_catalog(cls, tools: List[Dict], min_score: float, min_margin: float) -> "FastRouter":
+        examples = {CHAT_LABEL: list(CHAT_EXAMPLES)}
+        for t in tools:
+            examples[t["name"]] = [t.get("description", "")] + list(t.get("examples", []))
+        return cls(RuleRouter(DEFAULT_RULES, [t["name"] for t in tools]),
+                   CentroidClassifier(examples), min_score, min_margin)
+
+    def decide(self, text: str) -> Optional[FastDecision]:
+        label = self.rules.decide(text)
+        if label is not None:
+            return FastDecision(label, "rule", RULE_CONFIDENCE)
+        ranked = self.classifier.scores(text)
+        if not ranked:
+            return None
+        top_label, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        if top_label != CHAT_LABEL and self.rules.is_question(text):
+            return None
+        if top >= self.min_score and top - second >= self.min_margin:
+            return FastDecision(top_label, "classifier", top)
+        return None
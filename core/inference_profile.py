@@ -0,0 +1,157 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+from transformers import AutoModelForCausalLM
+
+log = logging.getLogger("dna.llm")
+
+
+@dataclass(frozen=True)
+class InferenceProfile:
+    """
+    모델 로딩/실행 방식. default 는 기존 동작(device_map="auto", 모델 기본 dtype),
+    나머지는 GPU 없는 노드용 CPU 프로파일.
+    - dtype: 가중치 dtype(None 이면 from_pretrained 기본값)
+    - quantize: Linear 층 동적 int8 양자화(가중치 int8, 활성값은 실행 시 양자화. CPU 전용)
+    - compile: 디코더 층 MLP 블록을 torch.compile(실패하면 eager 로 되돌림)
+    - intra_threads / inter_threads: torch 연산 내부/연산 간 스레드 수(0 이면 torch 기본값)
+    """
+    name: str
+    dtype: Optional[torch.dtype] = None
+    quantize: bool = False
+    compile: bool = False
+    device_map: Optional[str] = None
+    intra_threads: int = 0
+    inter_threads: int = 0
+
+
+PROFILES: Dict[str, InferenceProfile] = {
+    "default": InferenceProfile("default", device_map="auto"),
+    "fp32": InferenceProfile("fp32", dtype=torch.float32),
+    "bf16": InferenceProfile("bf16", dtype=torch.bfloat16),
+    "int8": InferenceProfile("int8", dtype=torch.float32, quantize=True),
+}
+
+
+def bf16_supported() -> bool:
+    """bf16 연산을 하드웨어가 지원하는지(CUDA 또는 oneDNN 의 AVX512-BF16/AMX)."""
+    if torch.cuda.is_available():
+        return torch.cuda.is_bf16_supported()
+    check = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+    try:
+        return bool(check()) if check is not None else False
+    except Exception:
+        return False
+
+
+def resolve_profile(name: str, compile: bool = False, intra_threads: int = 0, inter_threads: int = 0) -> InferenceProfile:
+    """설정값 → 프로파일. 지원되지 않는 조합은 가까운 프로파일로 바꾸고 경고."""
+    profile = PROFILES.get((name or "default").lower())
+    if profile is None:
+        raise ValueError(f"unknown inference profile: {name} (choose from {', '.join(PROFILES)})")
+    if profile.dtype == torch.bfloat16 and not bf16_supported():
+        log.warning("[PROFILE] bf16 not supported on this host; using fp32")
+        profile = PROFILES["fp32"]
+    return replace(profile, compile=bool(compile), intra_threads=int(intra_threads), inter_threads=int(inter_threads))
+
+
+def apply_threads(profile: InferenceProfile) -> Dict[str, int]:
+    """
+    스레드 수 적용. inter-op 스레드는 프로세스에서 병렬 작업이 시작되기 전 한 번만 바꿀 수 있어
+    이미 시작된 경우 경고 후 유지.
+    """
+    if profile.intra_threads > 0:
+        torch.set_num_threads(profile.intra_threads)
+    if profile.inter_threads > 0 and torch.get_num_interop_threads() != profile.inter_threads:
+        try:
+            torch.set_num_interop_threads(profile.inter_threads)
+        except RuntimeError:
+            log.warning("[PROFILE] inter-op threads already fixed at %d", torch.get_num_interop_threads())
+    return {"intra_threads": torch.get_num_threads(), "inter_threads": torch.get_num_interop_threads()}
+
+
+def _rss_bytes() -> int:
+    """현재 프로세스 RSS(리눅스 /proc). 읽을 수 없으면 0."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def weight_bytes(model: torch.nn.Module) -> int:
+    """state_dict 기준 가중치 크기(양자화된 Linear 의 packed 가중치 포함)."""
+    total = 0
+    for v in model.state_dict().values():
+        parts = v if isinstance(v, (tuple, list)) else (v,)
+        for t in parts:
+            if isinstance(t, torch.Tensor):
+                total += t.numel() * t.element_size()
+    return total
+
+
+class _CompiledForward:
+    """torch.compile 한 forward. 컴파일/실행이 실패하면 한 번 경고하고 eager forward 로 되돌림."""
+
+    def __init__(self, module: torch.nn.Module):
+        self.eager = module.forward
+        self.compiled = torch.compile(module.forward, dynamic=True)
+        self.failed = False
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        if not self.failed:
+            try:
+                return self.compiled(*args, **kwargs)
+            except Exception:
+                log.exception("[PROFILE] compiled forward failed; falling back to eager")
+                self.failed = True
+        return self.eager(*args, **kwargs)
+
+
+def compile_blocks(model: torch.nn.Module) -> int:
+    """
+    디코더 층의 MLP 블록만 컴파일. 전체 forward 는 KV 캐시 길이가 스텝마다 바뀌어 재컴파일이 반복되므로
+    캐시와 무관하고 연산량이 가장 큰 MLP 로 범위를 한정. 컴파일한 블록 수 반환.
+    """
+    n = 0
+    for name, module in model.named_modules():
+        if name.endswith(".mlp"):
+            module.forward = _CompiledForward(module)
+            n += 1
+    return n
+
+
+def load_model(model_id: str, profile: InferenceProfile) -> Tuple[torch.nn.Module, Dict[str, Any]]:
+    """프로파일대로 모델을 로드. (모델, 로드 통계: 로드 시간/메모리/가중치 크기/스레드) 반환."""
+    threads = apply_threads(profile)
+    rss0, t0 = _rss_bytes(), time.perf_counter()
+    # safetensors 가중치는 mmap 으로 열고, low_cpu_mem_usage 로 랜덤 초기화 후 덮어쓰기 없이 바로 채움
+    kwargs: Dict[str, Any] = {"low_cpu_mem_usage": True}
+    if profile.device_map:
+        kwargs["device_map"] = profile.device_map
+    if profile.dtype is not None:
+        kwargs["torch_dtype"] = profile.dtype
+    model = AutoModelForCausalLM.from_pretrained(model_id, **kwargs)
+    model.eval()
+    if profile.quantize:
+        # inplace: fp32 Linear 가중치 사본을 따로 두지 않음(로드 직후 메모리 최고점 감소)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    compiled = compile_blocks(model) if profile.compile else 0
+    if profile.compile and not compiled:
+        log.warning("[PROFILE] no MLP blocks found to compile; running eager")
+    stats = {
+        "profile": profile.name,
+        "dtype": str(next(model.parameters()).dtype).replace("torch.", ""),
+        "quantized": profile.quantize,
+        "compiled_blocks": compiled,
+        "load_s": time.perf_counter() - t0,
+        "rss_mb": max(0, _rss_bytes() - rss0) / 2**20,
+        "weights_mb": weight_bytes(model) / 2**20,
+        **threads,
+    }
+    log.info("[PROFILE] %s", stats)
+    return model, stats
@@ -0,0 +1,426 @@
+import codecs
+import json
+import re
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+# 문자열 본문에 허용되는 토큰: 따옴표/역슬래시/제어문자 없음. 바이트 조각 토큰(단독 디코딩이 �)은 여기서 빼고
+# 아래 utf8 클래스로 따로 다룸(앞 조각과 이어 글자를 완성할 때만 허용)
+_SAFE = r'[^"\\\x00-\x1f\ufffd]'
+# 이스케이프는 한 토큰 안에서 완결된 것만(역슬래시로 끝나는 토큰은 허용하지 않음)
+_ESC = r'\\["\\/bfnrt]'
+_CLASS_PATTERNS = {
+    "str_open": re.compile(rf'^"{_SAFE}*$'),
+    "str_open_close": re.compile(rf'^"{_SAFE}*"$'),
+    "str_body": re.compile(rf"^{_SAFE}+$"),
+    "str_escape": re.compile(rf"^(?:{_SAFE}|{_ESC})*{_ESC}(?:{_SAFE}|{_ESC})*$"),
+    "str_end": re.compile(rf'^{_SAFE}*"$'),
+    "int_start": re.compile(r"^-?(0|[1-9]\d*)$"),
+    "zero": re.compile(r"^-?0$"),
+    "digits": re.compile(r"^\d+$"),
+    "frac": re.compile(r"^\.\d+$"),
+}
+_KEYWORDS = {"boolean": ["true", "false", "null"], "null": ["null"]}
+_OBJECT_TYPES = ("object", "dict")
+
+MAX_STRING_TOKENS = 64
+MAX_NUMBER_TOKENS = 8
+
+
+def _byte_level_decoder() -> Dict[str, int]:
+    """byte-level BPE(GPT-2 계열) 토큰 문자 → 원래 바이트."""
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(256):
+        if b not in bs:
+            bs.append(b)
+            cs.append(256 + n)
+            n += 1
+    return {chr(c): b for b, c in zip(bs, cs)}
+
+
+_BYTE_LEVEL = _byte_level_decoder()
+_BYTE_FALLBACK = re.compile(r"^<0x([0-9A-Fa-f]{2})>$")
+
+
+def _token_bytes(tokenizer, i: int) -> Optional[bytes]:
+    """토큰 하나의 원래 바이트(sentencepiece <0xNN> / byte-level BPE). 알 수 없으면 None."""
+    tok = tokenizer.convert_ids_to_tokens(i)
+    if not isinstance(tok, str):
+        return None
+    m = _BYTE_FALLBACK.match(tok)
+    if m:
+        return bytes([int(m.group(1), 16)])
+    if tok and all(c in _BYTE_LEVEL for c in tok):
+        return bytes(_BYTE_LEVEL[c] for c in tok)
+    return None
+
+
+_SECOND_BYTE = {0xE0: (0xA0, 0xBF), 0xED: (0x80, 0x9F), 0xF0: (0x90, 0xBF), 0xF4: (0x80, 0x8F)}
+
+
+def _utf8_tail(data: bytes) -> Optional[bytes]:
+    """UTF-8 로 디코딩하고 남은(글자를 아직 마치지 못한) 끝 바이트. 이어질 수 없는 바이트열이면 None."""
+    dec = codecs.getincrementaldecoder("utf-8")("strict")
+    try:
+        dec.decode(data, final=False)
+    except UnicodeDecodeError:
+        return None
+    tail = dec.getstate()[0]
+    # 디코더가 아직 거르지 않는 둘째 바이트 범위(대리 코드·범위 밖 코드포인트가 되는 조합)
+    if len(tail) >= 2:
+        lo, hi = _SECOND_BYTE.get(tail[0], (0x80, 0xBF))
+        if not lo <= tail[1] <= hi:
+            return None
+    return tail
+
+
+def utf8_missing(tail: bytes) -> int:
+    """끝 바이트(_utf8_tail)로 시작한 글자를 마치는 데 모자란 바이트 수."""
+    if not tail:
+        return 0
+    return (2 if tail[0] < 0xE0 else 3 if tail[0] < 0xF0 else 4) - len(tail)
+
+
+class TokenClasses:
+    """
+    어휘 전체를 한 번 디코딩해 JSON 값 조각별 허용 토큰 마스크를 미리 계산.
+    특수 토큰(EOS 등)은 어떤 클래스에도 넣지 않으므로 제약 디코딩 중에는 나올 수 없습니다.
+    바이트 조각 토큰(단독 디코딩이 �)은 utf8 로 따로 보관. 문자열 상태는 아직 마치지 못한 끝 바이트를 들고 다니며
+    그 뒤에 붙여 올바른 UTF-8 이 되는 조각만 허용하므로, 글자가 깨진 채로 문자열이 닫히지 않음(utf8_next).
+    남은 토큰 예산으로 마칠 수 없는 글자는 시작하지 않음(max_missing).
+    """
+
+    def __init__(self, tokenizer, vocab_size: int, device: Any = None):
+        self.tokenizer = tokenizer
+        self.vocab_size = vocab_size
+        special = set(tokenizer.all_special_ids) | set(getattr(tokenizer, "added_tokens_decoder", {}).keys())
+        ids: Dict[str, List[int]] = {name: [] for name in _CLASS_PATTERNS}
+        self.utf8: Dict[int, bytes] = {}
+        for i in range(min(len(tokenizer), vocab_size)):
+            if i in special:
+                continue
+            text = tokenizer.decode([i])
+            if "\ufffd" in text:
+                data = _token_bytes(tokenizer, i)
+                if data and not any(b in (0x22, 0x5C) or b < 0x20 for b in data):
+                    self.utf8[i] = data
+                continue
+            for name, pat in _CLASS_PATTERNS.items():
+                if pat.match(text):
+                    ids[name].append(i)
+        self.sets = {name: frozenset(v) for name, v in ids.items()}
+        self.masks = {name: self._mask(v, device) for name, v in ids.items()}
+        self._utf8_cache: Dict[Tuple[bytes, int], torch.Tensor] = {}
+        self._literals: Dict[str, List[int]] = {}
+
+    def _mask(self, ids: List[int], device: Any) -> torch.Tensor:
+        m = torch.zeros(self.vocab_size, dtype=torch.bool, device=device)
+        if ids:
+            m[torch.tensor(ids, dtype=torch.long, device=device)] = True
+        return m
+
+    def literal(self, text: str) -> List[int]:
+        if text not in self._literals:
+            self._literals[text] = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        return self._literals[text]
+
+    def only(self, *ids: int) -> torch.Tensor:
+        return self._mask(list(ids), self.masks["digits"].device)
+
+    def utf8_next(self, tail: bytes, max_missing: int = 3) -> torch.Tensor:
+        """
+        끝 바이트 tail(글자를 마치지 못한 부분, 없으면 b"") 뒤에 붙여도 올바른 UTF-8 인 바이트 조각 토큰.
+        붙인 뒤 모자란 바이트 수가 max_missing 이하인 조각만(토큰 예산·길이 상한에서는 tail 의 모자란 수 - 1 →
+        새 글자를 시작하지 않고 마무리만).
+        """
+        key = (tail, min(max_missing, 3))
+        m = self._utf8_cache.get(key)
+        if m is None:
+            ok = []
+            for i, data in self.utf8.items():
+                rest = _utf8_tail(tail + data)
+                if rest is not None and utf8_missing(rest) <= key[1]:
+                    ok.append(i)
+            m = self._utf8_cache[key] = self._mask(ok, self.masks["digits"].device)
+        return m
+
+
+_classes_lock = threading.Lock()
+# 토크나이저 → {(어휘 크기, 장치): TokenClasses}. 모델 풀에서 토크나이저를 공유하는 클라이언트끼리 재사용
+_shared_classes: "weakref.WeakKeyDictionary[Any, Dict[Any, TokenClasses]]" = weakref.WeakKeyDictionary()
+# 계산 중인 (토크나이저 id, 어휘 크기, 장치)별 락: 같은 어휘를 기다리는 호출만 기다리고 다른 어휘 계산은 막지 않음
+_building: Dict[Any, threading.Lock] = {}
+
+
+def token_classes(llm) -> TokenClasses:
+    """
+    LLMClient 별로 한 번만 계산(수 초). 같은 토크나이저·어휘 크기·장치면 다른 클라이언트의 결과를 공유.
+    요청 경로에서 처음 계산하지 않도록 LLMClient.prepare_json_constraints() 로 로드 시점에 미리 호출.
+    """
+    tc = getattr(llm, "_token_classes", None)
+    if tc is not None:
+        return tc
+    key = (int(llm.model.config.vocab_size), str(llm.model.device))
+    with _classes_lock:
+        shared = _shared_classes.setdefault(llm.tokenizer, {})
+        building = _building.setdefault((id(llm.tokenizer),) + key, threading.Lock())
+    with building:
+        tc = shared.get(key)
+        if tc is None:
+            tc = TokenClasses(llm.tokenizer, key[0], device=llm.model.device)
+            with _classes_lock:
+                shared[key] = tc
+    llm._token_classes = tc
+    return tc
+
+
+class JsonObjectConstraint:
+    """
+    도구 parameters 스키마로 만든 JSON 객체 문법. {"k1":v1,"k2":v2,...} (공백 없음, 선언 순서).
+    - 키·구분자는 강제 토큰, 값은 타입별 허용 토큰 마스크로만 선택(모르면 null)
+    - 문자열: "본문"(한 토큰 안에서 완결된 이스케이프 허용) / 정수·실수: 숫자 토큰 후 다음 구분자 선택 시 종료
+    - boolean: true|false|null / enum: 후보 값 토큰열 중 하나 또는 null / object(properties): 같은 문법을 중첩
+    - 객체가 닫히면 done → 즉시 생성 종료. 남은 토큰 예산이 닫는 데 필요한 만큼뿐이면 값을 마무리(null/닫는 따옴표)해
+      max_tokens 안에서 항상 유효한 객체가 되도록 함
+    """
+
+    def __init__(self, parameters: Dict[str, Any], classes: TokenClasses, max_tokens: int = 256):
+        self.tc = classes
+        props = list((parameters.get("properties") or {}).items())
+        self.specs = [spec or {} for _, spec in props]
+        self.types = [spec.get("type", "string") for spec in self.specs]
+        self.enums = [
+            [classes.literal(json.dumps(v, ensure_ascii=False)) for v in spec["enum"] if v is not None]
+            if spec.get("enum") else None
+            for spec in self.specs
+        ]
+        self.literals = [
+            classes.literal(("{" if i == 0 else ",") + f'"{name}":') for i, (name, _) in enumerate(props)
+        ] + [classes.literal("}" if props else "{}")]
+        self.null = classes.literal("null")
+        self.max_tokens = max_tokens
+        self.used = 0
+        self.seg = 0
+        self.phase = "lit"
+        self.pos = 0
+        self.count = 0
+        self.tail = b""  # 문자열 안에서 아직 글자를 마치지 못한 끝 바이트(바이트 조각 토큰 뒤)
+        self.keyword: List[int] = []
+        self.choices: List[List[int]] = []           # enum: 지금까지 고른 토큰과 맞는 후보 값
+        self.sub: Optional["JsonObjectConstraint"] = None  # 중첩 객체 값
+        self.has_frac = False
+        self.zero = False
+        self.done = False
+
+    def _rest(self, seg: int) -> int:
+        """literals[seg] 부터 끝까지 닫는 데 필요한 최소 토큰 수(남은 값은 모두 null)."""
+        n = len(self.literals) - 1
+        return sum(len(l) for l in self.literals[seg:]) + len(self.null) * max(0, n - seg)
+
+    def _slack(self) -> int:
+        """문자열 안에서: 지금 글자를 마치고 닫은 뒤(나머지는 null)에도 남는 토큰 수."""
+        return self.max_tokens - self.used - (1 + utf8_missing(self.tail) + self._rest(self.seg + 1))
+
+    def _tight(self) -> bool:
+        if self.phase == "str":
+            return self._slack() <= 0
+        if self.phase == "num":
+            need = self._rest(self.seg + 1)
+        elif self.phase == "value":
+            need = len(self.null) + self._rest(self.seg + 1)
+        else:
+            return False
+        return self.max_tokens - self.used <= need
+
+    def _room(self) -> int:
+        """현재 값에 쓸 수 있는 토큰 수(뒤의 키·값을 모두 null 로 닫는 몫을 뺀 나머지)."""
+        return self.max_tokens - self.used - self._rest(self.seg + 1)
+
+    def _object(self, seg: int, max_tokens: int) -> "JsonObjectConstraint":
+        return JsonObjectConstraint(self.specs[seg], self.tc, max_tokens=max_tokens)
+
+    # ----- 현재 상태에서 허용되는 토큰 -----
+    def mask(self) -> torch.Tensor:
+        tc = self.tc
+        if self.phase == "lit":
+            return tc.only(self.literals[self.seg][self.pos])
+        if self.phase == "kw":
+            return tc.only(self.keyword[self.pos])
+        if self.phase == "enum":
+            return tc.only(*{seq[self.pos] for seq in self.choices if self.pos < len(seq)})
+        if self.phase == "obj":
+            return self.sub.mask()
+        tight = self._tight()
+        if self.phase == "value":
+            typ = self.types[self.seg]
+            if tight:
+                return tc.only(self.null[0])
+            room = self._room()
+            enum = self.enums[self.seg]
+            if enum is not None:
+                return tc.only(self.null[0], *{seq[0] for seq in enum if len(seq) <= room})
+            m = tc.only(*{k[0] for k in self._keywords(typ) if len(k) <= room})
+            if typ in _OBJECT_TYPES:
+                sub = self._object(self.seg, room)
+                return m | tc.only(sub.literals[0][0]) if sub._rest(0) <= room else m
+            if typ in ("integer", "number"):
+                m = m | tc.masks["int_start"]
+            elif typ != "boolean":
+                m = m | tc.masks["str_open"] | tc.masks["str_open_close"]
+            return m
+        if self.phase == "str":
+            missing = utf8_missing(self.tail)
+            finish = tight or self.count >= MAX_STRING_TOKENS
+            # 조각 하나를 더 쓰고도 글자를 마치고 닫을 수 있을 만큼만 모자란 바이트를 허용
+            limit = missing - 1 if finish else missing + self._slack() - 1
+            if self.tail:
+                return tc.utf8_next(self.tail, max_missing=limit)
+            m = tc.masks["str_end"]
+            return m if finish else m | tc.masks["str_body"] | tc.masks["str_escape"] | tc.utf8_next(b"", max_missing=limit)
+        if self.phase == "num":
+            m = tc.only(self.literals[self.seg + 1][0])
+            if self.count < MAX_NUMBER_TOKENS and not self.zero and not tight:
+                m = m | tc.masks["digits"]
+                if self.types[self.seg] == "number" and not self.has_frac:
+                    m = m | tc.masks["frac"]
+            return m
+        return tc.only()
+
+    def _keywords(self, typ: str) -> List[List[int]]:
+        return [self.tc.literal(w) for w in _KEYWORDS.get(typ, _KEYWORDS["null"])]
+
+    # ----- 선택된 토큰으로 상태 전이 -----
+    def advance(self, tok: int) -> None:
+        tc = self.tc
+        self.used += 1
+        if self.phase == "lit":
+            self._next_literal_token()
+        elif self.phase == "kw":
+            self.pos += 1
+            if self.pos >= len(self.keyword):
+                self._end_value()
+        elif self.phase == "enum":
+            self.choices = [seq for seq in self.choices if self.pos < len(seq) and seq[self.pos] == tok]
+            self.pos += 1
+            if any(len(seq) == self.pos for seq in self.choices):
+                self._end_value()
+        elif self.phase == "obj":
+            self.sub.advance(tok)
+            if self.sub.done:
+                self._end_value()
+        elif self.phase == "value":
+            typ = self.types[self.seg]
+            kw = next((k for k in self._keywords(typ) if k[0] == tok), None)
+            if kw is not None:
+                self.keyword, self.phase, self.pos = kw, "kw", 1
+                if len(kw) == 1:
+                    self._end_value()
+            elif self.enums[self.seg] is not None:
+                self.choices, self.phase, self.pos = [seq for seq in self.enums[self.seg] if seq[0] == tok], "enum", 1
+                if any(len(seq) == 1 for seq in self.choices):
+                    self._end_value()
+            elif typ in _OBJECT_TYPES:
+                # 여는 토큰도 중첩 객체의 예산에 포함(used 는 이미 증가)
+                self.sub, self.phase = self._object(self.seg, self._room() + 1), "obj"
+                self.sub.advance(tok)
+                if self.sub.done:
+                    self._end_value()
+            elif tok in tc.sets["int_start"]:
+                self.phase, self.count, self.has_frac = "num", 1, False
+                self.zero = tok in tc.sets["zero"]
+            elif tok in tc.sets["str_open_close"]:
+                self._end_value()
+            else:
+                self.phase, self.count, self.tail = "str", 0, b""
+        elif self.phase == "str":
+            data = tc.utf8.get(tok)
+            if data is not None:
+                self.tail = _utf8_tail(self.tail + data) or b""
+                self.count += 1
+            elif tok in tc.sets["str_end"]:
+                self._end_value()
+            else:
+                self.count += 1
+        elif self.phase == "num":
+            if tok == self.literals[self.seg + 1][0]:
+                self.seg += 1
+                self.phase, self.pos = "lit", 0
+                self._next_literal_token()
+            else:
+                self.count += 1
+                self.has_frac = self.has_frac or tok in tc.sets["frac"]
+
+    def _next_literal_token(self) -> None:
+        self.pos += 1
+        if self.pos >= len(self.literals[self.seg]):
+            if self.seg == len(self.literals) - 1:
+                self.done, self.phase = True, "done"
+            else:
+                self.phase = "value"
+
+    def _end_value(self) -> None:
+        self.seg += 1
+        self.phase, self.pos, self.sub = "lit", 0, None
+
+
+class FunctionCallConstraint:
+    """
+    라우팅 + 파라미터 추출을 한 번에: 출력은 CHAT 또는 {"tool":"<이름>","arguments":{...}} 만 가능.
+    - 도구 이름은 후보 토큰열(트라이)로 좁혀 가며 강제, arguments 는 선택된 도구 스키마의 JsonObjectConstraint 에 위임
+    - label: 선택된 라벨(CHAT 또는 도구 이름), 끝나면 done
+    - arg_ids: arguments 객체에 해당하는 토큰들(출력 전체를 다시 찾지 않고 인자만 디코딩하도록)
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]], classes: TokenClasses, max_tokens: int = 256, chat_label: str = "CHAT"):
+        self.tc = classes
+        self.max_tokens = max_tokens
+        self.tools = {t["name"]: t for t in tools}
+        self.candidates = [(classes.literal(chat_label), chat_label)] + [
+            (classes.literal(f'{{"tool":"{t["name"]}","arguments":'), t["name"]) for t in tools
+        ]
+        self.close = classes.literal("}")
+        self.pos = 0
+        self.used = 0
+        self.phase = "choice"
+        self.label = None
+        self.args: Any = None
+        self.arg_ids: List[int] = []
+        self.done = False
+
+    def mask(self) -> torch.Tensor:
+        if self.phase == "choice":
+            return self.tc.only(*{seq[self.pos] for seq, _ in self.candidates if self.pos < len(seq)})
+        if self.phase == "args":
+            return self.args.mask()
+        if self.phase == "close":
+            return self.tc.only(self.close[self.pos])
+        return self.tc.only()
+
+    def advance(self, tok: int) -> None:
+        self.used += 1
+        if self.phase == "choice":
+            self.candidates = [(seq, name) for seq, name in self.candidates if self.pos < len(seq) and seq[self.pos] == tok]
+            self.pos += 1
+            finished = [name for seq, name in self.candidates if len(seq) == self.pos]
+            if finished:
+                self.label = finished[0]
+                if self.label not in self.tools:
+                    self.done, self.phase = True, "done"
+                else:
+                    params = self.tools[self.label].get("parameters") or {}
+                    budget = self.max_tokens - self.used - len(self.close)
+                    self.args, self.phase = JsonObjectConstraint(params, self.tc, max_tokens=budget), "args"
+        elif self.phase == "args":
+            self.args.advance(tok)
+            self.arg_ids.append(tok)
+            if self.args.done:
+                self.phase, self.pos = "close", 0
+        elif self.phase == "close":
+            self.pos += 1
+            if self.pos >= len(self.close):
+                self.done, self.phase = True, "done"
@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def common_prefix_len(a: List[int], b: List[int]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def crop_layers(layers: Any, n: int) -> Any:
+    """레이어별 (key, value) 를 앞쪽 n 토큰으로 자름(뷰만 만들고 복사하지 않음)."""
+    return tuple((k[:, :, :n, :], v[:, :, :n, :]) for k, v in layers)
+
+
+@dataclass
+class _PrefixEntry:
+    digest: str
+    ids: List[int]
+    layers: Any
+
+
+class PrefixCache:
+    """
+    정적 프롬프트 접두(시스템 프롬프트, 라우터 카탈로그, 스키마 지침)의 KV 를 보관.
+    - 이름별 1개 항목. 같은 이름으로 내용(digest)이 바뀌면 이전 항목을 교체(stale 제거)
+    - lookup: 토큰화된 프롬프트와 공통 접두가 가장 긴 항목을 찾아 그 길이만큼 잘라 반환
+    - 캐시된 텐서는 읽기 전용으로만 쓰임(디코딩 중 KV 는 torch.cat 으로 새로 만들어짐)
+    """
+
+    def __init__(self, min_tokens: int = 16):
+        self.min_tokens = min_tokens
+        self._entries: Dict[str, _PrefixEntry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "reused_tokens": 0}
+
+    def digest(self, name: str) -> Optional[str]:
+        e = self._entries.get(name)
+        return e.digest if e else None
+
+    def put(self, name: str, digest: str, ids: List[int], layers: Any) -> None:
+        with self._lock:
+            if name in self._entries:
+                self.stats["evictions"] += 1
+            self._entries[name] = _PrefixEntry(digest=digest, ids=list(ids), layers=layers)
+
+    def evict(self, name: str) -> None:
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self.stats["evictions"] += 1
+
+    def lookup(self, ids: List[int]) -> Optional[Tuple[Any, int]]:
+        best, best_len = None, 0
+        for e in list(self._entries.values()):
+            m = common_prefix_len(e.ids, ids)
+            if m > best_len:
+                best, best_len = e, m
+        # 다음 토큰 logits 를 얻으려면 최소 1개 토큰은 새로 넣어야 함
+        best_len = min(best_len, len(ids) - 1)
+        if best is None or best_len < self.min_tokens:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["reused_tokens"] += best_len
+        return crop_layers(best.layers, best_len), best_len
+
+
+def layers_nbytes(layers: Any) -> int:
+    return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in layers)
+
+
+@dataclass
+class _SessionEntry:
+    ids: List[int]
+    layers: Any
+    nbytes: int
+
+
+class SessionKVCache:
+    """
+    세션(cid)별 멀티턴 대화 KV. 다음 턴은 공통 접두 이후의 새 메시지만 prefill.
+    - budget_bytes 를 넘으면 가장 오래 쓰지 않은 세션부터 제거(LRU)
+    - 앞선 메시지가 재작성되면(ensure_context/ensure_system) invalidate(cid)
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = int(budget_bytes)
+        self._entries: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "reused_tokens": 0}
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used
+
+    def lookup(self, cid: str, ids: List[int]) -> Optional[Tuple[Any, int]]:
+        with self._lock:
+            e = self._entries.get(cid)
+            if e is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(cid)
+            m = min(common_prefix_len(e.ids, ids), len(ids) - 1)
+            if m <= 0:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["reused_tokens"] += m
+            return crop_layers(e.layers, m), m
+
+    def store(self, cid: str, ids: List[int], layers: Any) -> None:
+        nbytes = layers_nbytes(layers)
+        with self._lock:
+            old = self._entries.pop(cid, None)
+            if old is not None:
+                self._used -= old.nbytes
+            if nbytes > self.budget_bytes:
+                return
+            while self._entries and self._used + nbytes > self.budget_bytes:
+                _, ev = self._entries.popitem(last=False)
+                self._used -= ev.nbytes
+                self.stats["evictions"] += 1
+            self._entries[cid] = _SessionEntry(ids=list(ids), layers=layers, nbytes=nbytes)
+            self._used += nbytes
+
+    def invalidate(self, cid: str) -> None:
+        with self._lock:
+            e = self._entries.pop(cid, None)
+            if e is not None:
+                self._used -= e.nbytes
+                self.stats["invalidations"] += 1
@@ -1,32 +1,681 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass
+import threading
+import hashlib
+import time
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoTokenizer, DynamicCache
 from capstone_ai.config import MODEL_ID, GEN_MAX_TOKENS
+from capstone_ai.config import LLM_PROFILE, LLM_COMPILE, LLM_INTRA_OP_THREADS, LLM_INTER_OP_THREADS
+from capstone_ai.config import LLM_BATCH_ENABLED, LLM_BATCH_MAX_SIZE, LLM_BATCH_WINDOW_MS, LLM_BATCH_BACKGROUND_SLOTS
+from capstone_ai.config import PREFIX_CACHE_ENABLED, PREFIX_CACHE_MIN_TOKENS
+from capstone_ai.config import SESSION_KV_ENABLED, SESSION_KV_BUDGET_MB
+from capstone_ai.config import SPEC_DRAFT_MODEL, SPEC_NUM_TOKENS, SPEC_NGRAM_MAX
+from capstone_ai.core.batching import BatchScheduler, BatchStepError, GenRequest, GenerationCancelled
+from capstone_ai.core.inference_profile import load_model, resolve_profile
+from capstone_ai.core.kv_cache import PrefixCache, SessionKVCache
+from capstone_ai.core.speculative import DraftModelDrafter, NgramDrafter, SpecStats, crop_cache
+from capstone_ai.core.detokenize import IncrementalDecoder
+from capstone_ai.core import tracing
+from capstone_ai.core.stopping import StopChecker, StopCondition
+from capstone_ai.core.json_constraint import FunctionCallConstraint, JsonObjectConstraint, token_classes
+from capstone_ai.utils.json_utils import parse_json_object
 import json, logging
 log = logging.getLogger("dna.llm")
 
+
+@dataclass
+class DecodeState:
+    """
+    진행 중인 배치. KV 캐시 길이 == attention_mask 길이(마지막 샘플 토큰은 아직 미입력).
+    pending: 샘플해 행에 이미 추가했지만 모델에 아직 넣지 못한 토큰(forward 실패 후 재시도용, 이때 logits 는 None).
+    """
+    reqs: List[GenRequest]
+    past: Any
+    attn: torch.Tensor
+    logits: Optional[torch.Tensor]
+    pending: Optional[torch.Tensor] = None
+
+
+def _legacy(cache) -> Tuple[Tuple[torch.Tensor, torch.Tensor], ...]:
+    return tuple((cache[i][0], cache[i][1]) for i in range(len(cache)))
+
+
+def _compact(past: Any, attn: torch.Tensor) -> Tuple[Any, torch.Tensor]:
+    """모든 행이 패딩인 왼쪽 열을 KV/attention_mask 에서 잘라냄(긴 행이 끝난 뒤 배치 폭이 계속 커지지 않도록)."""
+    used = attn.any(dim=0)
+    start = int(used.long().argmax()) if bool(used.any()) else 0
+    if start == 0:
+        return past, attn
+    layers = tuple((k[:, :, start:, :], v[:, :, start:, :]) for k, v in _legacy(past))
+    return DynamicCache.from_legacy_cache(layers), attn[:, start:]
+
+
+def _left_pad(layers, n: int):
+    if n <= 0:
+        return layers
+    out = []
+    for k, v in layers:
+        pk = k.new_zeros(k.shape[0], k.shape[1], n, k.shape[3])
+        pv = v.new_zeros(v.shape[0], v.shape[1], n, v.shape[3])
+        out.append((torch.cat([pk, k], dim=2), torch.cat([pv, v], dim=2)))
+    return tuple(out)
+
+
 class LLMClient:
-    def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
-        self.model = AutoModelForCausalLM.from_pretrained(MODEL_ID, device_map="auto")
+    def __init__(self, model_id: str = MODEL_ID, profile: str = LLM_PROFILE, tokenizer: Any = None):
+        """tokenizer: 어휘가 같은 다른 모델의 토크나이저를 공유할 때(core/model_pool.py)."""
+        self.model_id = model_id
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_id)
+        self.profile = resolve_profile(profile, compile=LLM_COMPILE,
+                                       intra_threads=LLM_INTRA_OP_THREADS, inter_threads=LLM_INTER_OP_THREADS)
+        self.model, self.load_stats = load_model(model_id, self.profile)
+        self.perf = {"prefill_tokens": 0, "prefill_s": 0.0, "decode_tokens": 0, "decode_s": 0.0}
+        self._perf_lock = threading.Lock()  # 배처 스레드와 단건(추측 디코딩) 경로가 함께 갱신
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
+
+        gc = self.model.generation_config
+        eos = gc.eos_token_id if gc.eos_token_id is not None else self.tokenizer.eos_token_id
+        self._eos_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+        self._top_k = int(gc.top_k or 0)
+        self._top_p = float(gc.top_p or 1.0)
+
+        self._lock = threading.RLock()  # 모델 forward 직렬화(배처 스레드 ↔ 단건 경로)
+        self._ctx = threading.local()   # 호출 스레드별 설정(background 우선순위)
+        self.spec_draft_model = SPEC_DRAFT_MODEL
+        self.spec_num_tokens = SPEC_NUM_TOKENS
+        self._draft: Any = None         # 추측 디코딩 초안 모델(처음 쓸 때 로드, 쓸 수 없으면 False)
+        self._draft_lock = threading.Lock()
+        self.spec_stats = SpecStats()
+        self.prefix_cache = PrefixCache(min_tokens=PREFIX_CACHE_MIN_TOKENS) if PREFIX_CACHE_ENABLED else None
+        self.session_cache = SessionKVCache(
+            budget_bytes=int(SESSION_KV_BUDGET_MB * 1024 * 1024)
+        ) if SESSION_KV_ENABLED else None
+        self.batcher = BatchScheduler(
+            self, max_batch_size=LLM_BATCH_MAX_SIZE, window_ms=LLM_BATCH_WINDOW_MS,
+            background_slots=LLM_BATCH_BACKGROUND_SLOTS or None,
+        ) if LLM_BATCH_ENABLED else None
+
+    def _encode(self, messages: List[Dict[str, str]]) -> List[int]:
+        return list(self.tokenizer.apply_chat_template(messages, add_generation_prompt=True))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _encode_prefix(self, messages: List[Dict[str, str]]) -> List[int]:
+        """마지막 메시지 내용 끝까지의 토큰(턴 종료 토큰 제외). 실제 프롬프트의 접두와 일치."""
+        marker = "\u241fPREFIX_END\u241f"
+        msgs = messages[:-1] + [{**messages[-1], "content": messages[-1]["content"] + marker}]
+        text = self.tokenizer.apply_chat_template(msgs, tokenize=False)
+        text = text[:text.index(marker)]
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    @torch.no_grad()
+    def register_prefix(self, name: str, messages: List[Dict[str, str]]) -> None:
+        """
+        정적 접두의 KV 를 미리 계산해 세션 간에 재사용.
+        같은 이름으로 내용이 바뀌면(카탈로그/시스템 프롬프트 변경) 이전 항목을 교체합니다.
+        """
+        if self.prefix_cache is None:
+            return
+        digest = hashlib.sha1(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+        if self.prefix_cache.digest(name) == digest:
+            return
+        ids = self._encode_prefix(messages)
+        if len(ids) < self.prefix_cache.min_tokens:
+            return
+        x = torch.tensor([ids], dtype=torch.long, device=self.model.device)
+        with self._lock:
+            out = self.model(input_ids=x, use_cache=True)
+        self.prefix_cache.put(name, digest, ids, _legacy(out.past_key_values))
 
-    def complete(self, messages: List[Dict[str, str]], max_new_tokens: int = GEN_MAX_TOKENS, temperature: float = 0.7, do_sample: bool = True) -> str:
+    @contextmanager
+    def background(self, priority: int = 1):
+        """
+        이 블록에서(현재 스레드) 나가는 생성 요청을 백그라운드 우선순위로 배처에 제출.
+        대화 요청이 먼저 배치에 들어가고, 백그라운드 행은 배처의 background_slots 안에서만 실행됨.
+        """
+        prev = getattr(self._ctx, "priority", 0)
+        self._ctx.priority = int(priority)
+        try:
+            yield
+        finally:
+            self._ctx.priority = prev
+
+    def perf_stats(self) -> Dict[str, Any]:
+        """프로파일/로드 통계 + 누적 처리량(prefill·decode 토큰/초)."""
+        with self._perf_lock:
+            p = dict(self.perf)
+        return {
+            **self.load_stats,
+            **p,
+            "prefill_tok_s": p["prefill_tokens"] / p["prefill_s"] if p["prefill_s"] else 0.0,
+            "decode_tok_s": p["decode_tokens"] / p["decode_s"] if p["decode_s"] else 0.0,
+            "speculative": self.spec_stats.as_dict(),
+        }
+
+    def _add_perf(self, **amounts: float) -> None:
+        with self._perf_lock:
+            for k, v in amounts.items():
+                self.perf[k] += v
+
+    def invalidate_session(self, cid: str) -> None:
+        """세션 앞쪽 메시지가 재작성되면 해당 세션 KV 를 버림."""
+        if self.session_cache is not None:
+            self.session_cache.invalidate(cid)
+
+    def _request(self, messages: List[Dict[str, str]], max_new_tokens: int, temperature: float, do_sample: bool, session: Optional[str] = None, on_token: Optional[Callable[[str], None]] = None, stop: Optional[List[StopCondition]] = None, constraint: Any = None) -> GenRequest:
         try:
             log.info("[PROMPT] %s", json.dumps(messages, ensure_ascii=False)[:4000])
         except Exception:
             pass
-        input_ids = self.tokenizer.apply_chat_template(
-            messages, add_generation_prompt=True, return_tensors="pt"
-        ).to(self.model.device)
-        with torch.no_grad():
-            gen_kwargs = {"input_ids": input_ids, "max_new_tokens": max_new_tokens}
-            if do_sample:
-                t = float(temperature)
-                if t <= 0:
-                    t = 1e-5
-                gen_kwargs.update({"do_sample": True, "temperature": t})
+        return GenRequest(
+            input_ids=self._encode(messages),
+            max_new_tokens=int(max_new_tokens),
+            temperature=float(temperature),
+            do_sample=bool(do_sample),
+            session=session if self.session_cache is not None else None,
+            on_token=on_token,
+            decoder=IncrementalDecoder(self.tokenizer) if (on_token is not None or stop) else None,
+            stop=StopChecker(stop) if stop else None,
+            constraint=constraint,
+            priority=getattr(self._ctx, "priority", 0),
+        )
+
+    def _run(self, reqs: List[GenRequest]) -> List[List[int]]:
+        if self.batcher is not None:
+            futures = [self.batcher.submit(r) for r in reqs]
+            outs = [f.result() for f in futures]
+        else:
+            state = self.prefill(reqs)
+            while state is not None:
+                try:
+                    state, _ = self.step(state)
+                except BatchStepError as e:
+                    raise e.cause
+            failed = next((r.error for r in reqs if r.error is not None), None)
+            if failed is not None:
+                raise failed
+            outs = [r.output_ids for r in reqs]
+        self._observe(reqs)
+        return outs
+
+    @staticmethod
+    def _observe(reqs: List[GenRequest]) -> None:
+        """호출별 지표(core/tracing.py): 프롬프트/생성 토큰 수, 배처 대기, decode 토큰/초(첫 토큰 이후)."""
+        for r in reqs:
+            n = len(r.output_ids)
+            rate = None
+            if n > 1 and r.first_token_at is not None and r.finished_at is not None and r.finished_at > r.first_token_at:
+                rate = (n - 1) / (r.finished_at - r.first_token_at)
+            wait = r.started_at - r.created_at if r.started_at is not None else None
+            tracing.record_llm(len(r.input_ids), n, queue_wait_s=wait, tokens_per_s=rate)
+
+    def _text(self, req: GenRequest, out: List[int]) -> str:
+        text = self.tokenizer.decode(out, skip_special_tokens=True)
+        if req.stop is not None:
+            text = req.stop.trim(text)
+        return text.strip()
+
+    def complete(self, messages: List[Dict[str, str]], max_new_tokens: int = GEN_MAX_TOKENS, temperature: float = 0.7, do_sample: bool = True, session: Optional[str] = None, on_token: Optional[Callable[[str], None]] = None, stop: Optional[List[StopCondition]] = None, speculate: Optional[str] = None) -> str:
+        """
+        session(cid)을 주면 해당 세션의 이전 턴 KV 를 이어서 사용(SESSION_KV_ENABLED 시).
+        on_token 을 주면 생성되는 텍스트 조각을 즉시 전달(스트리밍). 반환값은 전체 텍스트.
+        stop: 호출별 중단 조건(core/stopping.py). 만족하는 토큰에서 바로 멈추고 이후 텍스트는 잘라냄.
+        speculate: "ngram" | "draft" 면 추측 디코딩(배처 밖에서 단건 실행). greedy 출력은 일반 경로와 같고,
+        샘플링도 대상 모델 분포를 그대로 따름.
+        """
+        req = self._request(messages, max_new_tokens, temperature, do_sample, session=session, on_token=on_token, stop=stop)
+        drafter = self._drafter(speculate) if speculate else None
+        out = self._speculate(req, drafter) if drafter is not None else self._run([req])[0]
+        return self._text(req, out)
+
+    def prepare_json_constraints(self) -> None:
+        """제약 디코딩용 토큰 클래스(어휘 전체 디코딩, 수 초)를 미리 계산. 서비스 생성(모델 로드) 시점에 호출."""
+        token_classes(self)
+
+    def complete_json(self, messages: List[Dict[str, str]], parameters: Dict[str, Any], max_new_tokens: int = 256, temperature: float = 0.2, do_sample: bool = True) -> Dict[str, Any]:
+        """
+        도구 parameters 스키마로 제약한 JSON 객체 생성. 선언된 키/타입만 나올 수 있고 객체가 닫히면 바로 종료.
+        값을 모르는 키는 null 로 생성되며 반환 dict 에서는 제외됩니다.
+        """
+        constraint = JsonObjectConstraint(parameters, token_classes(self), max_tokens=max_new_tokens)
+        req = self._request(messages, max_new_tokens, temperature, do_sample, constraint=constraint)
+        raw = self.tokenizer.decode(self._run([req])[0], skip_special_tokens=True)
+        try:
+            obj = json.loads(raw)
+        except Exception:
+            # max_new_tokens 로 잘린 경우
+            log.warning("[JSON] constrained output truncated: %s", raw[:200])
+            obj = parse_json_object(raw)
+        return {k: v for k, v in obj.items() if v is not None}
+
+    def complete_function_call(self, messages: List[Dict[str, str]], tools: List[Dict[str, Any]], max_new_tokens: int = 256, temperature: float = 0.2, do_sample: bool = True) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        라우팅 + 파라미터 추출을 한 번의 제약 생성으로. ("CHAT", None) 또는 (도구 이름, 인자 dict(null 제외)).
+        """
+        constraint = FunctionCallConstraint(tools, token_classes(self), max_tokens=max_new_tokens)
+        req = self._request(messages, max_new_tokens, temperature, do_sample, constraint=constraint)
+        out = self._run([req])[0]
+        if constraint.label is None or constraint.label not in constraint.tools:
+            return "CHAT", None
+        # 인자는 제약이 기록한 arguments 토큰만 디코딩(출력 전체에서 "arguments" 위치를 찾지 않음)
+        text = self.tokenizer.decode(constraint.arg_ids, skip_special_tokens=True)
+        if not constraint.args.done:
+            log.warning("[JSON] function call arguments incomplete (%d/%d tokens): %s",
+                        len(out), max_new_tokens, text[:200] or "<empty>")
+            args = parse_json_object(text)
+        else:
+            try:
+                args = json.loads(text)
+            except ValueError:
+                log.warning("[JSON] function call arguments unparsable: %s", text[:200])
+                args = parse_json_object(text)
+        return constraint.label, {k: v for k, v in (args if isinstance(args, dict) else {}).items() if v is not None}
+
+    def complete_many(self, calls: List[Dict[str, Any]]) -> List[str]:
+        """
+        여러 프롬프트를 한 번에 제출(배처가 켜져 있으면 같은 배치로 디코딩).
+        calls: [{"messages": [...], "max_new_tokens": 256, "temperature": 0.2, "do_sample": True, "stop": [...]}, ...]
+        """
+        reqs = [
+            self._request(
+                c["messages"],
+                c.get("max_new_tokens", GEN_MAX_TOKENS),
+                c.get("temperature", 0.7),
+                c.get("do_sample", True),
+                stop=c.get("stop"),
+            )
+            for c in calls
+        ]
+        outs = self._run(reqs)
+        return [self._text(r, o) for r, o in zip(reqs, outs)]
+
+    @torch.no_grad()
+    def score_labels(self, messages: List[Dict[str, str]], labels: List[str]) -> List[Tuple[str, float]]:
+        """
+        고정 라벨 집합 중 하나만 출력하도록 제한한 분류.
+        prefill 1회 + (라벨이 여러 토큰이면) 라벨 토큰 teacher-forcing 1회로 각 라벨의 토큰당 평균 로그확률을 계산하고,
+        라벨 집합 안에서 정규화한 확률을 내림차순으로 반환합니다. 자유 생성이 아니므로 잘못된 라벨은 나올 수 없습니다.
+        - 합계 대신 평균: 토큰이 많은 도구명이 짧은 라벨(CHAT)보다 체계적으로 불리해지지 않도록
+        - 라벨은 생성 프롬프트 뒤에 이어 붙인 문맥으로 토큰화(모델이 실제로 생성할 토큰, 앞 공백/병합 포함)
+        """
+        try:
+            log.info("[PROMPT] %s", json.dumps(messages, ensure_ascii=False)[:4000])
+        except Exception:
+            pass
+        req = GenRequest(input_ids=self._encode(messages), max_new_tokens=1, do_sample=False)
+        state = self.prefill([req])
+        tracing.record_llm(len(req.input_ids))
+        label_ids = self._label_ids(messages, labels)
+        first = torch.log_softmax(state.logits[0].float(), dim=-1)
+        totals = torch.tensor([first[ids[0]].item() for ids in label_ids])
+
+        width = max(len(ids) for ids in label_ids) - 1
+        if width > 0:
+            n_labels, device = len(labels), state.attn.device
+            pad_id = self.tokenizer.pad_token_id
+            x = torch.full((n_labels, width), pad_id, dtype=torch.long, device=device)
+            for i, ids in enumerate(label_ids):
+                if len(ids) > 1:
+                    x[i, :len(ids) - 1] = torch.tensor(ids[:-1], device=device)
+            prefix_len = state.attn.shape[1]
+            attn = torch.ones((n_labels, prefix_len + width), dtype=torch.long, device=device)
+            for i, ids in enumerate(label_ids):
+                attn[i, prefix_len + len(ids) - 1:] = 0
+            pos = torch.arange(prefix_len, prefix_len + width, device=device)[None, :].expand(n_labels, -1)
+            past = DynamicCache.from_legacy_cache(tuple(
+                (k.expand(n_labels, -1, -1, -1), v.expand(n_labels, -1, -1, -1)) for k, v in _legacy(state.past)
+            ))
+            with self._lock:
+                out = self.model(input_ids=x, attention_mask=attn, position_ids=pos, past_key_values=past, use_cache=False)
+            logp = torch.log_softmax(out.logits.float(), dim=-1)
+            for i, ids in enumerate(label_ids):
+                for j, tok in enumerate(ids[1:]):
+                    totals[i] += logp[i, j, tok].item()
+
+        means = totals / torch.tensor([float(len(ids)) for ids in label_ids])
+        probs = torch.softmax(means, dim=0).tolist()
+        return sorted(zip(labels, probs), key=lambda x: x[1], reverse=True)
+
+    def _label_ids(self, messages: List[Dict[str, str]], labels: List[str]) -> List[List[int]]:
+        """
+        생성 프롬프트 끝(마지막 64자) 뒤에 라벨을 붙여 토큰화하고 라벨 부분만 사용. 경계에서 토큰이 병합되어
+        프롬프트 토큰이 그대로 남지 않으면 라벨만 따로 토큰화.
+        """
+        tail = self.tokenizer.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)[-64:]
+        base = self.tokenizer(tail, add_special_tokens=False)["input_ids"]
+        out = []
+        for label in labels:
+            ids = self.tokenizer(tail + label, add_special_tokens=False)["input_ids"]
+            if ids[:len(base)] == base and len(ids) > len(base):
+                out.append(ids[len(base):])
             else:
-                gen_kwargs.update({"do_sample": False})
-            out = self.model.generate(**gen_kwargs)
-        gen_ids = out[0][input_ids.shape[-1]:]
-        return self.tokenizer.decode(gen_ids, skip_special_tokens=True).strip()
\ No newline at end of file
+                out.append(self.tokenizer(label, add_special_tokens=False)["input_ids"])
+        return out
+
+    # ===== 추측 디코딩(complete(speculate=...)) =====
+    def _draft_model(self) -> Any:
+        """초안 모델(spec_draft_model)을 처음 쓸 때 로드. 어휘가 다르거나 설정이 없으면 None(경고 후 일반 경로)."""
+        with self._draft_lock:
+            if self._draft is None:
+                self._draft = False
+                draft_id = self.spec_draft_model
+                if not draft_id:
+                    log.warning("[SPEC] draft mode requested but SPEC_DRAFT_MODEL is not set")
+                elif AutoTokenizer.from_pretrained(draft_id).get_vocab() != self.tokenizer.get_vocab():
+                    log.warning("[SPEC] draft model %s has a different vocabulary; disabled", draft_id)
+                else:
+                    self._draft, stats = load_model(draft_id, self.profile)
+                    log.info("[SPEC] draft model %s loaded %s", draft_id, stats)
+            return self._draft or None
+
+    def _drafter(self, mode: str) -> Any:
+        if mode == "ngram":
+            return NgramDrafter(max_ngram=SPEC_NGRAM_MAX)
+        if mode == "draft":
+            model = self._draft_model()
+            return DraftModelDrafter(model, int(self.model.config.vocab_size)) if model is not None else None
+        raise ValueError(f"unknown speculative mode: {mode}")
+
+    def _verify(self, row: torch.Tensor, req: GenRequest, proposed: int) -> int:
+        """
+        초안 토큰 하나 검증. 초안이 결정적(한 토큰에 확률 1)이므로 수락 확률은 대상 분포의 p(proposed),
+        거절되면 proposed 를 뺀 대상 분포에서 다시 뽑음 → 대상 모델 단독 샘플링과 같은 분포. greedy 면 argmax 비교.
+        """
+        if not req.do_sample:
+            return int(row.argmax())
+        probs = self._warp(row.float()[None, :] / max(req.temperature, 1e-5)).softmax(dim=-1)[0]
+        if torch.rand(()) < probs[proposed]:
+            return proposed
+        probs[proposed] = 0.0
+        if float(probs.sum()) <= 0.0:
+            return proposed
+        return int(torch.multinomial(probs, 1))
+
+    @torch.no_grad()
+    def _speculate(self, req: GenRequest, drafter: Any) -> List[int]:
+        """
+        추측 디코딩 단건 실행. 라운드마다 초안 k 토큰을 받아 [직전 토큰 + 초안] 을 한 번의 forward 로 검증하고,
+        앞에서부터 맞은 만큼 + 대상 모델 토큰 1개를 확정. 틀린 초안의 KV 는 잘라냄.
+        제약 디코딩 요청은 일반 경로로.
+        """
+        if req.constraint is not None:
+            return self._run([req])[0]
+        state = self.prefill([req])
+        past, n_kv = state.past, state.attn.shape[1]
+        device = state.attn.device
+        t0 = time.perf_counter()
+        rounds = drafted = accepted = 0
+        pending = int(self._sample(state.logits, [req])[0])
+        done = self._advance(req, pending)
+        while not done:
+            k = min(self.spec_num_tokens, req.max_new_tokens - len(req.output_ids))
+            ctx = req.input_ids + req.output_ids
+            draft = drafter.propose(ctx, k) if k > 0 else []
+            feed = [pending] + draft
+            x = torch.tensor([feed], dtype=torch.long, device=device)
+            attn = torch.ones((1, n_kv + len(feed)), dtype=torch.long, device=device)
+            pos = torch.arange(n_kv, n_kv + len(feed), device=device)[None, :]
+            with self._lock:
+                out = self.model(input_ids=x, attention_mask=attn, position_ids=pos, past_key_values=past, use_cache=True)
+            rows = out.logits[0]
+            rounds, drafted = rounds + 1, drafted + len(draft)
+            n_ok = 0
+            for i, tok in enumerate(draft):
+                picked = self._verify(rows[i], req, tok)
+                if picked != tok:
+                    pending = picked
+                    break
+                n_ok += 1
+                if self._advance(req, tok):
+                    done = True
+                    break
+            else:
+                pending = int(self._sample(rows[len(draft)][None, :], [req])[0])
+            accepted += n_ok
+            # 확정된 토큰(직전 토큰 + 맞은 초안)까지만 KV 유지. 새 pending 토큰은 다음 라운드에 입력
+            n_kv += 1 + n_ok
+            past = crop_cache(out.past_key_values, n_kv)
+            drafter.accept(len(ctx) + n_ok)
+            if not done:
+                done = self._advance(req, pending)
+        decode_s = time.perf_counter() - t0
+        self._add_perf(decode_tokens=len(req.output_ids), decode_s=decode_s)
+        self.spec_stats.add(drafter.name, rounds, drafted, accepted, len(req.output_ids), decode_s)
+        log.info("[SPEC] %s tokens=%d rounds=%d accepted=%d/%d %.1f tok/s", drafter.name, len(req.output_ids),
+                 rounds, accepted, drafted, len(req.output_ids) / decode_s if decode_s else 0.0)
+        self._observe([req])
+        if req.session is not None:
+            n = len(req.input_ids) + len(req.output_ids) - 1
+            self._store_session(DecodeState(
+                reqs=[req], past=crop_cache(past, n), attn=torch.ones((1, n), dtype=torch.long, device=device), logits=state.logits,
+            ), 0)
+        return req.output_ids
+
+    # ===== 배치 디코딩 엔진(BatchScheduler 가 호출) =====
+    def size(self, state: DecodeState) -> int:
+        return len(state.reqs)
+
+    def requests(self, state: DecodeState) -> List[GenRequest]:
+        return state.reqs
+
+    def prefill(self, reqs: List[GenRequest]) -> DecodeState:
+        """세션/접두 캐시 적중 행은 나머지 토큰만, 나머지 행은 좌측 패딩으로 묶어 한 번에 prefill."""
+        t0 = time.perf_counter()
+        states, cold = [], []
+        for r in reqs:
+            if r.started_at is None:
+                r.started_at = t0
+            hit = None
+            if r.session is not None:
+                hit = self.session_cache.lookup(r.session, r.input_ids)
+            if self.prefix_cache is not None:
+                p = self.prefix_cache.lookup(r.input_ids)
+                if p is not None and (hit is None or p[1] > hit[1]):
+                    hit = p
+            if hit is None:
+                cold.append(r)
+            else:
+                states.append(self._prefill_cached(r, *hit))
+        if cold:
+            states.append(self._prefill_rows(cold))
+        state = states[0]
+        for s in states[1:]:
+            state = self.merge(state, s)
+        self._add_perf(prefill_tokens=sum(len(r.input_ids) for r in reqs), prefill_s=time.perf_counter() - t0)
+        return state
+
+    @torch.no_grad()
+    def _prefill_cached(self, req: GenRequest, layers: Any, n_cached: int) -> DecodeState:
+        device = self.model.device
+        n = len(req.input_ids)
+        ids = torch.tensor([req.input_ids[n_cached:]], dtype=torch.long, device=device)
+        attn = torch.ones((1, n), dtype=torch.long, device=device)
+        pos = torch.arange(n_cached, n, device=device)[None, :]
+        with self._lock:
+            out = self.model(
+                input_ids=ids, attention_mask=attn, position_ids=pos,
+                past_key_values=DynamicCache.from_legacy_cache(layers), use_cache=True,
+            )
+        return DecodeState(reqs=[req], past=out.past_key_values, attn=attn, logits=out.logits[:, -1, :])
+
+    @torch.no_grad()
+    def _prefill_rows(self, reqs: List[GenRequest]) -> DecodeState:
+        device = self.model.device
+        pad_id = self.tokenizer.pad_token_id
+        width = max(len(r.input_ids) for r in reqs)
+        ids = torch.full((len(reqs), width), pad_id, dtype=torch.long)
+        attn = torch.zeros((len(reqs), width), dtype=torch.long)
+        for i, r in enumerate(reqs):
+            n = len(r.input_ids)
+            ids[i, width - n:] = torch.tensor(r.input_ids, dtype=torch.long)
+            attn[i, width - n:] = 1
+        ids, attn = ids.to(device), attn.to(device)
+        pos = (attn.cumsum(-1) - 1).clamp(min=0)
+        with self._lock:
+            out = self.model(input_ids=ids, attention_mask=attn, position_ids=pos, use_cache=True)
+        return DecodeState(reqs=list(reqs), past=out.past_key_values, attn=attn, logits=out.logits[:, -1, :])
+
+    def merge(self, a: DecodeState, b: DecodeState) -> DecodeState:
+        """실행 중인 배치에 새로 prefill 한 행들을 합류(짧은 쪽 KV 를 좌측 패딩)."""
+        la, lb = a.attn.shape[1], b.attn.shape[1]
+        width = max(la, lb)
+        ka = _left_pad(_legacy(a.past), width - la)
+        kb = _left_pad(_legacy(b.past), width - lb)
+        layers = tuple(
+            (torch.cat([k1, k2], dim=0), torch.cat([v1, v2], dim=0))
+            for (k1, v1), (k2, v2) in zip(ka, kb)
+        )
+        attn = torch.cat([
+            torch.cat([a.attn.new_zeros(a.attn.shape[0], width - la), a.attn], dim=1),
+            torch.cat([b.attn.new_zeros(b.attn.shape[0], width - lb), b.attn], dim=1),
+        ], dim=0)
+        return DecodeState(
+            reqs=a.reqs + b.reqs,
+            past=DynamicCache.from_legacy_cache(layers),
+            attn=attn,
+            logits=torch.cat([a.logits, b.logits], dim=0),
+        )
+
+    def _sample(self, logits: torch.Tensor, reqs: List[GenRequest]) -> torch.Tensor:
+        """행별 제약 마스크와 temperature/do_sample 을 적용해 다음 토큰 선택."""
+        logits = logits.float()
+        constrained = [i for i, r in enumerate(reqs) if r.constraint is not None]
+        if constrained:
+            allowed = torch.ones_like(logits, dtype=torch.bool)
+            for i in constrained:
+                allowed[i] = reqs[i].constraint.mask().to(logits.device)
+            logits = logits.masked_fill(~allowed, float("-inf"))
+        picked = logits.argmax(dim=-1)
+        rows = [i for i, r in enumerate(reqs) if r.do_sample]
+        if not rows:
+            return picked
+        idx = torch.tensor(rows, device=logits.device)
+        temps = torch.tensor([max(reqs[i].temperature, 1e-5) for i in rows], device=logits.device)
+        probs = self._warp(logits.index_select(0, idx) / temps[:, None]).softmax(dim=-1)
+        picked[idx] = torch.multinomial(probs, 1).squeeze(-1)
+        return picked
+
+    def _warp(self, scores: torch.Tensor) -> torch.Tensor:
+        """temperature 를 적용한 점수에 generation_config 의 top_k / top_p 를 적용."""
+        if 0 < self._top_k < scores.shape[-1]:
+            kth = torch.topk(scores, self._top_k, dim=-1).values[:, -1:]
+            scores = scores.masked_fill(scores < kth, float("-inf"))
+        if self._top_p < 1.0:
+            sorted_scores, sorted_idx = torch.sort(scores, descending=True, dim=-1)
+            sorted_probs = sorted_scores.softmax(dim=-1)
+            remove = sorted_probs.cumsum(dim=-1) - sorted_probs > self._top_p
+            scores = scores.scatter(-1, sorted_idx, sorted_scores.masked_fill(remove, float("-inf")))
+        return scores
+
+    def _store_session(self, state: DecodeState, row: int) -> None:
+        """끝난 행의 KV(좌측 패딩 제거)를 세션 캐시에 보관. 마지막 샘플 토큰은 KV 에 없음."""
+        r = state.reqs[row]
+        n = int(state.attn[row].sum().item())
+        start = state.attn.shape[1] - n
+        layers = tuple(
+            (k[row:row + 1, :, start:, :].clone(), v[row:row + 1, :, start:, :].clone())
+            for k, v in _legacy(state.past)
+        )
+        self.session_cache.store(r.session, r.input_ids + r.output_ids[:-1], layers)
+
+    def _advance(self, r: GenRequest, tok: int) -> bool:
+        """행에 토큰 하나를 추가(제약/스트리밍/중단 조건 반영). 끝났으면 True."""
+        if not r.output_ids:
+            r.first_token_at = time.perf_counter()
+        r.output_ids.append(tok)
+        if r.constraint is not None:
+            r.constraint.advance(tok)
+        delta = r.decoder.push(tok) if r.decoder is not None else ""
+        stopped = r.stop is not None and bool(delta) and r.stop.feed(delta)
+        done = stopped or (r.constraint is not None and r.constraint.done)
+        done = done or tok in self._eos_ids or len(r.output_ids) >= r.max_new_tokens
+        if r.on_token is not None:
+            # 중단 문자열이 있으면 그 앞부분일 수 있는 꼬리는 보류(중단 문자열 조각이 스트림에 새지 않도록)
+            out = r.stop.release(done) if r.stop is not None else delta
+            if out:
+                try:
+                    r.on_token(out)
+                except GenerationCancelled:
+                    log.info("[STREAM] consumer gone; stopping after %d tokens", len(r.output_ids))
+                    r.on_token, done = None, True
+                except Exception:
+                    log.exception("[STREAM] on_token failed; streaming disabled for this request")
+                    r.on_token = None
+        if done:
+            r.finished_at = time.perf_counter()
+        return done
+
+    def split(self, state: DecodeState) -> List[DecodeState]:
+        """배치를 행별 상태로 나눔(실패한 스텝을 행마다 다시 실행해 문제 행만 골라낼 때)."""
+        rows = []
+        for i, r in enumerate(state.reqs):
+            sel = torch.tensor([i], device=state.attn.device)
+            past = DynamicCache.from_legacy_cache(tuple(
+                (k.index_select(0, sel), v.index_select(0, sel)) for k, v in _legacy(state.past)
+            ))
+            past, attn = _compact(past, state.attn.index_select(0, sel))
+            rows.append(DecodeState(
+                reqs=[r], past=past, attn=attn,
+                logits=state.logits[i:i + 1] if state.logits is not None else None,
+                pending=state.pending[i:i + 1] if state.pending is not None else None,
+            ))
+        return rows
+
+    @torch.no_grad()
+    def step(self, state: DecodeState) -> Tuple[Optional[DecodeState], List[GenRequest]]:
+        """
+        토큰 하나를 디코딩. 끝난 행은 배치에서 제외하고 반환(끝난 행이 생기면 왼쪽 공통 패딩도 잘라냄).
+        - 행 하나의 토큰 처리(제약/중단 조건)에서 난 예외는 그 행의 error 로 기록하고 끝난 행으로 반환
+        - 토큰을 행에 추가한 뒤 forward 가 실패하면 BatchStepError(재시도용 pending 상태)
+        """
+        t0 = time.perf_counter()
+        finished: List[GenRequest] = []
+        if state.pending is None:
+            nxt = self._sample(state.logits, state.reqs)
+            self._add_perf(decode_tokens=len(state.reqs))
+            keep = []
+            for i, (r, tok) in enumerate(zip(state.reqs, nxt.tolist())):
+                try:
+                    done = self._advance(r, tok)
+                    if done and r.session is not None:
+                        self._store_session(state, i)
+                except Exception as e:
+                    log.exception("[BATCH] row failed; dropping it from the batch")
+                    r.error, done = e, True
+                if done:
+                    finished.append(r)
+                else:
+                    keep.append(i)
+            if not keep:
+                self._add_perf(decode_s=time.perf_counter() - t0)
+                return None, finished
+
+            past, attn = state.past, state.attn
+            if len(keep) < len(state.reqs):
+                sel = torch.tensor(keep, device=attn.device)
+                past = DynamicCache.from_legacy_cache(tuple(
+                    (k.index_select(0, sel), v.index_select(0, sel)) for k, v in _legacy(past)
+                ))
+                past, attn = _compact(past, attn.index_select(0, sel))
+                nxt = nxt.index_select(0, sel.to(nxt.device))
+            state = DecodeState(reqs=[state.reqs[i] for i in keep], past=past, attn=attn, logits=None, pending=nxt)
+
+        attn = torch.cat([state.attn, state.attn.new_ones(state.attn.shape[0], 1)], dim=1)
+        pos = attn.sum(dim=-1, keepdim=True) - 1
+        try:
+            with self._lock:
+                out = self.model(
+                    input_ids=state.pending[:, None].to(attn.device), attention_mask=attn, position_ids=pos,
+                    past_key_values=state.past, use_cache=True,
+                )
+        except Exception as e:
+            self._add_perf(decode_s=time.perf_counter() - t0)
+            # 실패한 forward 가 일부 층의 KV 에 새 토큰을 붙였을 수 있으므로 입력 전 길이로 되돌려 넘김
+            state.past = crop_cache(state.past, state.attn.shape[1])
+            raise BatchStepError(state, finished, e) from e
+        self._add_perf(decode_s=time.perf_counter() - t0)
+        return DecodeState(reqs=state.reqs, past=out.past_key_values, attn=attn, logits=out.logits[:, -1, :]), finished
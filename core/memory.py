@@ -1,6 +1,31 @@
-from typing import Dict, List, Optional, Any
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
 from capstone_ai.core.system_prompt import DEFAULT_SYSTEM_PROMPT
+from capstone_ai.core.session_store import SessionStore, VersionConflict
+from capstone_ai.config import HISTORY_TOKEN_BUDGET, HISTORY_MAX_SESSIONS, HISTORY_SESSION_TTL_S, HISTORY_TOOL_MAX_ITEMS
+from capstone_ai.config import HISTORY_COMPACT_TRIGGER_TOKENS, HISTORY_COMPACT_KEEP_MESSAGES
+
+SUMMARY_TAG = "[SUMMARY]"
+STORE_NS = "history"
+
+
+def _estimate_tokens(text: str) -> int:
+    """토크나이저가 없을 때의 근사치(한국어/영어 혼합 기준 대략 2글자당 1토큰)."""
+    return len(text) // 2 + 1
+
+
+@dataclass
+class _Session:
+    chat: List[Dict[str, Any]]
+    tokens: List[int]                      # chat 메시지별 토큰 수(append 시 1회 계산)
+    tool: List[Dict[str, Any]] = field(default_factory=list)
+    version: int = 0                       # 저장소 버전(store 사용 시). 0 = 아직 저장 안 됨
+    last_access: float = field(default_factory=time.monotonic)
 
 
 class InMemoryHistory:
@@ -8,22 +33,272 @@ class InMemoryHistory:
     히스토리 분리 정책
     - 일반 대화용(chat): 시스템 프롬프트/컨텍스트 포함. NLG 등 모델 입력의 기본 히스토리.
     - 툴(clarify)용(tool): 'clarify' 왕복만 누적. 실행 완료 후에는 필요 시 clear_tool()로 정리.
+    - 여러 스레드(추론 풀/이벤트 루프)에서 접근하므로 변경은 세션별 잠금 + _lock 안에서 수행.
+
+    메모리 상한
+    - 세션별 토큰 예산(budget_tokens): 넘으면 가장 오래된 대화 턴부터 제거. 앞쪽 system/[CONTEXT] 는 항상 유지
+    - 세션 수 상한(max_sessions, LRU) + 유휴 TTL(ttl_s, 0 이면 끔)
+    - 턴 제거/세션 제거도 rewrite 리스너로 알림(세션 KV 캐시 무효화)
+
+    압축(compaction, HistoryCompactor 가 백그라운드에서 수행)
+    - 고정 메시지 뒤 대화가 compact_trigger_tokens 를 넘으면 최근 keep_recent 개를 제외한 턴을 압축 대기열에 올림
+    - 압축 결과는 [SUMMARY] system 메시지 하나로 유지되고, 다음 압축은 이전 요약 + 새로 밀려난 턴만 요약(증분)
+    - 예산 트리밍은 압축이 따라잡지 못할 때의 최종 상한
+
+    저장소(store, 선택)
+    - 주면 세션을 SessionStore 에 저장해 여러 워커가 공유. 로컬 세션은 캐시이며 접근마다 버전으로 검증
+    - 변경은 버전 CAS 로 저장하고, 다른 워커가 먼저 썼으면(VersionConflict) 잠시 뒤 다시 읽어 같은 변경을 재적용
+    - LRU/TTL 제거는 로컬 캐시에서만. 저장소의 세션 행은 저장소가 SESSION_STORE_TTL_S 기준으로 정리
+    - store 가 없으면(SESSION_STORE=memory) 직렬화 없이 로컬 세션만 사용
     """
 
-    def __init__(self) -> None:
-        self._chat: Dict[str, List[Dict[str, Any]]] = {}
-        self._tool: Dict[str, List[Dict[str, Any]]] = {}
+    MAX_RETRIES = 16
+    RETRY_BACKOFF_S = 0.002
+    RETRY_BACKOFF_MAX_S = 0.05
+
+    def __init__(
+        self,
+        token_counter: Optional[Callable[[str], int]] = None,
+        budget_tokens: int = HISTORY_TOKEN_BUDGET,
+        max_sessions: int = HISTORY_MAX_SESSIONS,
+        ttl_s: float = HISTORY_SESSION_TTL_S,
+        max_tool_items: int = HISTORY_TOOL_MAX_ITEMS,
+        compact_trigger_tokens: int = HISTORY_COMPACT_TRIGGER_TOKENS,
+        keep_recent: int = HISTORY_COMPACT_KEEP_MESSAGES,
+        store: Optional[SessionStore] = None,
+    ) -> None:
+        self.count_tokens = token_counter or _estimate_tokens
+        self.budget_tokens = int(budget_tokens)
+        self.max_sessions = int(max_sessions)
+        self.ttl_s = float(ttl_s)
+        self.max_tool_items = int(max_tool_items)
+        self.compact_trigger_tokens = int(compact_trigger_tokens)
+        self.keep_recent = max(1, int(keep_recent))
+        self.store = store
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._rewrite_listeners: List[Callable[[str], None]] = []
+        self._lock = threading.RLock()
+        self._stripes = [threading.RLock() for _ in range(64)]
+        self._compact_pending: "OrderedDict[str, None]" = OrderedDict()
+        self._compacting: set = set()
+        self.compaction_ready = threading.Event()
+        self._stats = {
+            "trimmed_messages": 0, "evicted_lru": 0, "evicted_ttl": 0,
+            "compactions": 0, "compacted_messages": 0, "store_conflicts": 0,
+        }
+
+    def add_rewrite_listener(self, fn: Callable[[str], None]) -> None:
+        """앞쪽 메시지(system/[CONTEXT])가 바뀌거나, 오래된 턴/세션이 제거될 때 호출될 콜백 등록(예: 세션 KV 캐시 무효화)."""
+        self._rewrite_listeners.append(fn)
+
+    def _notify_rewrite(self, cid: str) -> None:
+        for fn in self._rewrite_listeners:
+            fn(cid)
+
+    def _notify_all(self, cids: List[str]) -> None:
+        for cid in cids:
+            self._notify_rewrite(cid)
+
+    def _cid_lock(self, cid: str) -> threading.RLock:
+        return self._stripes[hash(cid) % len(self._stripes)]
+
+    def _new_session(self) -> _Session:
+        return _Session(
+            chat=[{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}],
+            tokens=[self.count_tokens(DEFAULT_SYSTEM_PROMPT)],
+        )
+
+    def _load(self, cid: str) -> Optional[_Session]:
+        got = self.store.load(STORE_NS, cid)
+        if got is None:
+            return None
+        version, data = got
+        return _Session(chat=data["chat"], tokens=data["tokens"], tool=data.get("tool", []), version=version)
+
+    def _session(self, cid: str) -> _Session:
+        """
+        세션 조회(없으면 시스템 프롬프트로 초기화) + LRU 갱신. 호출 측에서 _cid_lock(cid) 보유.
+        store 가 있으면 로컬 캐시의 버전을 저장소와 비교해 다르면 다시 읽음.
+        """
+        with self._lock:
+            s = self._sessions.get(cid)
+        if self.store is not None:
+            current = self.store.version(STORE_NS, cid)
+            if s is None or current != (s.version or None):
+                s = self._load(cid) if current is not None else None
+        if s is None:
+            s = self._new_session()
+        with self._lock:
+            self._sessions[cid] = s
+            self._sessions.move_to_end(cid)
+        s.last_access = time.monotonic()
+        return s
+
+    def _mutate(self, cid: str, fn: Callable[[_Session], Tuple[bool, bool]]) -> bool:
+        """
+        fn(session) -> (저장 필요, rewrite 알림 필요). store 가 있으면 버전 CAS 로 저장하고 충돌 시 재적용.
+        반환값: rewrite 알림 여부.
+        """
+        with self._cid_lock(cid):
+            for attempt in range(self.MAX_RETRIES):
+                s = self._session(cid)
+                with self._lock:
+                    dirty, notify = fn(s)
+                if self.store is None or not dirty:
+                    break
+                try:
+                    s.version = self.store.save(
+                        STORE_NS, cid, {"chat": s.chat, "tokens": s.tokens, "tool": s.tool}, s.version
+                    )
+                    break
+                except VersionConflict:
+                    with self._lock:
+                        self._stats["store_conflicts"] += 1
+                        self._sessions.pop(cid, None)
+                    # 같은 세션을 쓰는 다른 워커와 엇갈려 계속 충돌하지 않도록 지터 백오프
+                    time.sleep(random.uniform(0, min(self.RETRY_BACKOFF_MAX_S, self.RETRY_BACKOFF_S * (2 ** attempt))))
+            else:
+                raise VersionConflict(f"{STORE_NS}:{cid}")
+        with self._lock:
+            evicted = self._evict()
+        self._notify_all(([cid] if notify else []) + evicted)
+        return notify
+
+    def _evict(self) -> List[str]:
+        """TTL 만료 → 세션 수 초과 순으로 가장 오래 쓰지 않은 세션 제거. 제거된 cid 반환."""
+        evicted: List[str] = []
+        now = time.monotonic()
+        if self.ttl_s > 0:
+            while self._sessions:
+                cid, s = next(iter(self._sessions.items()))
+                if now - s.last_access < self.ttl_s:
+                    break
+                self._sessions.popitem(last=False)
+                self._compact_pending.pop(cid, None)
+                self._stats["evicted_ttl"] += 1
+                evicted.append(cid)
+        while self.max_sessions > 0 and len(self._sessions) > self.max_sessions:
+            cid, _ = self._sessions.popitem(last=False)
+            self._compact_pending.pop(cid, None)
+            self._stats["evicted_lru"] += 1
+            evicted.append(cid)
+        return evicted
+
+    @staticmethod
+    def _pinned(s: _Session) -> int:
+        """앞쪽 system 메시지(시스템 프롬프트, [CONTEXT], 요약 등) 개수 — 예산 초과 시에도 유지."""
+        n = 0
+        while n < len(s.chat) and s.chat[n]["role"] == "system":
+            n += 1
+        return n
+
+    def _trim(self, s: _Session) -> bool:
+        """예산을 넘으면 고정 메시지 뒤의 가장 오래된 메시지부터 제거. 마지막 user 메시지 이후(현재 턴)는 유지."""
+        if self.budget_tokens <= 0:
+            return False
+        start = self._pinned(s)
+        last_user = max((i for i in range(start, len(s.chat)) if s.chat[i]["role"] == "user"), default=len(s.chat) - 1)
+        n_drop, total = 0, sum(s.tokens)
+        while total > self.budget_tokens and start + n_drop < last_user:
+            total -= s.tokens[start + n_drop]
+            n_drop += 1
+        # 턴 경계 유지: 남은 대화가 assistant 로 시작하지 않도록
+        while start + n_drop < last_user and s.chat[start + n_drop]["role"] == "assistant":
+            n_drop += 1
+        if n_drop == 0:
+            return False
+        del s.chat[start:start + n_drop], s.tokens[start:start + n_drop]
+        self._stats["trimmed_messages"] += n_drop
+        return True
+
+    # ===== 압축(compaction) =====
+    def _maybe_queue_compaction(self, cid: str, s: _Session) -> None:
+        if self.compact_trigger_tokens <= 0 or cid in self._compact_pending or cid in self._compacting:
+            return
+        start = self._pinned(s)
+        if len(s.chat) - start > self.keep_recent and sum(s.tokens[start:]) > self.compact_trigger_tokens:
+            self._compact_pending[cid] = None
+            self.compaction_ready.set()
+
+    @staticmethod
+    def _summary_index(s: _Session) -> Optional[int]:
+        for i in range(InMemoryHistory._pinned(s)):
+            if s.chat[i]["content"].startswith(SUMMARY_TAG):
+                return i
+        return None
+
+    def take_compaction_batch(self, max_n: int) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """압축 대기 세션을 최대 max_n 개 꺼냄: (cid, 이전 요약 본문, 새로 밀려난 턴들)."""
+        out = []
+        with self._lock:
+            while self._compact_pending and len(out) < max_n:
+                cid, _ = self._compact_pending.popitem(last=False)
+                s = self._sessions.get(cid)
+                if s is None:
+                    continue
+                start = self._pinned(s)
+                end = len(s.chat) - self.keep_recent
+                # 최근 구간이 user 턴에서 시작하도록 경계 조정
+                while end > start and s.chat[end]["role"] != "user":
+                    end -= 1
+                if end <= start:
+                    continue
+                idx = self._summary_index(s)
+                prev = s.chat[idx]["content"][len(SUMMARY_TAG):].strip() if idx is not None else ""
+                self._compacting.add(cid)
+                out.append((cid, prev, list(s.chat[start:end])))
+            if not self._compact_pending:
+                self.compaction_ready.clear()
+        return out
+
+    def apply_compaction(self, cid: str, turns: List[Dict[str, Any]], summary: Optional[str]) -> bool:
+        """
+        압축 결과 반영: 요약한 턴들을 [SUMMARY] 메시지로 대체. 그 사이 해당 턴이 트리밍/재작성되었으면 버림.
+        summary 가 None 이면(요약 실패) 대기 상태만 해제.
+        """
+        with self._lock:
+            self._compacting.discard(cid)
+            if not summary or cid not in self._sessions:
+                return False
+        msg = {"role": "system", "content": f"{SUMMARY_TAG} {summary.strip()}"}
+        n_msg = self.count_tokens(msg["content"])
+
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            start = self._pinned(s)
+            if s.chat[start:start + len(turns)] != turns:
+                return False, False
+            del s.chat[start:start + len(turns)], s.tokens[start:start + len(turns)]
+            idx = self._summary_index(s)
+            if idx is None:
+                s.chat.insert(start, msg)
+                s.tokens.insert(start, n_msg)
+            else:
+                s.chat[idx] = msg
+                s.tokens[idx] = n_msg
+            self._stats["compactions"] += 1
+            self._stats["compacted_messages"] += len(turns)
+            return True, True
+
+        return self._mutate(cid, fn)
 
-    def _ensure_chat_session(self, cid: str) -> None:
-        """세션이 없으면 시스템 프롬프트로 초기화."""
-        if cid not in self._chat:
-            self._chat[cid] = [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}]
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "messages": sum(len(s.chat) + len(s.tool) for s in sessions),
+                "tokens": sum(sum(s.tokens) for s in sessions),
+                "bytes": sum(
+                    len(m["content"].encode("utf-8")) for s in sessions for m in s.chat + s.tool
+                ),
+                "compaction_pending": len(self._compact_pending),
+                **self._stats,
+            }
 
     # ===== 기존 인터페이스(하위 호환) =====
     def get(self, cid: str) -> List[Dict[str, Any]]:
         """하위 호환: 일반 대화 히스토리를 반환."""
-        self._ensure_chat_session(cid)
-        return self._chat[cid]
+        return self.get_chat(cid)
 
     def append(self, cid: str, role: str, content: str) -> None:
         """하위 호환: 일반 대화 히스토리에 추가."""
@@ -31,12 +306,27 @@ class InMemoryHistory:
 
     # ===== 일반 대화(Chat) =====
     def get_chat(self, cid: str) -> List[Dict[str, Any]]:
-        self._ensure_chat_session(cid)
-        return self._chat[cid]
+        """히스토리 스냅샷(얕은 복사). 모델 입력 중 다른 스레드의 append 와 섞이지 않음."""
+        with self._cid_lock(cid):
+            s = self._session(cid)
+            with self._lock:
+                out = list(s.chat)
+        with self._lock:
+            evicted = self._evict()
+        self._notify_all(evicted)
+        return out
 
     def append_chat(self, cid: str, role: str, content: str) -> None:
-        self._ensure_chat_session(cid)
-        self._chat[cid].append({"role": role, "content": content})
+        n = self.count_tokens(content)
+
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            s.chat.append({"role": role, "content": content})
+            s.tokens.append(n)
+            trimmed = self._trim(s)
+            self._maybe_queue_compaction(cid, s)
+            return True, trimmed
+
+        self._mutate(cid, fn)
 
     def ensure_system(self, cid: str, system_prompt: Optional[str], *, override: bool = True) -> None:
         """
@@ -46,13 +336,23 @@ class InMemoryHistory:
         """
         if system_prompt is None:
             return
-        self._ensure_chat_session(cid)
-        msgs = self._chat[cid]
-        if override or msgs[0]["role"] != "system":
+        n = self.count_tokens(system_prompt)
+
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            msgs = s.chat
+            if not (override or msgs[0]["role"] != "system"):
+                return False, False
             if msgs and msgs[0]["role"] == "system":
-                msgs[0]["content"] = system_prompt
+                if msgs[0]["content"] == system_prompt:
+                    return False, False
+                msgs[0] = {"role": "system", "content": system_prompt}
+                s.tokens[0] = n
             else:
                 msgs.insert(0, {"role": "system", "content": system_prompt})
+                s.tokens.insert(0, n)
+            return True, True
+
+        self._mutate(cid, fn)
 
     def ensure_context(self, cid: str, ctx: Dict[str, Any]) -> None:
         """
@@ -61,32 +361,53 @@ class InMemoryHistory:
         """
         from capstone_ai.core.context import format_context
 
-        self._ensure_chat_session(cid)
-        msgs = self._chat[cid]
         ctx_str = format_context(ctx)
+        n = self.count_tokens(ctx_str)
 
-        if len(msgs) >= 2 and msgs[1]["role"] == "system" and msgs[1]["content"].startswith("[CONTEXT]"):
-            msgs[1]["content"] = ctx_str  # 기존 컨텍스트 갱신
-        else:
-            msgs.insert(1, {"role": "system", "content": ctx_str})
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            msgs = s.chat
+            if len(msgs) >= 2 and msgs[1]["role"] == "system" and msgs[1]["content"].startswith("[CONTEXT"):
+                if msgs[1]["content"] == ctx_str:
+                    return False, False
+                msgs[1] = {"role": "system", "content": ctx_str}  # 기존 컨텍스트 갱신
+                s.tokens[1] = n
+            else:
+                msgs.insert(1, {"role": "system", "content": ctx_str})
+                s.tokens.insert(1, n)
+            return True, True
+
+        self._mutate(cid, fn)
 
     def get_tool(self, cid: str) -> List[Dict[str, Any]]:
         """툴 clarify 히스토리 조회(모델 입력에는 기본적으로 사용하지 않음)."""
-        return self._tool.get(cid, [])
+        with self._cid_lock(cid):
+            s = self._session(cid)
+            with self._lock:
+                return list(s.tool)
 
     def append_tool(self, cid: str, role: str, content: str, meta: Optional[Dict[str, Any]] = None) -> None:
         """
-        clarify 왕복만 기록.
+        clarify 왕복만 기록(최근 max_tool_items 개 유지).
         meta 예시: {"type": "clarify", "tool": "change_role", "missing": ["projectId"...]}
         """
-        if cid not in self._tool:
-            self._tool[cid] = []
         item: Dict[str, Any] = {"role": role, "content": content}
         if meta:
             item["meta"] = meta
-        self._tool[cid].append(item)
+
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            s.tool.append(item)
+            if self.max_tool_items > 0 and len(s.tool) > self.max_tool_items:
+                del s.tool[:len(s.tool) - self.max_tool_items]
+            return True, False
+
+        self._mutate(cid, fn)
 
     def clear_tool(self, cid: str) -> None:
         """툴 clarify 히스토리 삭제(실행 완료 후 정리)."""
-        if cid in self._tool:
-            del self._tool[cid]
\ No newline at end of file
+        def fn(s: _Session) -> Tuple[bool, bool]:
+            if not s.tool:
+                return False, False
+            s.tool.clear()
+            return True, False
+
+        self._mutate(cid, fn)
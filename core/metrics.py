@@ -0,0 +1,91 @@
+import bisect
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# 기본 버킷: 지연(초) / 토큰 수 / 토큰·초
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (1, 4, 16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(x: float) -> str:
+    if x == math.inf:
+        return "+Inf"
+    return repr(float(x))
+
+
+def _selector(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs) + "}"
+
+
+class Histogram:
+    """
+    라벨별 누적 히스토그램(Prometheus histogram 과 같은 의미: _bucket{le}, _sum, _count).
+    observe() 는 여러 스레드(추론 스레드/배처/작업 워커)에서 호출되므로 락으로 보호.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # 라벨 값 → [버킷별 개수(비누적)..., +Inf 개수, 합]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, s in sorted(series.items()):
+            pairs = list(zip(self.labels, key))
+            acc = 0
+            for bound, n in zip(self.buckets + (math.inf,), s[:-1]):
+                acc += int(n)
+                lines.append(f"{self.name}_bucket{_selector(pairs + [('le', _fmt(bound))])} {acc}")
+            lines.append(f"{self.name}_sum{_selector(pairs)} {_fmt(s[-1])}")
+            lines.append(f"{self.name}_count{_selector(pairs)} {acc}")
+        return lines
+
+
+class Registry:
+    """프로세스 단위 지표 모음. /metrics 가 render() 결과(Prometheus 텍스트 형식 0.0.4)를 그대로 반환."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help, labels, buckets)
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from capstone_ai.config import MODEL_ID, LLM_PROFILE, MODEL_POOL, MODEL_POOL_MAX_INFLIGHT, MODEL_POOL_PROFILES, SPEC_DECODING
+from capstone_ai.core import tracing
+
+log = logging.getLogger("dna.llm")
+
+# 호출 용도: 라우팅(1토큰/라벨 점수), 파라미터 추출(JSON), 도구 결과 문장화, 일반 대화, 요약(회의록/히스토리 압축)
+PURPOSES = ("route", "extract", "nlg", "chat", "summarize")
+
+_CALLS = ("complete", "complete_json", "complete_function_call", "complete_many", "score_labels")
+# 추측 디코딩 모드(core/speculative.py)
+SPEC_MODES = ("ngram", "draft")
+
+
+def _percentile(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))] if s else 0.0
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """어휘·특수 토큰·채팅 템플릿이 같으면 같은 값(같은 토크나이저로 취급해 공유)."""
+    h = hashlib.sha1()
+    h.update(json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False).encode("utf-8"))
+    h.update(json.dumps(tokenizer.special_tokens_map, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    h.update(str(getattr(tokenizer, "chat_template", "") or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+class PurposeLLM:
+    """
+    용도 하나에 묶인 LLMClient 뷰. 생성 호출은 모델별 동시 실행 상한(세마포어) 안에서 실행하고
+    용도별 호출 수/대기·실행 지연/오류를 기록. 나머지 속성(tokenizer, register_prefix, background 등)은 그대로 위임.
+    speculate: 이 용도의 단건 complete() 에 기본으로 넘길 추측 디코딩 모드(호출에서 지정하면 그 값).
+    """
+
+    def __init__(self, pool: "ModelPool", purpose: str, model_id: str, client: Any, slots: Optional[threading.Semaphore],
+                 speculate: Optional[str] = None):
+        self.purpose = purpose
+        self.model_id = model_id
+        self.client = client
+        self.speculate = speculate
+        self._pool = pool
+        self._slots = slots
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if name == "complete" and self.speculate:
+            return lambda *args, **kwargs: self._call(attr, *args, **{"speculate": self.speculate, **kwargs})
+        if name in _CALLS:
+            return lambda *args, **kwargs: self._call(attr, *args, **kwargs)
+        return attr
+
+    def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        if self._slots is not None:
+            self._slots.acquire()
+        t1 = time.perf_counter()
+        if self._slots is not None:
+            tracing.record_wait("model_pool", t1 - t0)
+        ok = False
+        try:
+            out = fn(*args, **kwargs)
+            ok = True
+            return out
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+            self._pool._record(self.purpose, t1 - t0, time.perf_counter() - t1, ok)
+
+
+class ModelPool:
+    """
+    용도(route/extract/nlg/chat/summarize) → 모델. 분류에 가까운 단계는 작은 모델로 돌려 큰 모델 점유를 줄임.
+    - 같은 모델 ID 는 LLMClient 하나를 공유(배처·접두 KV 캐시 포함)
+    - 토크나이저는 어휘가 같으면(fingerprint) 한 객체를 공유 → 토큰 클래스(제약 디코딩) 계산도 한 번
+    - max_inflight: 모델별 동시 생성 호출 상한(0/없음 = 제한 없음). 넘으면 호출 스레드가 대기(wait 로 집계)
+    - speculative: 용도별 추측 디코딩 모드(ngram/draft). 해당 용도의 단건 complete() 에 적용
+    - report(): 용도별 모델, 호출 수, 오류, 대기/실행 지연(mean/p50/p95, 최근 window 건)
+    """
+
+    def __init__(self, models: Optional[Dict[str, str]] = None, default_model: str = MODEL_ID,
+                 profiles: Optional[Dict[str, str]] = None, max_inflight: Optional[Dict[str, int]] = None,
+                 factory: Optional[Callable[..., Any]] = None, window: int = 1024,
+                 speculative: Optional[Dict[str, str]] = None):
+        unknown = (set(models or {}) | set(speculative or {})) - set(PURPOSES)
+        if unknown:
+            raise ValueError(f"unknown model pool purpose: {', '.join(sorted(unknown))} (choose from {', '.join(PURPOSES)})")
+        bad = {m for m in (speculative or {}).values() if m not in SPEC_MODES + ("off",)}
+        if bad:
+            raise ValueError(f"unknown speculative mode: {', '.join(sorted(bad))} (choose from {', '.join(SPEC_MODES)}, off)")
+        self.speculative = {p: m for p, m in (speculative or {}).items() if m != "off"}
+        self.models = {p: (models or {}).get(p) or default_model for p in PURPOSES}
+        self.profiles = dict(profiles or {})
+        self.max_inflight = {k: int(v) for k, v in (max_inflight or {}).items()}
+        self._factory = factory
+        self._clients: Dict[str, Any] = {}
+        self._tokenizers: Dict[str, Any] = {}
+        self._slots: Dict[str, Optional[threading.Semaphore]] = {}
+        self._views: Dict[str, PurposeLLM] = {}
+        self._lock = threading.Lock()
+        self._window = int(window)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_config(cls) -> "ModelPool":
+        return cls(MODEL_POOL, MODEL_ID, MODEL_POOL_PROFILES, MODEL_POOL_MAX_INFLIGHT, speculative=SPEC_DECODING)
+
+    @classmethod
+    def single(cls, llm: Any) -> "ModelPool":
+        """이미 만든 클라이언트 하나로 모든 용도를 처리(테스트/벤치, 기존 동작)."""
+        pool = cls(default_model=getattr(llm, "model_id", "llm"), speculative=SPEC_DECODING)
+        pool._clients[pool.models["chat"]] = llm
+        return pool
+
+    def _tokenizer(self, model_id: str) -> Any:
+        from transformers import AutoTokenizer
+
+        tok = AutoTokenizer.from_pretrained(model_id)
+        fp = tokenizer_fingerprint(tok)
+        shared = self._tokenizers.setdefault(fp, tok)
+        if shared is not tok:
+            log.info("[POOL] %s shares tokenizer (same vocabulary)", model_id)
+        return shared
+
+    def _client(self, model_id: str) -> Any:
+        client = self._clients.get(model_id)
+        if client is None:
+            profile = self.profiles.get(model_id, LLM_PROFILE)
+            if self._factory is not None:
+                client = self._factory(model_id, profile)
+            else:
+                from capstone_ai.core.llm import LLMClient
+                client = LLMClient(model_id, profile=profile, tokenizer=self._tokenizer(model_id))
+            self._clients[model_id] = client
+            log.info("[POOL] loaded %s (%s) for %s", model_id, profile,
+                     ",".join(p for p in PURPOSES if self.models[p] == model_id))
+        return client
+
+    def get(self, purpose: str) -> PurposeLLM:
+        """용도별 뷰. 모델은 처음 요청될 때 로드."""
+        view = self._views.get(purpose)
+        if view is not None:
+            return view
+        if purpose not in PURPOSES:
+            raise ValueError(f"unknown model pool purpose: {purpose}")
+        with self._lock:
+            view = self._views.get(purpose)
+            if view is None:
+                model_id = self.models[purpose]
+                client = self._client(model_id)
+                if model_id not in self._slots:
+                    n = self.max_inflight.get(model_id, 0)
+                    self._slots[model_id] = threading.BoundedSemaphore(n) if n > 0 else None
+                view = self._views[purpose] = PurposeLLM(
+                    self, purpose, model_id, client, self._slots[model_id], self.speculative.get(purpose)
+                )
+        return view
+
+    def load_all(self) -> None:
+        for purpose in PURPOSES:
+            self.get(purpose)
+
+    def clients(self) -> Dict[str, Any]:
+        return dict(self._clients)
+
+    def _record(self, purpose: str, wait_s: float, run_s: float, ok: bool) -> None:
+        with self._lock:
+            s = self._stats.get(purpose)
+            if s is None:
+                s = self._stats[purpose] = {"calls": 0, "errors": 0, "wait": deque(maxlen=self._window),
+                                            "run": deque(maxlen=self._window)}
+            s["calls"] += 1
+            s["errors"] += 0 if ok else 1
+            s["wait"].append(wait_s)
+            s["run"].append(run_s)
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for purpose in PURPOSES:
+                s = self._stats.get(purpose)
+                row: Dict[str, Any] = {"model": self.models[purpose], "calls": 0, "errors": 0}
+                mode = self.speculative.get(purpose)
+                client = self._clients.get(self.models[purpose])
+                if mode:
+                    spec = getattr(client, "spec_stats", None)
+                    row["speculative"] = {"mode": mode, **(spec.as_dict().get(mode, {}) if spec is not None else {})}
+                if s is not None:
+                    run: Deque[float] = s["run"]
+                    wait: Deque[float] = s["wait"]
+                    row.update(calls=s["calls"], errors=s["errors"], latency_ms={
+                        "mean": 1000 * sum(run) / len(run),
+                        "p50": 1000 * _percentile(list(run), 0.5),
+                        "p95": 1000 * _percentile(list(run), 0.95),
+                    }, wait_ms_p95=1000 * _percentile(list(wait), 0.95))
+                out[purpose] = row
+        return out
@@ -26,12 +26,34 @@ def build_router_prompt(tools: List[Dict]) -> str:
         lines.append(f"- {t['name']}: {t['description']}")
     return "\n".join(lines)
 
-def build_schema_prompt(schema: Dict, prefix_hint: str | None = None, context: Dict | None = None) -> str:
-    ctx_block = ""
-    if context:
-        from capstone_ai.core.context import format_context
-        ctx_block = format_context(context) + "\n\n"
-    base = (
+def build_function_call_prompt(tools: List[Dict]) -> str:
+    """라우팅과 파라미터 추출을 한 번의 생성으로(ROUTER_FUNCTION_CALL). 카탈로그 전체가 고정 접두."""
+    lines = [
+        "Environment: ipython",
+        f"Cutting Knowledge Date: {CUTTING_KNOWLEDGE}",
+        f"Today Date: {TODAY}",
+        "",
+        "You can access tools via the MCP server.",
+        "Decide routing for the user request and, if a tool is needed, fill its arguments in the same answer.",
+        "",
+        "Output EXACTLY ONE of:",
+        "• CHAT  (no tool needed)",
+        '• {"tool":"<tool name>","arguments":{...}}  (arguments follow the tool parameters schema; null when unknown)',
+        "",
+        "ABSOLUTE RULES:",
+        "• No explanations. No extra text.",
+        "• Use ASCII double quotes for all keys and values.",
+        "",
+        "TOOLS CATALOG:"
+    ]
+    for t in tools:
+        lines.append(f"- {t['name']}: {t['description']}")
+        lines.append(f"  parameters: {json.dumps(t['parameters'], ensure_ascii=False)}")
+    return "\n".join(lines)
+
+def build_schema_instructions(schema: Dict) -> str:
+    """도구별로 고정인 지침 + 스키마. 프롬프트 맨 앞에 두어 접두 KV 캐시로 재사용."""
+    return (
         'You are an AI assistant specialised in tool usage.\n'
         'Return only one JSON object that starts with "{" and ends with "}".\n'
         'No extra text or comments after the final "}".\n'
@@ -39,10 +61,17 @@ def build_schema_prompt(schema: Dict, prefix_hint: str | None = None, context: D
         f'Today Date: {TODAY}'
         f"SCHEMA:\n{json.dumps(schema['parameters'], ensure_ascii=False)}"
     )
-    prefix = (prefix_hint + "\n\n") if prefix_hint else ""
-    return ctx_block + prefix + base
 
-def build_meeting_prompt(raw_transcript: str, meta: dict) -> str:
+def build_schema_prompt(schema: Dict, prefix_hint: str | None = None, context: Dict | None = None) -> str:
+    ctx_block = ""
+    if context:
+        from capstone_ai.core.context import format_context
+        ctx_block = "\n\n" + format_context(context)
+    hint = ("\n\n" + prefix_hint) if prefix_hint else ""
+    return build_schema_instructions(schema) + hint + ctx_block
+
+def build_meeting_prompt(raw_transcript: str, meta: dict, partial: bool = False) -> str:
+    """partial=True 면 원문 대신 구간별 부분 요약(시간순)을 합쳐 최종 회의록을 작성."""
     chat_room_id = meta.get("chatRoomId", 1)
     project_id   = meta.get("projectId")
     time_range = meta.get("time_range","")
@@ -64,7 +93,7 @@ def build_meeting_prompt(raw_transcript: str, meta: dict) -> str:
         "- 액션아이템은 담당자/기한을 포함해 목록화합니다.\n"
         "- 불필요한 수사는 제외하고, 사실만 정리합니다.\n"
         "- 내부 식별자(projectId, chatRoomId, userId 등)나 숫자형 프로젝트 표기는 절대 언급하지 않습니다. ex) 프로젝트 1 회의록, 프로젝트 1 팀원들\n\n"
-        "[원문 대화]\n"
+        + ("[부분 요약(시간순)]\n" if partial else "[원문 대화]\n") +
         f"{raw_transcript}\n\n"
         "[출력 형식]\n"
         "제목: <한 줄> 내부 식별자(projectId, chatRoomId, userId 등)나 숫자형 프로젝트 표기는 절대 언급하지 않습니다.\n"
@@ -72,4 +101,29 @@ def build_meeting_prompt(raw_transcript: str, meta: dict) -> str:
         "주요 논의:\n"
         " - 항목1\n - 항목2\n"
         "결정 사항:\n - 항목1\n - 항목2\n"
-    )
\ No newline at end of file
+    )
+def build_compaction_prompt(prev_summary: str, turns: List[Dict]) -> str:
+    """오래된 대화 턴을 누적 요약에 합치는 프롬프트(증분: 이전 요약 + 새로 밀려난 턴만)."""
+    lines = [f"{t['role']}: {t['content']}" for t in turns]
+    return (
+        "다음은 사용자와 비서의 이전 대화 요약과, 그 뒤에 이어진 대화입니다.\n"
+        "둘을 합쳐 이후 대화에 필요한 사실·결정·요청·미해결 사항만 남긴 요약을 작성해 주세요.\n"
+        "- 한국어, 10문장 이내, 불릿 없이 간결하게\n"
+        "- 내부 식별자(projectId, chatRoomId, userId 등)는 언급하지 않습니다.\n\n"
+        f"[이전 요약]\n{prev_summary or '(없음)'}\n\n"
+        "[이어진 대화]\n" + "\n".join(lines)
+    )
+
+def build_meeting_chunk_prompt(chunk: str, part: int, total: int, time_range: str = "") -> str:
+    """긴 회의 대화의 한 구간을 부분 요약(map 단계). 최종 회의록 작성 시 재료가 되도록 사실을 빠짐없이."""
+    return (
+        "당신은 회의록 작성을 돕는 비서입니다. 아래는 긴 회의 대화를 시간순으로 나눈 "
+        f"{total}개 구간 중 {part}번째 구간입니다.\n"
+        + (f"[회의 시간] {time_range}\n" if time_range else "") +
+        "[작성 원칙]\n"
+        "- 이 구간의 논의 주제, 결정 사항, 액션아이템(담당자/기한)을 빠짐없이 불릿으로 정리합니다.\n"
+        "- 발언자 이름과 구체적인 수치·날짜는 그대로 유지합니다.\n"
+        "- 추측하지 않고 대화에 있는 사실만 적습니다. 내부 식별자(projectId, chatRoomId, userId 등)는 언급하지 않습니다.\n\n"
+        f"[원문 대화]\n{chunk}\n\n"
+        "[부분 요약]\n"
+    )
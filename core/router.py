@@ -1,24 +1,122 @@
+import logging
 import re
-from capstone_ai.core.prompts import build_router_prompt
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from capstone_ai.core.prompts import build_router_prompt, build_function_call_prompt
 from capstone_ai.mcp.catalog import ToolCatalog
-from capstone_ai.core.llm import LLMClient
 from capstone_ai.core.context import format_context
+from capstone_ai.core.fast_router import FastRouter
+from capstone_ai.core.stopping import Newline
+from capstone_ai.config import ROUTER_FAST_PATH, ROUTER_CLASSIFIER_MIN_SCORE, ROUTER_CLASSIFIER_MIN_MARGIN
+from capstone_ai.config import ROUTER_MODE, ROUTER_MIN_CONFIDENCE, ROUTER_FUNCTION_CALL
+
+if TYPE_CHECKING:  # torch/transformers 는 모델 로드 시점에만 import
+    from capstone_ai.core.llm import LLMClient
+
+log = logging.getLogger("dna.router")
 
 class AutoRouter:
-    def __init__(self, llm: LLMClient, catalog: ToolCatalog):
+    """
+    계층형 라우터: 규칙 → 경량 분류기 → LLM.
+    앞 단계가 확신할 때만 즉시 결정하고, 애매한 입력만 LLM 을 호출합니다.
+    """
+    def __init__(self, llm: "LLMClient", catalog: ToolCatalog, fast_path: bool = ROUTER_FAST_PATH):
         self.llm = llm
         self.catalog = catalog
+        self.fast = FastRouter.from_catalog(
+            catalog.list(), ROUTER_CLASSIFIER_MIN_SCORE, ROUTER_CLASSIFIER_MIN_MARGIN
+        ) if fast_path else None
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, tier: str) -> None:
+        with self._lock:
+            self._counts[tier] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """단계별 처리 건수와 적중률(rule/classifier/llm)."""
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        out: Dict[str, float] = {"total": total}
+        for tier in ("rule", "classifier", "llm"):
+            n = counts.get(tier, 0)
+            out[tier] = n
+            out[f"{tier}_rate"] = (n / total) if total else 0.0
+        return out
 
     def decide(self, user_input: str, context: dict | None = None) -> str:
+        if self.fast is not None:
+            hit = self.fast.decide(user_input)
+            if hit is not None:
+                self._count(hit.tier)
+                return hit.label
+        self._count("llm")
+        if ROUTER_MODE == "score":
+            label, confidence = self.decide_scored(user_input, context)
+            if confidence >= ROUTER_MIN_CONFIDENCE:
+                return label
+            # 애매하면 CHAT 으로 보내지 않고 생성 방식으로 다시 판정(도구 요청이 대화로 새지 않도록)
+            log.info("[ROUTER] low score %s=%.2f < %.2f; falling back to generate", label, confidence, ROUTER_MIN_CONFIDENCE)
+        return self._decide_llm(user_input, context)
+
+    def labels(self) -> List[str]:
+        return ["CHAT"] + [t["name"] for t in self.catalog.list()]
+
+    def _messages(self, user_input: str, context: dict | None = None) -> List[Dict[str, str]]:
         sys_prompt = build_router_prompt(self.catalog.list())
+        # 카탈로그가 바뀌면 접두 KV 가 교체됨(같으면 no-op)
+        self.llm.register_prefix("router", [{"role": "system", "content": sys_prompt}])
         messages = [{"role":"system", "content":sys_prompt}]
         if context:
             messages.append({"role":"system","content": format_context(context)})
         messages.append({"role":"user","content": user_input})
+        return messages
+
+    def decide_scored(self, user_input: str, context: dict | None = None) -> Tuple[str, float]:
+        """라벨(CHAT + 카탈로그 도구명)로 제한한 LLM 판정(ROUTER_MODE=score). (최고 라벨, 확률) 반환 — 호출 측에서 임계값 적용."""
+        ranked = self.llm.score_labels(self._messages(user_input, context), self.labels())
+        return ranked[0]
+
+    def decide_call(self, user_input: str, context: dict | None = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        라우팅 + 인자 추출을 한 번에(ROUTER_FUNCTION_CALL). 빠른 단계가 결정하면 (라벨, None) — 인자는 호출 측에서 추출.
+        LLM 단계는 카탈로그 전체 프롬프트로 CHAT 또는 {tool, arguments} 를 한 번에 생성.
+        """
+        if self.fast is not None:
+            hit = self.fast.decide(user_input)
+            if hit is not None:
+                self._count(hit.tier)
+                return hit.label, None
+        self._count("llm")
+        return self._decide_call_llm(user_input, context)
+
+    def _decide_call_llm(self, user_input: str, context: dict | None = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        sys_prompt = build_function_call_prompt(self.catalog.list())
+        self.llm.register_prefix("function_call", [{"role": "system", "content": sys_prompt}])
+        messages = [{"role": "system", "content": sys_prompt}]
+        if context:
+            messages.append({"role": "system", "content": format_context(context)})
+        messages.append({"role": "user", "content": user_input})
+        return self.llm.complete_function_call(messages, self.catalog.list(), max_new_tokens=256, temperature=0.2)
+
+    def warmup(self, user_input: str, context: dict | None = None) -> None:
+        """운영 설정과 같은 LLM 단계를 한 번 실행(빠른 단계·통계 제외). 라우터 접두 KV 도 이때 등록."""
+        if ROUTER_FUNCTION_CALL:
+            self._decide_call_llm(user_input, context)
+        elif ROUTER_MODE == "score":
+            self.decide_scored(user_input, context)
+        else:
+            self._decide_llm(user_input, context)
+
+    def _decide_llm(self, user_input: str, context: dict | None = None) -> str:
+        messages = self._messages(user_input, context)
         route_token = self.llm.complete(
             messages,
             max_new_tokens=8,
             do_sample=False,
+            stop=[Newline()],
         ).strip()
         route_token = re.sub(r"[^A-Za-z0-9_]", "", route_token)
-        return route_token or "CHAT"
\ No newline at end of file
+        return route_token or "CHAT"
@@ -0,0 +1,326 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from capstone_ai.config import SESSION_STORE, SESSION_STORE_PATH, SESSION_STORE_TTL_S
+
+log = logging.getLogger("dna.store")
+
+
+class VersionConflict(Exception):
+    """저장 시 기대한 버전과 저장소의 현재 버전이 다름(다른 워커/스레드가 먼저 씀)."""
+
+
+class SessionStore:
+    """
+    세션 상태 저장소 인터페이스. (ns, cid) 별로 JSON 직렬화 가능한 값과 버전을 보관.
+    - save(..., expected_version) 는 낙관적 동시성 제어: 현재 버전이 다르면 VersionConflict
+      (새 키는 expected_version=0). 성공 시 새 버전 반환
+    - load 는 매번 새 객체를 돌려주므로 호출 측이 자유롭게 수정해도 됨
+    - try_lease/release_lease: 프로세스 사이의 키 단위 임대(같은 project 의 턴 전체를 워커들 사이에서 하나씩 처리).
+      버전 CAS 는 변경 하나만 보호하므로 읽기→생성→추가로 이어지는 턴은 임대로 직렬화
+    """
+
+    def version(self, ns: str, cid: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def load(self, ns: str, cid: str) -> Optional[Tuple[int, Any]]:
+        raise NotImplementedError
+
+    def save(self, ns: str, cid: str, data: Any, expected_version: int) -> int:
+        raise NotImplementedError
+
+    def delete(self, ns: str, cid: str) -> None:
+        raise NotImplementedError
+
+    def try_lease(self, key: str, owner: str, ttl_s: float) -> bool:
+        """비어 있거나 만료됐거나 owner 가 이미 가진 임대면 (재)획득해 True. 프로세스 로컬 저장소는 필요 없음."""
+        return True
+
+    def release_lease(self, key: str, owner: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """프로세스 로컬 저장소(ClarifyManager 기본값). 히스토리는 저장소 없이 InMemoryHistory 가 직접 보관."""
+
+    def __init__(self) -> None:
+        self._data: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, ns: str, cid: str) -> Optional[int]:
+        with self._lock:
+            e = self._data.get((ns, cid))
+            return e[0] if e else None
+
+    def load(self, ns: str, cid: str) -> Optional[Tuple[int, Any]]:
+        with self._lock:
+            e = self._data.get((ns, cid))
+        return (e[0], json.loads(e[1])) if e else None
+
+    def save(self, ns: str, cid: str, data: Any, expected_version: int) -> int:
+        text = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            e = self._data.get((ns, cid))
+            if (e[0] if e else 0) != expected_version:
+                raise VersionConflict(f"{ns}:{cid}")
+            self._data[(ns, cid)] = (expected_version + 1, text)
+            return expected_version + 1
+
+    def delete(self, ns: str, cid: str) -> None:
+        with self._lock:
+            self._data.pop((ns, cid), None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    여러 uvicorn 워커가 공유하는 SQLite(WAL) 저장소.
+    - 쓰기: 전용 writer 스레드가 대기열을 모아 한 트랜잭션으로 커밋(group commit). save() 는 커밋 후 반환
+    - 읽기: 스레드별 연결 + 프로세스 내 캐시. 캐시는 version 조회(PK 인덱스)로 검증 후 사용(read-through)
+    - 정리: writer 스레드가 prune_interval_s 마다 ttl_s 동안 쓰이지 않은 세션(updated_at 인덱스)과 만료된 임대를 삭제
+    - 임대: leases 테이블의 upsert 한 문장(비었거나 만료됐거나 같은 owner 일 때만 갱신)
+    """
+
+    def __init__(self, path: str, batch_window_ms: float = 2.0, max_batch: int = 256,
+                 ttl_s: float = SESSION_STORE_TTL_S, prune_interval_s: float = 300.0):
+        self.path = path
+        self.ttl_s = float(ttl_s)
+        self.prune_interval_s = max(1.0, float(prune_interval_s))
+        self._last_prune = float("-inf")
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self._local = threading.local()
+        self._cache: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._closed = False
+        self.stats = {"reads": 0, "cache_hits": 0, "writes": 0, "commits": 0, "conflicts": 0, "pruned": 0}
+
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " ns TEXT NOT NULL, cid TEXT NOT NULL, version INTEGER NOT NULL,"
+            " data TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (ns, cid))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+        self._writer_conn = conn
+        self._thread = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ----- 읽기 -----
+    def version(self, ns: str, cid: str) -> Optional[int]:
+        # fetchall: 문장을 끝까지 소비해야 읽기 트랜잭션(WAL 스냅샷)이 닫혀 다음 조회가 최신 커밋을 봄
+        rows = self._reader().execute(
+            "SELECT version FROM sessions WHERE ns = ? AND cid = ?", (ns, cid)
+        ).fetchall()
+        return rows[0][0] if rows else None
+
+    def load(self, ns: str, cid: str) -> Optional[Tuple[int, Any]]:
+        v = self.version(ns, cid)
+        key = (ns, cid)
+        if v is None:
+            with self._cache_lock:
+                self._cache.pop(key, None)
+            return None
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == v:
+            self.stats["cache_hits"] += 1
+            return v, json.loads(cached[1])
+        rows = self._reader().execute(
+            "SELECT version, data FROM sessions WHERE ns = ? AND cid = ?", (ns, cid)
+        ).fetchall()
+        self.stats["reads"] += 1
+        if not rows:
+            return None
+        row = rows[0]
+        with self._cache_lock:
+            self._cache[key] = (row[0], row[1])
+        return row[0], json.loads(row[1])
+
+    # ----- 쓰기(group commit) -----
+    def _submit(self, op: tuple) -> Any:
+        if self._closed:
+            raise RuntimeError("session store is closed")
+        fut: Future = Future()
+        self._queue.put((*op, fut))
+        return fut.result()
+
+    def save(self, ns: str, cid: str, data: Any, expected_version: int) -> int:
+        return self._submit(("save", ns, cid, json.dumps(data, ensure_ascii=False), int(expected_version)))
+
+    def delete(self, ns: str, cid: str) -> None:
+        self._submit(("delete", ns, cid, None, 0))
+
+    def close(self) -> None:
+        """대기열에 남은 쓰기를 모두 커밋한 뒤 writer 스레드 종료. 이후 쓰기는 RuntimeError."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # ----- 임대(워커 간 턴 직렬화) -----
+    def try_lease(self, key: str, owner: str, ttl_s: float) -> bool:
+        now = time.time()
+        cur = self._reader().execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+            (key, owner, now + float(ttl_s), now),
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, key: str, owner: str) -> None:
+        self._reader().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    # ----- 정리(TTL) -----
+    def prune(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """ttl_s 동안 쓰이지 않은 세션과 만료된 임대 삭제. 삭제한 세션 수."""
+        if self.ttl_s <= 0:
+            return 0
+        conn = conn or self._reader()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = conn.execute("SELECT ns, cid FROM sessions WHERE updated_at < ?", (now - self.ttl_s,)).fetchall()
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_s,))
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._cache_lock:
+            for ns, cid in keys:
+                self._cache.pop((ns, cid), None)
+        self.stats["pruned"] += len(keys)
+        if keys:
+            log.info("[STORE] pruned %d idle sessions", len(keys))
+        return len(keys)
+
+    def _maybe_prune(self, conn: sqlite3.Connection) -> None:
+        if time.monotonic() - self._last_prune < self.prune_interval_s:
+            return
+        self._last_prune = time.monotonic()
+        try:
+            self.prune(conn)
+        except Exception:
+            log.exception("[STORE] prune failed")
+
+    def _collect(self) -> Optional[List[tuple]]:
+        """대기열을 모아 반환. 종료 신호면 None, prune_interval_s 동안 쓰기가 없으면 []."""
+        try:
+            first = self._queue.get(timeout=self.prune_interval_s)
+        except queue.Empty:
+            return []
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if op is None:
+                self._queue.put(None)
+                break
+            batch.append(op)
+        return batch
+
+    def _apply(self, conn: sqlite3.Connection, kind: str, ns: str, cid: str, text: Optional[str], expected: int) -> Any:
+        now = time.time()
+        if kind == "delete":
+            conn.execute("DELETE FROM sessions WHERE ns = ? AND cid = ?", (ns, cid))
+            return None
+        if expected == 0:
+            cur = conn.execute(
+                "INSERT INTO sessions (ns, cid, version, data, updated_at) VALUES (?, ?, 1, ?, ?)"
+                " ON CONFLICT (ns, cid) DO NOTHING",
+                (ns, cid, text, now),
+            )
+        else:
+            cur = conn.execute(
+                "UPDATE sessions SET version = version + 1, data = ?, updated_at = ?"
+                " WHERE ns = ? AND cid = ? AND version = ?",
+                (text, now, ns, cid, expected),
+            )
+        if cur.rowcount == 0:
+            return VersionConflict(f"{ns}:{cid}")
+        return expected + 1
+
+    def _write_loop(self) -> None:
+        conn = self._writer_conn
+        while True:
+            self._maybe_prune(conn)
+            batch = self._collect()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for kind, ns, cid, text, expected, _ in batch:
+                    results.append(self._apply(conn, kind, ns, cid, text, expected))
+                conn.execute("COMMIT")
+            except Exception as e:
+                log.exception("[STORE] group commit failed")
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception:
+                    pass
+                for *_, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.stats["commits"] += 1
+            for (kind, ns, cid, text, expected, fut), res in zip(batch, results):
+                key = (ns, cid)
+                if isinstance(res, VersionConflict):
+                    self.stats["conflicts"] += 1
+                    fut.set_exception(res)
+                    continue
+                self.stats["writes"] += 1
+                with self._cache_lock:
+                    if kind == "delete":
+                        self._cache.pop(key, None)
+                    else:
+                        self._cache[key] = (res, text)
+                fut.set_result(res)
+
+
+def make_session_store() -> Optional[SessionStore]:
+    """
+    SESSION_STORE=sqlite(여러 워커 공유, SESSION_STORE_PATH) | memory(기본, 단일 워커) → None.
+    memory 는 공유할 대상이 없으므로 저장소를 두지 않음(히스토리 변경마다 세션 전체를 직렬화하지 않도록).
+    """
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(SESSION_STORE_PATH)
+    return None
@@ -0,0 +1,115 @@
+import threading
+from typing import Any, Dict, List, Tuple
+
+import torch
+from transformers import DynamicCache
+
+def crop_cache(past: Any, length: int) -> DynamicCache:
+    """KV 를 앞쪽 length 토큰까지만 남김(검증에서 거절된 초안 토큰 제거)."""
+    return DynamicCache.from_legacy_cache(tuple(
+        (past[i][0][:, :, :length, :], past[i][1][:, :, :length, :]) for i in range(len(past))
+    ))
+
+
+class NgramDrafter:
+    """
+    프롬프트 조회(prompt lookup) 초안. 지금까지의 토큰(프롬프트+생성)의 마지막 n-gram 이 앞에서 나온 가장 최근 위치를 찾아
+    그 뒤 토큰을 그대로 제안. 모델 호출이 없고, 원문을 많이 옮겨 쓰는 회의록 요약에서 적중률이 높음.
+    n-gram 색인은 요청마다 새로 만들고 토큰이 늘어난 만큼만 갱신.
+    """
+
+    name = "ngram"
+
+    def __init__(self, max_ngram: int = 3, min_ngram: int = 2):
+        self.max_ngram = max(1, int(max_ngram))
+        self.min_ngram = max(1, min(int(min_ngram), self.max_ngram))
+        self._index: Dict[Tuple[int, ...], int] = {}
+        self._indexed = 0
+
+    def propose(self, ids: List[int], k: int) -> List[int]:
+        # 마지막 위치에서 끝나는 n-gram 은 색인하지 않음(자기 자신과 일치하면 이어질 토큰이 없음)
+        end = len(ids) - 1
+        for i in range(self._indexed, end):
+            for n in range(self.min_ngram, self.max_ngram + 1):
+                if i + 1 >= n:
+                    self._index[tuple(ids[i + 1 - n:i + 1])] = i + 1
+        self._indexed = max(self._indexed, end)
+        for n in range(self.max_ngram, self.min_ngram - 1, -1):
+            if len(ids) <= n:
+                continue
+            pos = self._index.get(tuple(ids[-n:]))
+            if pos is not None:
+                return ids[pos:pos + k]
+        return []
+
+    def accept(self, n_valid: int) -> None:
+        pass
+
+
+class DraftModelDrafter:
+    """
+    작은 초안 모델(SPEC_DRAFT_MODEL, 대상 모델과 같은 어휘)로 k 토큰을 greedy 생성해 제안.
+    요청마다 초안 모델 KV 를 따로 두고, 검증 후 받아들여진 길이까지만 남겨 다음 라운드에 이어 씀.
+    """
+
+    name = "draft"
+
+    def __init__(self, model: torch.nn.Module, vocab_size: int):
+        self.model = model
+        self.vocab_size = int(vocab_size)
+        self.past: Any = None
+        self.n = 0   # 초안 KV 가 덮는 토큰 수
+
+    @torch.no_grad()
+    def propose(self, ids: List[int], k: int) -> List[int]:
+        device = self.model.device
+        feed = ids[self.n:]
+        out: List[int] = []
+        while feed and len(out) < k:
+            x = torch.tensor([feed], dtype=torch.long, device=device)
+            pos = torch.arange(self.n, self.n + len(feed), device=device)[None, :]
+            res = self.model(input_ids=x, position_ids=pos, past_key_values=self.past, use_cache=True)
+            self.past, self.n = res.past_key_values, self.n + len(feed)
+            tok = int(res.logits[0, -1].argmax())
+            if tok >= self.vocab_size:   # 초안 모델 임베딩이 더 큰 경우(패딩 토큰)
+                break
+            out.append(tok)
+            feed = [tok]
+        return out
+
+    def accept(self, n_valid: int) -> None:
+        """앞쪽 n_valid 토큰만 유효(그 뒤 초안 KV 는 버림)."""
+        if self.past is not None and self.n > n_valid:
+            self.past = crop_cache(self.past, n_valid)
+            self.n = n_valid
+
+
+class SpecStats:
+    """모드별 누적 지표: 호출/라운드 수, 제안·수락 토큰 수, 생성 토큰 수, decode 시간."""
+
+    def __init__(self) -> None:
+        self.modes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, mode: str, rounds: int, drafted: int, accepted: int, tokens: int, decode_s: float) -> None:
+        with self._lock:
+            s = self.modes.setdefault(mode, {"calls": 0, "rounds": 0, "drafted": 0, "accepted": 0, "tokens": 0, "decode_s": 0.0})
+            s["calls"] += 1
+            s["rounds"] += rounds
+            s["drafted"] += drafted
+            s["accepted"] += accepted
+            s["tokens"] += tokens
+            s["decode_s"] += decode_s
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        with self._lock:
+            modes = {m: dict(s) for m, s in self.modes.items()}
+        for mode, s in modes.items():
+            out[mode] = {
+                **s,
+                "acceptance_rate": s["accepted"] / s["drafted"] if s["drafted"] else 0.0,
+                "tokens_per_round": s["tokens"] / s["rounds"] if s["rounds"] else 0.0,
+                "decode_tok_s": s["tokens"] / s["decode_s"] if s["decode_s"] else 0.0,
+            }
+        return out
@@ -0,0 +1,194 @@
+from typing import Iterable, List, Optional
+
+_TERMINATORS = ".!?。"
+
+
+class StopCondition:
+    """
+    호출별 생성 중단 조건. 디코딩 스텝마다 새로 확정된 텍스트 조각(delta)만 받아 판정하므로
+    전체 출력을 다시 디코딩하지 않습니다. 요청마다 새 인스턴스를 만들어 쓰세요(상태 보유).
+    """
+
+    def feed(self, delta: str) -> bool:
+        raise NotImplementedError
+
+    def cut(self, text: str) -> Optional[int]:
+        """text 에서 중단 지점(그 뒤를 잘라낼 위치). 중단 조건이 나오지 않았으면 None."""
+        return None
+
+    def trim(self, text: str) -> str:
+        """최종 텍스트에서 중단 지점 이후(같은 토큰에 딸려 온 꼬리 포함)를 잘라냄."""
+        i = self.cut(text)
+        return text if i is None else text[:i]
+
+
+class StopStrings(StopCondition):
+    """
+    지정 문자열 중 하나가 나오면 중단. 출력에는 중단 문자열을 포함하지 않음.
+    출력 앞쪽(공백 제외 내용이 나오기 전)에 나온 중단 문자열은 무시(예: "\n제목:" 으로 시작하는 출력이 0 토큰에서 끝나지 않도록).
+    """
+
+    def __init__(self, stops: Iterable[str]):
+        self.stops = [s for s in stops if s]
+        self._keep = max((len(s) for s in self.stops), default=1) - 1
+        self._tail = ""
+        self._seen = 0                     # 지금까지 받은 글자 수
+        self._first: Optional[int] = None  # 처음 나온 공백 아닌 글자의 위치
+
+    def _find(self, text: str, offset: int, first: Optional[int]) -> Optional[int]:
+        """text(전체 출력의 offset 위치부터) 안에서 내용 뒤에 나온 첫 중단 문자열의 위치(text 기준)."""
+        if first is None:
+            return None
+        best = None
+        for stop in self.stops:
+            i = text.find(stop)
+            while i >= 0 and offset + i <= first:
+                i = text.find(stop, i + 1)
+            if i >= 0 and (best is None or i < best):
+                best = i
+        return best
+
+    def feed(self, delta: str) -> bool:
+        offset = self._seen - len(self._tail)
+        window = self._tail + delta
+        if self._first is None:
+            j = next((j for j, ch in enumerate(delta) if not ch.isspace()), None)
+            self._first = None if j is None else self._seen + j
+        self._seen += len(delta)
+        self._tail = window[-self._keep:] if self._keep else ""
+        return self._find(window, offset, self._first) is not None
+
+    def cut(self, text: str) -> Optional[int]:
+        first = next((j for j, ch in enumerate(text) if not ch.isspace()), None)
+        return self._find(text, 0, first)
+
+    def partial(self, text: str) -> int:
+        """text 끝에서 중단 문자열의 앞부분일 수 있는 가장 긴 꼬리 길이(스트리밍에서 내보내지 않고 보류)."""
+        for n in range(min(self._keep, len(text)), 0, -1):
+            tail = text[-n:]
+            if any(stop.startswith(tail) for stop in self.stops):
+                return n
+        return 0
+
+
+class JsonObjectEnd(StopCondition):
+    """첫 '{' 로 열린 객체의 괄호가 맞아 닫히면 중단(문자열 안의 괄호/이스케이프는 무시)."""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+
+    def _push(self, ch: str) -> bool:
+        if self.in_str:
+            if self.esc:
+                self.esc = False
+            elif ch == "\\":
+                self.esc = True
+            elif ch == '"':
+                self.in_str = False
+        elif ch == '"' and self.depth > 0:
+            self.in_str = True
+        elif ch == "{":
+            self.depth += 1
+        elif ch == "}" and self.depth > 0:
+            self.depth -= 1
+            return self.depth == 0
+        return False
+
+    def feed(self, delta: str) -> bool:
+        return any([self._push(ch) for ch in delta])
+
+    def cut(self, text: str) -> Optional[int]:
+        scan = JsonObjectEnd()
+        for i, ch in enumerate(text):
+            if scan._push(ch):
+                return i + 1
+        return None
+
+
+class SentenceEnd(StopCondition):
+    """첫 문장 종결 부호(. ! ? 。)에서 중단. 숫자 뒤의 '.'(소수점·번호)은 종결로 보지 않음."""
+
+    def __init__(self):
+        self._prev = ""
+
+    def _is_end(self, prev: str, ch: str) -> bool:
+        return ch in _TERMINATORS and not (ch == "." and (not prev or prev.isdigit()))
+
+    def feed(self, delta: str) -> bool:
+        hit = False
+        for ch in delta:
+            hit = hit or self._is_end(self._prev, ch)
+            self._prev = ch
+        return hit
+
+    def cut(self, text: str) -> Optional[int]:
+        for i, ch in enumerate(text):
+            if self._is_end(text[i - 1] if i else "", ch):
+                return i + 1
+        return None
+
+
+class Newline(StopCondition):
+    """내용이 시작된 뒤 첫 줄바꿈에서 중단(앞쪽 공백/빈 줄은 무시)."""
+
+    def __init__(self):
+        self._started = False
+
+    def feed(self, delta: str) -> bool:
+        for ch in delta:
+            if ch == "\n" and self._started:
+                return True
+            self._started = self._started or not ch.isspace()
+        return False
+
+    def cut(self, text: str) -> Optional[int]:
+        start = len(text) - len(text.lstrip())
+        i = text.find("\n", start)
+        return None if i < 0 else i
+
+    def trim(self, text: str) -> str:
+        body = text.lstrip()
+        return body.split("\n", 1)[0]
+
+
+class StopChecker:
+    """
+    여러 조건 중 하나라도 만족하면 중단. 모든 조건이 같은 delta 를 보도록 단락 평가하지 않음.
+    release(): 스트리밍용. 중단 문자열의 앞부분일 수 있는 꼬리는 보류했다가, 끝나면 모든 조건 중 가장 앞선
+    중단 지점까지만 내보냄(같은 토큰에 딸려 온 꼬리가 스트림에 새지 않도록, trim() 과 같은 위치).
+    """
+
+    def __init__(self, conditions: List[StopCondition]):
+        self.conditions = list(conditions)
+        self._strings = [c for c in self.conditions if isinstance(c, StopStrings)]
+        self._text = ""
+        self._emitted = 0
+
+    def feed(self, delta: str) -> bool:
+        self._text += delta
+        return any([c.feed(delta) for c in self.conditions])
+
+    def release(self, final: bool) -> str:
+        """지금 내보내도 되는 새 텍스트. final(생성 종료)이면 중단 지점 앞까지 남은 것을 모두."""
+        text = self._text
+        if final:
+            end = self.cut(text)
+            end = len(text) if end is None else end
+        else:
+            end = len(text) - max((c.partial(text) for c in self._strings), default=0)
+        if end <= self._emitted:
+            return ""
+        out = self._text[self._emitted:end]
+        self._emitted = end
+        return out
+
+    def cut(self, text: str) -> Optional[int]:
+        """모든 조건 중 가장 앞선 중단 지점."""
+        return min((i for i in (c.cut(text) for c in self.conditions) if i is not None), default=None)
+
+    def trim(self, text: str) -> str:
+        for c in self.conditions:
+            text = c.trim(text)
+        return text
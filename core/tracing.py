@@ -0,0 +1,138 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from capstone_ai.config import METRICS_ENABLED, TRACE_SLOW_MS
+from capstone_ai.core.metrics import RATE_BUCKETS, REGISTRY, TOKEN_BUCKETS
+
+log = logging.getLogger("dna.trace")
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "dna_request_duration_seconds", "End-to-end chat request latency.", ("route", "tool"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "dna_stage_duration_seconds", "Latency of one pipeline stage within a request.", ("stage", "route", "tool"))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "dna_llm_prompt_tokens", "Prompt tokens per LLM call.", ("stage", "route"), TOKEN_BUCKETS)
+GENERATED_TOKENS = REGISTRY.histogram(
+    "dna_llm_generated_tokens", "Generated tokens per LLM call.", ("stage", "route"), TOKEN_BUCKETS)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "dna_llm_tokens_per_second", "Decode throughput per LLM call (tokens after the first / decode time).",
+    ("stage", "route"), RATE_BUCKETS)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "dna_queue_wait_seconds", "Time spent waiting before work starts (infer_pool, model_pool, llm_batch).",
+    ("queue", "stage"))
+BACKEND_SECONDS = REGISTRY.histogram(
+    "dna_backend_request_duration_seconds", "HTTP backend call latency.", ("tool", "method", "status"))
+
+
+class Trace:
+    """요청 하나의 단계 기록. route/tool 은 처리 중에 정해지므로 끝날 때 한 번에 히스토그램에 반영."""
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = {"route": "none", "tool": "none", **labels}
+        self.spans: List[Tuple[str, float]] = []
+        self.llm: List[Tuple[str, int, Optional[int], Optional[float]]] = []
+        self.started = time.perf_counter()
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("dna_trace", default=None)
+_stage: contextvars.ContextVar[str] = contextvars.ContextVar("dna_stage", default="none")
+
+
+def _observe_llm(stage: str, route: str, prompt_tokens: int, generated_tokens: Optional[int], tokens_per_s: Optional[float]) -> None:
+    PROMPT_TOKENS.observe(prompt_tokens, stage=stage, route=route)
+    if generated_tokens is not None:
+        GENERATED_TOKENS.observe(generated_tokens, stage=stage, route=route)
+    if tokens_per_s is not None:
+        TOKENS_PER_SECOND.observe(tokens_per_s, stage=stage, route=route)
+
+
+def _finish(t: Trace, elapsed: float) -> None:
+    route, tool = t.labels["route"], t.labels["tool"]
+    REQUEST_SECONDS.observe(elapsed, route=route, tool=tool)
+    for stage, dt in t.spans:
+        STAGE_SECONDS.observe(dt, stage=stage, route=route, tool=tool)
+    for stage, prompt, generated, rate in t.llm:
+        _observe_llm(stage, route, prompt, generated, rate)
+    if TRACE_SLOW_MS > 0 and elapsed * 1000 >= TRACE_SLOW_MS:
+        log.warning("[TRACE] slow %s %.0fms route=%s tool=%s stages=%s", t.name, elapsed * 1000, route, tool,
+                    " ".join(f"{s}={dt * 1000:.0f}ms" for s, dt in t.spans))
+
+
+@contextmanager
+def trace(name: str, **labels: str) -> Iterator[None]:
+    """
+    요청 하나를 추적(ChatService._dispatch, 회의록 작업). 안쪽의 span/record_llm 이 이 요청에 모이고,
+    끝날 때 최종 route/tool 라벨로 요청·단계·토큰 히스토그램에 반영. 예외로 끝나면 route=error.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    t = Trace(name, labels)
+    token = _current.set(t)
+    try:
+        yield
+    except BaseException:
+        if t.labels["route"] == "none":
+            t.labels["route"] = "error"
+        raise
+    finally:
+        _current.reset(token)
+        _finish(t, time.perf_counter() - t.started)
+
+
+def set_labels(**labels: str) -> None:
+    """진행 중인 요청의 route/tool 라벨 지정(라우팅 결과, 최종 응답 경로)."""
+    t = _current.get()
+    if t is not None:
+        t.labels.update({k: str(v) for k, v in labels.items()})
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """단계 하나의 소요 시간. 안쪽 LLM 호출/대기 기록에는 이 stage 라벨이 붙음."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    token = _stage.set(stage)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        _stage.reset(token)
+        t = _current.get()
+        if t is None:
+            STAGE_SECONDS.observe(dt, stage=stage, route="none", tool="none")
+        else:
+            t.spans.append((stage, dt))
+
+
+def record_llm(prompt_tokens: int, generated_tokens: Optional[int] = None, queue_wait_s: Optional[float] = None,
+               tokens_per_s: Optional[float] = None) -> None:
+    """LLM 호출 한 건(LLMClient 가 호출 스레드에서 기록). generated_tokens=None 은 생성 없는 호출(라벨 점수)."""
+    if not METRICS_ENABLED:
+        return
+    stage = _stage.get()
+    if queue_wait_s is not None:
+        QUEUE_WAIT_SECONDS.observe(queue_wait_s, queue="llm_batch", stage=stage)
+    t = _current.get()
+    if t is None:
+        _observe_llm(stage, "none", prompt_tokens, generated_tokens, tokens_per_s)
+    else:
+        t.llm.append((stage, prompt_tokens, generated_tokens, tokens_per_s))
+
+
+def record_wait(queue: str, seconds: float) -> None:
+    """작업이 시작되기 전 대기(추론 스레드 풀, 모델 풀 동시 실행 상한)."""
+    if METRICS_ENABLED:
+        QUEUE_WAIT_SECONDS.observe(seconds, queue=queue, stage=_stage.get())
+
+
+def record_backend(tool: str, method: str, status: object, seconds: float) -> None:
+    """HTTP 백엔드 호출 한 건. status: 응답 코드 또는 "error"(연결 실패/타임아웃)."""
+    if METRICS_ENABLED:
+        BACKEND_SECONDS.observe(seconds, tool=tool, method=method, status=status)
@@ -1,26 +1,139 @@
-from typing import Any, Dict
-import requests, uuid
-from capstone_ai.config import MCP_AUTH_HEADER, MCP_AUTH_TOKEN
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from capstone_ai.config import MCP_AUTH_HEADER, MCP_AUTH_TOKEN, MCP_BATCH_MAX, MCP_TOOLS_CACHE_TTL_S
+from capstone_ai.mcp.transport import AsyncHttpTransport, HttpTransport, shared_async_transport, shared_transport
 
-class MCPClient:
-    """단순 HTTP JSON-RPC 2.0 클라이언트. 엔드포인트가 ws:// 인 경우는 주석 안내 참조."""
-    def __init__(self, endpoint: str, timeout: int = 30):
+Timeout = Union[float, Tuple[float, float]]
+
+
+class MCPError(RuntimeError):
+    """JSON-RPC error 응답(배치에서는 해당 호출만 실패)."""
+
+
+class MCPSession:
+    """
+    MCP 서버(HTTP JSON-RPC 2.0)와의 지속 세션.
+    - 공유 전송 계층의 keep-alive 연결 재사용, 인증 헤더는 한 번만 구성, id 는 세션 내 증가 정수
+    - call_many: 여러 call_tool 을 JSON-RPC 배치 한 번의 POST 로 보내고 응답을 id 로 매칭(요청 순서로 반환)
+    - list_tools: 서버 도구 목록(tools/list)을 ttl 동안 캐시
+    엔드포인트가 ws:// 인 경우는 주석 안내 참조.
+    """
+
+    def __init__(self, endpoint: str, timeout: Timeout = 30,
+                 transport: Optional[HttpTransport] = None, atransport: Optional[AsyncHttpTransport] = None,
+                 batch_max: int = MCP_BATCH_MAX, tools_ttl_s: float = MCP_TOOLS_CACHE_TTL_S):
         self.endpoint = endpoint.rstrip("/")
         self.timeout = timeout
+        self.transport = transport or shared_transport()
+        self._atransport = atransport
+        self.batch_max = max(1, int(batch_max))
+        self.tools_ttl_s = float(tools_ttl_s)
+        self.headers: Dict[str, str] = {MCP_AUTH_HEADER: MCP_AUTH_TOKEN} if MCP_AUTH_TOKEN else {}
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+        self._tools: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+        self.stats = {"round_trips": 0, "calls": 0}
 
-    def call_tool(self, name: str, args: Dict[str, Any], timeout: int | None = None) -> Any:
-        payload = {
-            "jsonrpc": "2.0",
-            "id": str(uuid.uuid4()),
-            "method": name,
-            "params": args or {}
-        }
-        headers = {}
-        if MCP_AUTH_TOKEN:
-            headers[MCP_AUTH_HEADER] = MCP_AUTH_TOKEN 
-        r = requests.post(self.endpoint, json=payload, headers=headers, timeout=timeout or self.timeout)
-        r.raise_for_status()
-        data = r.json()
+    @property
+    def atransport(self) -> AsyncHttpTransport:
+        if self._atransport is None:
+            self._atransport = shared_async_transport()
+        return self._atransport
+
+    # ----- 메시지 구성/해석 -----
+    def _next_id(self) -> int:
+        with self._id_lock:
+            return next(self._ids)
+
+    def _message(self, method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params or {}}
+
+    def _timeout(self, timeout: Optional[Timeout]) -> Tuple[float, float]:
+        t = timeout or self.timeout
+        return t if isinstance(t, tuple) else (float(t), float(t))
+
+    @staticmethod
+    def _result(data: Dict[str, Any]) -> Any:
         if "error" in data:
-            raise RuntimeError(f"MCP error {data['error']}")
+            raise MCPError(f"MCP error {data['error']}")
         return data.get("result")
+
+    @classmethod
+    def _match(cls, messages: List[Dict[str, Any]], data: Any) -> List[Any]:
+        """배치 응답을 id 로 요청 순서에 맞춤. 실패/누락된 호출은 해당 위치에 예외 객체."""
+        if isinstance(data, dict):  # 배치 전체가 거부된 경우(단일 error 객체)
+            err = MCPError(f"MCP error {data.get('error', data)}")
+            return [err for _ in messages]
+        by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+        out: List[Any] = []
+        for m in messages:
+            item = by_id.get(m["id"])
+            if item is None:
+                out.append(MCPError(f"MCP error: no reply for id {m['id']}"))
+                continue
+            try:
+                out.append(cls._result(item))
+            except MCPError as e:
+                out.append(e)
+        return out
+
+    def _chunks(self, calls: Sequence[Tuple[str, Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        messages = [self._message(name, args) for name, args in calls]
+        return [messages[i:i + self.batch_max] for i in range(0, len(messages), self.batch_max)]
+
+    # ----- 동기 -----
+    def _post(self, payload: Any, timeout: Optional[Timeout]) -> Any:
+        # 도구 호출은 부작용이 있을 수 있으므로 재시도하지 않음
+        r = self.transport.request("POST", self.endpoint, json=payload, headers=self.headers,
+                                   timeout=self._timeout(timeout), retry=False)
+        r.raise_for_status()
+        self.stats["round_trips"] += 1
+        return r.json()
+
+    def call_tool(self, name: str, args: Dict[str, Any], timeout: Optional[Timeout] = None) -> Any:
+        self.stats["calls"] += 1
+        return self._result(self._post(self._message(name, args), timeout))
+
+    def call_many(self, calls: Sequence[Tuple[str, Dict[str, Any]]], timeout: Optional[Timeout] = None) -> List[Any]:
+        """[(name, args), ...] → 결과 리스트(실패한 호출은 MCPError 객체). batch_max 개씩 한 POST."""
+        self.stats["calls"] += len(calls)
+        out: List[Any] = []
+        for chunk in self._chunks(calls):
+            out.extend(self._match(chunk, self._post(chunk, timeout)))
+        return out
+
+    def list_tools(self, refresh: bool = False, timeout: Optional[Timeout] = None) -> List[Dict[str, Any]]:
+        cached = self._tools
+        if cached and not refresh and time.monotonic() - cached[0] < self.tools_ttl_s:
+            return cached[1]
+        result = self._result(self._post(self._message("tools/list", None), timeout)) or {}
+        tools = result.get("tools", []) if isinstance(result, dict) else list(result)
+        self._tools = (time.monotonic(), tools)
+        return tools
+
+    # ----- 비동기 -----
+    async def _apost(self, payload: Any, timeout: Optional[Timeout]) -> Any:
+        r = await self.atransport.request("POST", self.endpoint, json=payload, headers=self.headers,
+                                          timeout=self._timeout(timeout), retry=False)
+        r.raise_for_status()
+        self.stats["round_trips"] += 1
+        return r.json()
+
+    async def acall_tool(self, name: str, args: Dict[str, Any], timeout: Optional[Timeout] = None) -> Any:
+        """call_tool 의 비동기 버전(이벤트 루프에서 직접 대기)."""
+        self.stats["calls"] += 1
+        return self._result(await self._apost(self._message(name, args), timeout))
+
+    async def acall_many(self, calls: Sequence[Tuple[str, Dict[str, Any]]], timeout: Optional[Timeout] = None) -> List[Any]:
+        """call_many 의 비동기 버전. batch_max 를 넘으면 나눈 배치들을 동시에 전송."""
+        self.stats["calls"] += len(calls)
+        chunks = self._chunks(calls)
+        replies = await asyncio.gather(*(self._apost(chunk, timeout) for chunk in chunks))
+        return [res for chunk, data in zip(chunks, replies) for res in self._match(chunk, data)]
+
+
+# 하위 호환: 기존 이름
+MCPClient = MCPSession
@@ -1,29 +1,61 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from capstone_ai.core.session_store import InMemorySessionStore, SessionStore, VersionConflict
+
+STORE_NS = "clarify"
+
 
 class ClarifyManager:
-    def __init__(self):
-        self._pending: Dict[str, Dict[str, Any]] = {}
+    """
+    도구 실행 전 부족한 파라미터를 되묻는 대기 상태. SessionStore 에 저장해 여러 워커가 공유
+    (store 를 주지 않으면 프로세스 로컬). get() 은 매번 새 dict 를 반환.
+    """
+
+    MAX_RETRIES = 5
+
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.store = store or InMemorySessionStore()
 
     def has(self, cid: str) -> bool:
-        return cid in self._pending
+        return self.store.version(STORE_NS, cid) is not None
 
     def set_pending(self, cid: str, tool_name: str, schema: Dict[str, Any], collected: Dict[str, Any]):
-        self._pending[cid] = {
+        state = {
             "tool_name": tool_name,
             "schema": schema,
             "required": schema["parameters"].get("required", []),
             "collected": collected,
         }
+        for _ in range(self.MAX_RETRIES):
+            version = self.store.version(STORE_NS, cid) or 0
+            try:
+                self.store.save(STORE_NS, cid, state, version)
+                return
+            except VersionConflict:
+                continue
+        raise VersionConflict(f"{STORE_NS}:{cid}")
 
-    def get(self, cid: str) -> Dict[str, Any]:
-        return self._pending[cid]
+    def get(self, cid: str) -> Optional[Dict[str, Any]]:
+        """대기 상태 조회. 다른 워커가 이미 처리(clear)했으면 None."""
+        got = self.store.load(STORE_NS, cid)
+        return got[1] if got else None
 
     def update_collected(self, cid: str, merged: Dict[str, Any]):
-        self._pending[cid]["collected"] = merged
+        for _ in range(self.MAX_RETRIES):
+            got = self.store.load(STORE_NS, cid)
+            if got is None:
+                raise KeyError(cid)
+            version, state = got
+            state["collected"] = merged
+            try:
+                self.store.save(STORE_NS, cid, state, version)
+                return
+            except VersionConflict:
+                continue
+        raise VersionConflict(f"{STORE_NS}:{cid}")
 
     def clear(self, cid: str):
-        if cid in self._pending:
-            del self._pending[cid]
+        self.store.delete(STORE_NS, cid)
 
     def make_question_kor(self, tool_name: str, schema: Dict[str, Any], missing: List[str]) -> str:
         props = schema["parameters"].get("properties", {})
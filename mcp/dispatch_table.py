@@ -35,6 +35,7 @@ DISPATCH_TABLE = {
                 "startTime": "body.startTime",
                 "endTime": "body.endTime"
             },
+            "retry": True,                         # 조회용 POST(부작용 없음) → 재시도 허용
         }
     },
     "meeting_save": {
@@ -1,6 +1,20 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
+import httpx
+import requests
+
+from capstone_ai.config import HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S, TOOL_IO_WORKERS, TOOL_CALL_DEADLINE_S
+from capstone_ai.core import tracing
+from capstone_ai.mcp.transport import AsyncHttpTransport, HttpTransport, shared_async_transport, shared_transport
+
+log = logging.getLogger("dna.http")
+
 @dataclass
 class ExecSpec:
     type: str               
@@ -8,6 +22,10 @@ class ExecSpec:
     method: Optional[str] = None   
     url: Optional[str] = None      
     mapping: Optional[Dict[str, str]] = None 
+    connect_timeout: Optional[float] = None   # 초. None 이면 HTTP_CONNECT_TIMEOUT_S
+    read_timeout: Optional[float] = None      # 초. None 이면 HTTP_READ_TIMEOUT_S
+    retry: Optional[bool] = None              # None: 멱등 메서드만 재시도 / True: 재시도 허용(조회용 POST 등)
+    deadline_s: Optional[float] = None        # 비동기 실행 시 호출 전체(대기+재시도 포함) 마감. None 이면 TOOL_CALL_DEADLINE_S
 
 class BaseExecutor:
     def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
@@ -31,83 +49,93 @@ class LocalExecutor(BaseExecutor):
         return {"tool": tool_name, "error": f"Unknown local fn: {fn}"}
 
 class MCPExecutor(BaseExecutor):
-    def __init__(self, client: "MCPClient"):
+    def __init__(self, client: "MCPSession"):
         self.client = client
 
     def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
         result = self.client.call_tool(spec.name or tool_name, params, timeout=spec_timeout(spec))
         return {"tool": tool_name, "result": result}
 
-def spec_timeout(spec: ExecSpec) -> int:
-    return 30
+def spec_timeout(spec: ExecSpec) -> Tuple[float, float]:
+    """(connect, read) 타임아웃."""
+    connect = spec.connect_timeout if spec.connect_timeout is not None else HTTP_CONNECT_TIMEOUT_S
+    read = spec.read_timeout if spec.read_timeout is not None else HTTP_READ_TIMEOUT_S
+    return float(connect), float(read)
 
-class HttpExecutor(BaseExecutor):
-    def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
-        import requests, json, logging
-        log = logging.getLogger("dna.http")
+def _http_call(params: Dict[str, Any], spec: ExecSpec) -> Tuple[str, str, Dict[str, Any], Dict[str, Any]]:
+    """mapping 에 따라 파라미터를 query/body 로 나눔 → (method, url, query, body)."""
+    method  = (spec.method or "GET").upper()
+    mapping = spec.mapping or {}
+    url     = spec.url or ""
 
-        method  = (spec.method or "GET").upper()
-        mapping = spec.mapping or {}
-        url     = spec.url or ""
-        if not url:
-            return {"tool": tool_name, "error": "HTTP spec.url missing"}
+    q, body = {}, {}
+    for pk, target in mapping.items():
+        if pk in params and params[pk] is not None:
+            if target.startswith("query."):
+                q[target.split(".", 1)[1]] = params[pk]
+            elif target.startswith("body."):
+                body[target.split(".", 1)[1]] = params[pk]
 
-        q, body = {}, {}
-        for pk, target in mapping.items():
-            if pk in params and params[pk] is not None:
-                if target.startswith("query."):
-                    q[target.split(".", 1)[1]] = params[pk]
-                elif target.startswith("body."):
-                    body[target.split(".", 1)[1]] = params[pk]
+    try:
+        log.info("[HTTP EXEC] %s %s params=%s body=%s",
+                 method, url, q, json.dumps(body, ensure_ascii=False))
+    except Exception:
+        pass
+    return method, url, q, body
 
-        headers = {"Accept": "application/json"}  
-        timeout = spec_timeout(spec)
+def _http_result(tool_name: str, method: str, url: str, r: Any) -> Dict[str, Any]:
+    """requests/httpx 응답 공통 처리."""
+    try:
+        sent_body = r.request.content if hasattr(r.request, "content") else r.request.body
+        if isinstance(sent_body, bytes):
+            sent_body = sent_body.decode("utf-8", "ignore")
+        log.info("[HTTP EXEC SENT] %s %s sent_body=%s", method, url, sent_body)
+    except Exception:
+        pass
+    content_type = r.headers.get("content-type", "")
 
+    if r.status_code >= 400:
+        err_json = None
         try:
-            log.info("[HTTP EXEC] %s %s params=%s body=%s",
-                     method, url, q, json.dumps(body, ensure_ascii=False))
+            err_json = r.json()
         except Exception:
-            pass
+            err_json = None
+        return {
+            "tool": tool_name,
+            "http_status": r.status_code,
+            "reason": getattr(r, "reason", None) or getattr(r, "reason_phrase", ""),
+            "url": url,
+            "error_code": (err_json or {}).get("error"),
+            "error_message": (err_json or {}).get("message") or r.text[:2000],
+            "response_body": (err_json if err_json is not None else r.text[:2000]),
+        }
 
-        try:
-            if method == "GET":
-                r = requests.get(url, params=q, headers=headers, timeout=timeout)
-            else:
-                r = requests.request(method, url, params=q, json=(body or None),
-                                     headers=headers, timeout=timeout)
-            try:
-                sent_body = r.request.body
-                if isinstance(sent_body, bytes):
-                    sent_body = sent_body.decode("utf-8", "ignore")
-                log.info("[HTTP EXEC SENT] %s %s sent_body=%s", method, url, sent_body)
-            except Exception:
-                pass
-            content_type = r.headers.get("content-type", "")
-
-            if r.status_code >= 400:
-                err_json = None
-                try:
-                    err_json = r.json()
-                except Exception:
-                    err_json = None
-                return {
-                    "tool": tool_name,
-                    "http_status": r.status_code,
-                    "reason": r.reason,
-                    "url": url,
-                    "error_code": (err_json or {}).get("error"),
-                    "error_message": (err_json or {}).get("message") or r.text[:2000],
-                    "response_body": (err_json if err_json is not None else r.text[:2000]),
-                }
-
-            data = r.json() if content_type.startswith("application/json") else r.text
-            return {"tool": tool_name, "http_status": r.status_code, "data": data}
+    data = r.json() if content_type.startswith("application/json") else r.text
+    return {"tool": tool_name, "http_status": r.status_code, "data": data}
+
+_HEADERS = {"Accept": "application/json"}
+
+class HttpExecutor(BaseExecutor):
+    def __init__(self, transport: Optional[HttpTransport] = None):
+        self.transport = transport or shared_transport()
 
+    def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        if not spec.url:
+            return {"tool": tool_name, "error": "HTTP spec.url missing"}
+        method, url, q, body = _http_call(params, spec)
+        t0, status = time.perf_counter(), "error"
+        try:
+            r = self.transport.request(method, url, params=q, json=(body or None) if method != "GET" else None,
+                                       headers=_HEADERS, timeout=spec_timeout(spec), retry=spec.retry)
+            status = r.status_code
+            return _http_result(tool_name, method, url, r)
         except requests.RequestException as e:
             return {"tool": tool_name, "error": str(e), "url": url}
+        finally:
+            tracing.record_backend(tool_name, method, status, time.perf_counter() - t0)
 
 class CompositeExecutor:
-    def __init__(self, mcp_client: Optional["MCPClient"]=None):
+    def __init__(self, mcp_client: Optional["MCPSession"]=None):
         self.local = LocalExecutor()
         self.http = HttpExecutor()
         self.mcp = MCPExecutor(mcp_client) if mcp_client else None
@@ -122,4 +150,140 @@ class CompositeExecutor:
             if not self.mcp:
                 return {"tool": tool_name, "error": "MCP client not configured"}
             return self.mcp.execute(tool_name, params, spec)
-        return {"tool": tool_name, "error": f"Unknown exec type: {spec.type}"}
\ No newline at end of file
+        return {"tool": tool_name, "error": f"Unknown exec type: {spec.type}"}
+
+# ===== 비동기 실행기 =====
+class AsyncLocalExecutor:
+    def __init__(self):
+        self._sync = LocalExecutor()
+
+    async def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        # 로컬 도구는 I/O 없는 계산이라 이벤트 루프에서 바로 실행
+        return self._sync.execute(tool_name, params, spec)
+
+class AsyncHttpExecutor:
+    def __init__(self, transport: Optional[AsyncHttpTransport] = None):
+        self._transport = transport
+
+    @property
+    def transport(self) -> AsyncHttpTransport:
+        if self._transport is None:
+            self._transport = shared_async_transport()
+        return self._transport
+
+    async def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        if not spec.url:
+            return {"tool": tool_name, "error": "HTTP spec.url missing"}
+        method, url, q, body = _http_call(params, spec)
+        t0, status = time.perf_counter(), "error"
+        try:
+            r = await self.transport.request(method, url, params=q, json=(body or None) if method != "GET" else None,
+                                             headers=_HEADERS, timeout=spec_timeout(spec), retry=spec.retry)
+            status = r.status_code
+            return _http_result(tool_name, method, url, r)
+        except httpx.HTTPError as e:
+            return {"tool": tool_name, "error": str(e) or type(e).__name__, "url": url}
+        finally:
+            tracing.record_backend(tool_name, method, status, time.perf_counter() - t0)
+
+class AsyncMCPExecutor:
+    def __init__(self, client: "MCPSession"):
+        self.client = client
+
+    async def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        result = await self.client.acall_tool(spec.name or tool_name, params, timeout=spec_timeout(spec))
+        return {"tool": tool_name, "result": result}
+
+    async def execute_batch(self, calls: Sequence[Tuple[str, Dict[str, Any], ExecSpec]]) -> List[Dict[str, Any]]:
+        """여러 MCP 호출을 JSON-RPC 배치 한 번의 왕복으로. 타임아웃은 호출들 중 가장 긴 값."""
+        timeout = tuple(max(t) for t in zip(*(spec_timeout(spec) for _, _, spec in calls)))
+        results = await self.client.acall_many(
+            [(spec.name or tool_name, params) for tool_name, params, spec in calls], timeout=timeout
+        )
+        return [
+            {"tool": tool_name, "error": str(res)} if isinstance(res, Exception) else {"tool": tool_name, "result": res}
+            for (tool_name, _, _), res in zip(calls, results)
+        ]
+
+class AsyncCompositeExecutor:
+    """
+    CompositeExecutor 의 비동기 버전. 도구 I/O 가 스레드 풀/추론 스레드를 점유하지 않음.
+    - 동시 실행 수 제한(max_concurrency), 호출별 마감(spec.deadline_s → 기본 deadline_s, 동시성 대기 포함)
+    - 실패/마감 초과는 예외 대신 {"tool", "error"} 결과로 돌려 호출 간 격리
+    - execute_many: 서로 독립인 호출들을 동시에 실행하고 요청 순서대로 결과 반환.
+      MCP 호출이 둘 이상이면 JSON-RPC 배치 한 번의 왕복으로 묶음(마감은 그중 가장 긴 값)
+    """
+    def __init__(self, mcp_client: Optional["MCPSession"] = None, transport: Optional[AsyncHttpTransport] = None,
+                 max_concurrency: int = TOOL_IO_WORKERS, deadline_s: float = TOOL_CALL_DEADLINE_S):
+        self.local = AsyncLocalExecutor()
+        self.http = AsyncHttpExecutor(transport)
+        self.mcp = AsyncMCPExecutor(mcp_client) if mcp_client else None
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.deadline_s = float(deadline_s)
+        # 이벤트 루프별 동시 실행 세마포어(루프 안에서 처음 쓸 때 생성. asyncio.run() 을 반복해도 닫힌 루프에 묶이지 않음)
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    async def _dispatch(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        t = (spec.type or "local").lower()
+        if t == "local":
+            return await self.local.execute(tool_name, params, spec)
+        if t == "http":
+            return await self.http.execute(tool_name, params, spec)
+        if t == "mcp":
+            if not self.mcp:
+                return {"tool": tool_name, "error": "MCP client not configured"}
+            return await self.mcp.execute(tool_name, params, spec)
+        return {"tool": tool_name, "error": f"Unknown exec type: {spec.type}"}
+
+    async def _limited(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with slots:
+            return await fn()
+
+    def _deadline(self, spec: ExecSpec) -> float:
+        return spec.deadline_s if spec.deadline_s is not None else self.deadline_s
+
+    async def _guarded(self, names: List[str], fn: Callable[[], Awaitable[Any]], deadline: float, fallback: Callable[[str], Any]) -> Any:
+        """마감/예외를 호출 결과({"tool", "error"})로 바꿈."""
+        try:
+            return await asyncio.wait_for(self._limited(fn), timeout=deadline)
+        except asyncio.TimeoutError:
+            log.warning("[TOOL DEADLINE] %s exceeded %.1fs", ",".join(names), deadline)
+            return fallback(f"deadline exceeded ({deadline:.1f}s)")
+        except Exception as e:
+            log.exception("[TOOL EXEC] %s failed", ",".join(names))
+            return fallback(str(e) or type(e).__name__)
+
+    async def execute(self, tool_name: str, params: Dict[str, Any], spec: ExecSpec) -> Dict[str, Any]:
+        return await self._guarded(
+            [tool_name], lambda: self._dispatch(tool_name, params, spec), self._deadline(spec),
+            lambda err: {"tool": tool_name, "error": err},
+        )
+
+    async def execute_many(self, calls: Sequence[Tuple[str, Dict[str, Any], ExecSpec]]) -> List[Dict[str, Any]]:
+        """calls: [(tool_name, params, spec), ...] → 같은 순서의 결과 리스트."""
+        calls = list(calls)
+        mcp_idx = [i for i, (_, _, spec) in enumerate(calls) if (spec.type or "").lower() == "mcp"] if self.mcp else []
+        if len(mcp_idx) < 2:
+            return list(await asyncio.gather(*(self.execute(*c) for c in calls)))
+
+        batch = [calls[i] for i in mcp_idx]
+        in_batch = set(mcp_idx)
+        rest = [i for i in range(len(calls)) if i not in in_batch]
+        batched, *others = await asyncio.gather(
+            self._guarded(
+                [c[0] for c in batch], lambda: self.mcp.execute_batch(batch),
+                max(self._deadline(spec) for _, _, spec in batch),
+                lambda err: [{"tool": c[0], "error": err} for c in batch],
+            ),
+            *(self.execute(*calls[i]) for i in rest),
+        )
+        out: List[Dict[str, Any]] = [None] * len(calls)  # type: ignore[list-item]
+        for i, res in zip(mcp_idx, batched):
+            out[i] = res
+        for i, res in zip(rest, others):
+            out[i] = res
+        return out
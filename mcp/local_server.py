@@ -0,0 +1,102 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from capstone_ai.mcp.tools import TOOLS
+
+
+def _echo(name: str) -> Callable[[Dict[str, Any]], Any]:
+    return lambda params: {"tool": name, "ok": True, "params": params}
+
+
+class LocalMCPServer:
+    """
+    테스트/개발용 MCP 대역 서버(HTTP JSON-RPC 2.0, 단일·배치 요청 모두 처리).
+    - handlers: 메서드 이름 → fn(params). 없으면 TOOLS 의 도구들을 받은 파라미터를 그대로 돌려주는 echo 로 등록
+    - tools/list 는 TOOLS 스키마(name/description/parameters)를 반환
+    - round_trips / calls 로 왕복 수와 호출 수를 확인
+        with LocalMCPServer() as srv:
+            session = MCPSession(srv.endpoint)
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.handlers = dict(handlers) if handlers is not None else {t["name"]: _echo(t["name"]) for t in TOOLS}
+        self.round_trips = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _call(self, msg: Any) -> Dict[str, Any]:
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or "method" not in msg:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        mid, method = msg.get("id"), msg["method"]
+        with self._lock:
+            self.calls += 1
+        if method == "tools/list":
+            tools = [{k: t[k] for k in ("name", "description", "parameters") if k in t} for t in TOOLS]
+            return {"jsonrpc": "2.0", "id": mid, "result": {"tools": tools}}
+        fn = self.handlers.get(method)
+        if fn is None:
+            return {"jsonrpc": "2.0", "id": mid, "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        try:
+            return {"jsonrpc": "2.0", "id": mid, "result": fn(msg.get("params") or {})}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": mid, "error": {"code": -32000, "message": str(e)}}
+
+    def handle(self, payload: Any) -> Any:
+        with self._lock:
+            self.round_trips += 1
+        if isinstance(payload, list):
+            if not payload:
+                return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+            return [self._call(m) for m in payload]
+        return self._call(payload)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                n = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(n) or b"null")
+                    reply = server.handle(payload)
+                except json.JSONDecodeError:
+                    reply = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+                body = json.dumps(reply, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "LocalMCPServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="local-mcp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalMCPServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
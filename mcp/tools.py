@@ -11,6 +11,12 @@ TOOLS = [
                 "roleName":   {"type": "string",  "description": "변경할 역할 이름"}
             }
         },
+        "examples": [
+            "김민수의 역할을 백엔드로 변경해줘",
+            "이영희를 디자이너 역할로 바꿔 주세요",
+            "박지훈에게 PM 역할 추가해줘",
+            "팀원 역할 변경",
+        ],
         "exec": { "type": "mcp", "name": "change_role" }
     },
     {
@@ -25,6 +31,13 @@ TOOLS = [
                 "startDate":   {"type": "date",  "description": "시작 날짜(YYYY-MM-DD)"}
             }
         },
+        "examples": [
+            "오늘 회의 잡아줘",
+            "내일 3시 미팅 예약해줘",
+            "다음 주 월요일에 킥오프 일정 만들어줘",
+            "8월 20일에 발표 준비 일정 추가",
+            "금요일 코드 리뷰 일정 등록해 주세요",
+        ],
         "exec": { "type": "mcp", "name": "todo_create" }
     },
     {
@@ -40,6 +53,13 @@ TOOLS = [
                 "endTime":    {"type": "string",  "description": "종료 시각(YYYY-MM-DDTHH:MM:SS)"},
                 "title":      {"type": "string",  "description": "회의록 제목(선택, 미지정 시 자동 생성)"}
             }
-        }
+        },
+        "examples": [
+            "어제 회의 내용 회의록으로 정리해줘",
+            "10시부터 11시까지 요약",
+            "8월 20일 회의록 작성",
+            "오늘 대화 내용 회의록 만들어줘",
+            "오후 2시~4시 채팅 요약해서 회의록 저장",
+        ],
     },
 ]
\ No newline at end of file
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from capstone_ai.config import HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE, HTTP_RETRIES, HTTP_RETRY_BACKOFF_S
+
+log = logging.getLogger("dna.http")
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS = frozenset({502, 503, 504})
+
+
+def host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_retryable(method: str, retry: Optional[bool]) -> bool:
+    """retry=None 이면 메서드로 판단(멱등 메서드만 재시도)."""
+    return (method.upper() in IDEMPOTENT_METHODS) if retry is None else bool(retry)
+
+
+class _PoolMetrics:
+    """호스트별 사용 중 연결 수·최대치·포화 횟수(풀이 가득 찬 상태에서 요청한 횟수)·재시도/오류 집계."""
+
+    def __init__(self, pool_maxsize: int, retries: int, backoff_s: float, backoff_max_s: float):
+        self.pool_maxsize = max(1, int(pool_maxsize))
+        self.retries = max(0, int(retries))
+        self.backoff_s = float(backoff_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+    def _host(self, url: str) -> Dict[str, int]:
+        key = host_key(url)
+        h = self._hosts.get(key)
+        if h is None:
+            h = self._hosts[key] = {
+                "in_flight": 0, "peak": 0, "saturated": 0, "requests": 0, "retries": 0, "errors": 0,
+            }
+        return h
+
+    def _acquire(self, url: str) -> Dict[str, int]:
+        with self._lock:
+            h = self._host(url)
+            if h["in_flight"] >= self.pool_maxsize:
+                h["saturated"] += 1
+                if h["saturated"] % 100 == 1:  # 로그 폭주 방지
+                    log.warning("[HTTP POOL] saturated %s in_flight=%d max=%d (total %d)",
+                                url, h["in_flight"], self.pool_maxsize, h["saturated"])
+            h["in_flight"] += 1
+            h["requests"] += 1
+            h["peak"] = max(h["peak"], h["in_flight"])
+            return h
+
+    def _release(self, h: Dict[str, int], *, error: bool = False) -> None:
+        with self._lock:
+            h["in_flight"] -= 1
+            h["errors"] += int(error)
+
+    def _count_retry(self, h: Dict[str, int]) -> None:
+        with self._lock:
+            h["retries"] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_s * (2 ** attempt)))
+
+    def host_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._hosts.items()}
+
+
+class HttpTransport(_PoolMetrics):
+    """
+    백엔드 호출용 공유 HTTP 전송 계층(동기).
+    - requests.Session + HTTPAdapter: 호스트별 keep-alive 연결 풀(최대 pool_maxsize 개, 초과 시 반환될 때까지 대기)
+    - timeout 은 (connect, read) 튜플로 호출마다 지정
+    - 재시도: 멱등 메서드이거나 retry=True 로 표시된 호출만, 연결 오류/타임아웃/502·503·504 에 대해 지터 지수 백오프
+    - stats(): 호스트별 지표 + 풀별 연 연결 수/처리 요청 수
+    """
+
+    def __init__(
+        self,
+        pool_hosts: int = HTTP_POOL_HOSTS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        retries: int = HTTP_RETRIES,
+        backoff_s: float = HTTP_RETRY_BACKOFF_S,
+        backoff_max_s: float = 5.0,
+    ):
+        super().__init__(pool_maxsize, retries, backoff_s, backoff_max_s)
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(
+            pool_connections=max(1, int(pool_hosts)), pool_maxsize=self.pool_maxsize, pool_block=True, max_retries=0
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+    def stats(self) -> Dict[str, Any]:
+        hosts = self.host_stats()
+        pools = self._adapter.poolmanager.pools
+        conns = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                conns[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                    "opened": pool.num_connections, "served": pool.num_requests,
+                }
+        return {"pool_maxsize": self.pool_maxsize, "hosts": hosts, "connections": conns}
+
+    # ----- 호출 -----
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Tuple[float, float],
+        retry: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """마지막 시도의 응답을 그대로 반환하거나 예외를 전파."""
+        method = method.upper()
+        attempts = 1 + (self.retries if is_retryable(method, retry) else 0)
+        for attempt in range(attempts):
+            h = self._acquire(url)
+            try:
+                r = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._release(h, error=True)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._backoff(attempt)
+                log.info("[HTTP RETRY] %s %s (%s) in %.2fs", method, url, type(e).__name__, delay)
+            except Exception:
+                self._release(h, error=True)
+                raise
+            else:
+                self._release(h)
+                if r.status_code not in RETRY_STATUS or attempt + 1 >= attempts:
+                    return r
+                r.close()
+                delay = self._backoff(attempt)
+                log.info("[HTTP RETRY] %s %s (status %d) in %.2fs", method, url, r.status_code, delay)
+            self._count_retry(h)
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+
+class AsyncHttpTransport(_PoolMetrics):
+    """
+    HttpTransport 의 비동기 버전(httpx.AsyncClient). 이벤트 루프에서 직접 호출하므로 스레드를 점유하지 않음.
+    - httpx 의 연결 한도는 전체 기준이라, 호스트별 한도는 세마포어(pool_maxsize)로 맞춤
+    - 재시도 정책/지표는 HttpTransport 와 동일
+    - 클라이언트(연결 풀)와 세마포어는 이벤트 루프별. 풀링된 연결은 만든 루프에 묶여 있어,
+      asyncio.run() 을 여러 번 부르는 스크립트/테스트에서 닫힌 루프의 연결을 재사용하지 않음
+    """
+
+    def __init__(
+        self,
+        pool_hosts: int = HTTP_POOL_HOSTS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        retries: int = HTTP_RETRIES,
+        backoff_s: float = HTTP_RETRY_BACKOFF_S,
+        backoff_max_s: float = 5.0,
+    ):
+        super().__init__(pool_maxsize, retries, backoff_s, backoff_max_s)
+        limit = self.pool_maxsize * max(1, int(pool_hosts))
+        self._limits = httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+        # 루프 → (클라이언트, 호스트별 세마포어). 루프가 사라지면 항목도 사라짐
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]]" = weakref.WeakKeyDictionary()
+        self._loops_lock = threading.Lock()
+
+    def _loop_state(self) -> Tuple[httpx.AsyncClient, Dict[str, asyncio.Semaphore]]:
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = (httpx.AsyncClient(limits=self._limits), {})
+            return state
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """현재 이벤트 루프의 클라이언트(루프 안에서만)."""
+        return self._loop_state()[0]
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        host_slots = self._loop_state()[1]
+        key = host_key(url)
+        sem = host_slots.get(key)
+        if sem is None:
+            sem = host_slots[key] = asyncio.Semaphore(self.pool_maxsize)
+        return sem
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pool_maxsize": self.pool_maxsize, "hosts": self.host_stats()}
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Tuple[float, float],
+        retry: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """마지막 시도의 응답을 그대로 반환하거나 예외를 전파. timeout=(connect, read)."""
+        method = method.upper()
+        attempts = 1 + (self.retries if is_retryable(method, retry) else 0)
+        connect, read = timeout
+        tmo = httpx.Timeout(read, connect=connect)
+        for attempt in range(attempts):
+            h = self._acquire(url)
+            try:
+                async with self._slots(url):
+                    r = await self.client.request(method, url, timeout=tmo, **kwargs)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                self._release(h, error=True)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._backoff(attempt)
+                log.info("[HTTP RETRY] %s %s (%s) in %.2fs", method, url, type(e).__name__, delay)
+            except BaseException:
+                self._release(h, error=True)
+                raise
+            else:
+                self._release(h)
+                if r.status_code not in RETRY_STATUS or attempt + 1 >= attempts:
+                    return r
+                delay = self._backoff(attempt)
+                log.info("[HTTP RETRY] %s %s (status %d) in %.2fs", method, url, r.status_code, delay)
+            self._count_retry(h)
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def aclose(self) -> None:
+        """현재 이벤트 루프의 클라이언트를 닫음."""
+        with self._loops_lock:
+            state = self._loops.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+
+
+_shared: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> HttpTransport:
+    """프로세스 전역 전송 계층(첫 호출 시 생성). 도구 실행기들이 연결 풀을 공유."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpTransport()
+        return _shared
+
+
+_shared_async: Optional[AsyncHttpTransport] = None
+
+
+def shared_async_transport() -> AsyncHttpTransport:
+    """프로세스 전역 비동기 전송 계층(첫 호출 시 생성)."""
+    global _shared_async
+    with _shared_lock:
+        if _shared_async is None:
+            _shared_async = AsyncHttpTransport()
+        return _shared_async
@@ -1,102 +1,272 @@
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
 import os
+import threading
+import time
+import uuid
+import weakref
 
 from capstone_ai.api.models import ChatRequest, ChatResponse
-from capstone_ai.core.llm import LLMClient
+from capstone_ai.core import tracing
 from capstone_ai.core.memory import InMemoryHistory
+from capstone_ai.core.compaction import HistoryCompactor
+from capstone_ai.core.session_store import make_session_store
+from capstone_ai.core.batching import GenerationCancelled
 from capstone_ai.core.router import AutoRouter
-from capstone_ai.core.prompts import build_schema_prompt
+from capstone_ai.core.model_pool import ModelPool
+from capstone_ai.core.prompts import build_schema_prompt, build_schema_instructions
+from capstone_ai.core.stopping import JsonObjectEnd
+from capstone_ai.core.system_prompt import DEFAULT_SYSTEM_PROMPT
 from capstone_ai.mcp.catalog import ToolCatalog
-from capstone_ai.mcp.executor import CompositeExecutor, ExecSpec
+from capstone_ai.mcp.executor import AsyncCompositeExecutor, CompositeExecutor, ExecSpec
 from capstone_ai.mcp.clarify import ClarifyManager
 from capstone_ai.utils.json_utils import parse_json_object
 from capstone_ai.utils.params import apply_defaults_and_coerce, validate_required
 from capstone_ai.mcp.tools import TOOLS
-from capstone_ai.mcp.adapter import MCPClient
-from capstone_ai.core.answer import AnswerSynthesizer
-from capstone_ai.config import MCP_ENDPOINT
+from capstone_ai.mcp.adapter import MCPSession
+from capstone_ai.mcp.transport import shared_async_transport
+from capstone_ai.core.answer import AnswerSynthesizer, StreamSanitizer
+from capstone_ai.config import MCP_ENDPOINT, INFERENCE_WORKERS, CONSTRAINED_JSON_ENABLED, ROUTER_FUNCTION_CALL
+from capstone_ai.config import HISTORY_COMPACTION_ENABLED, HISTORY_COMPACT_BATCH, MEETING_SUMMARY_CACHE_ENABLED
+from capstone_ai.config import MEETING_JOB_MODE, JOB_STORE_PATH, WARMUP_MAX_NEW_TOKENS, SESSION_LEASE_S
 from capstone_ai.mcp.dispatch import ToolDispatcher
 from capstone_ai.mcp.dispatch_table import DISPATCH_TABLE
-from capstone_ai.service.meeting_pipeline import run_meeting_pipeline
+from capstone_ai.service.meeting_pipeline import arun_meeting_pipeline, prepare_meeting_params, run_meeting_pipeline
+from capstone_ai.service.meeting_cache import MeetingSummaryCache
+from capstone_ai.service.jobs import JobRunner, JobSteps, JobStore
+
+if TYPE_CHECKING:
+    from capstone_ai.core.llm import LLMClient
+
+WARMUP_UTTERANCE = "이번 주 회의 내용 정리해줘"
 
 
 class ChatService:
-    def __init__(self):
-        self.llm = LLMClient()
-        self.memory = InMemoryHistory()
+    def __init__(self, llm: Optional["LLMClient"] = None, pool: Optional[ModelPool] = None):
+        """
+        모델은 용도별 풀에서(MODEL_POOL): 라우팅/추출/NLG 는 작은 모델, 대화/요약은 큰 모델로 나눌 수 있음.
+        llm 을 주면 그 클라이언트 하나로 모든 용도를 처리(모델 로드는 풀이 처음 요청할 때 = 서비스 생성 시점).
+        """
+        self.pool = pool or (ModelPool.single(llm) if llm is not None else ModelPool.from_config())
+        self.llm = self.pool.get("chat")
+        self.extract_llm = self.pool.get("extract")
+        self.summary_llm = self.pool.get("summarize")
+        self.store = make_session_store()
+        self.memory = InMemoryHistory(token_counter=self.llm.count_tokens, store=self.store)
         self.catalog = ToolCatalog(TOOLS)
-        self.router = AutoRouter(self.llm, self.catalog)
-        self.executor = CompositeExecutor(mcp_client=MCPClient(endpoint=MCP_ENDPOINT))
-        self.clarify = ClarifyManager()
-        self.synth = AnswerSynthesizer(self.llm)
+        self.router = AutoRouter(self.pool.get("route"), self.catalog)
+        self.executor = AsyncCompositeExecutor(mcp_client=MCPSession(endpoint=MCP_ENDPOINT))
+        self.clarify = ClarifyManager(store=self.store)
+        self.synth = AnswerSynthesizer(self.pool.get("nlg"))
         self.dispatcher = ToolDispatcher(DISPATCH_TABLE)
-
-
-    def _run_chat(self, cid: str, user_input: str) -> ChatResponse:
-        history = self.memory.get_chat(cid)
-        self.memory.append_chat(cid, "user", user_input)
-        answer = self.llm.complete(history, max_new_tokens=512, temperature=0.7)
-        self.memory.append_chat(cid, "assistant", answer)
+        self.llm.register_prefix("chat_system", [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}])
+        self.memory.add_rewrite_listener(self.llm.invalidate_session)
+        self.compactor = HistoryCompactor(
+            self.memory, self.summary_llm, batch_size=HISTORY_COMPACT_BATCH
+        ) if HISTORY_COMPACTION_ENABLED else None
+        self.meeting_cache = MeetingSummaryCache() if MEETING_SUMMARY_CACHE_ENABLED else None
+        # 제약 디코딩 토큰 클래스는 로드 시점에(첫 요청이 어휘 전체 디코딩을 기다리지 않도록)
+        if CONSTRAINED_JSON_ENABLED:
+            self.extract_llm.prepare_json_constraints()
+        if ROUTER_FUNCTION_CALL:
+            self.pool.get("route").prepare_json_constraints()
+
+        # 모델 호출 전용 풀(크기 제한). 도구 I/O 는 비동기 실행기가 이벤트 루프에서 처리.
+        self._infer_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="llm-infer")
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_loop_lock = threading.Lock()
+        # 회의록 백그라운드 작업: 작업 모드이거나 이전 실행의 미완료 작업(queued/running)이 남아 있으면 바로 시작
+        self._jobs: Optional[JobRunner] = None
+        self._job_store: Optional[JobStore] = None
+        if MEETING_JOB_MODE or (os.path.exists(JOB_STORE_PATH) and self._open_job_store().pending()):
+            self.jobs()
+
+    def _open_job_store(self) -> JobStore:
+        if self._job_store is None:
+            self._job_store = JobStore(JOB_STORE_PATH)
+        return self._job_store
+
+    def jobs(self) -> JobRunner:
+        if self._jobs is None:
+            self._job_executor = CompositeExecutor(mcp_client=MCPSession(endpoint=MCP_ENDPOINT))
+            self._jobs = JobRunner(self._open_job_store(), {"meeting_create": self._meeting_job}).start()
+        return self._jobs
+
+    def job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """상태 조회만(워커를 시작하거나 작업 파일을 새로 만들지 않음)."""
+        if self._job_store is None and not os.path.exists(JOB_STORE_PATH):
+            return None
+        return self._open_job_store().get(job_id)
+
+    async def _infer(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """추론 스레드 풀에서 실행. 추적 컨텍스트(요청/단계)를 넘기고 풀 대기 시간을 기록."""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def run() -> Any:
+            tracing.record_wait("infer_pool", time.perf_counter() - submitted)
+            return fn(*args, **kwargs)
+
+        return await loop.run_in_executor(self._infer_pool, ctx.run, run)
+
+    async def _store_io(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        히스토리/보류 상태(memory, clarify) 호출. 공유 저장소를 쓰면 쓰기 커밋 대기·버전 충돌 재시도(sleep)가 있으므로
+        기본 스레드 풀에서 실행해 이벤트 루프를 막지 않음. 저장소가 없으면(프로세스 로컬) 바로 호출.
+        """
+        if self.store is None:
+            return fn(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    def _session_lock(self, cid: str) -> asyncio.Lock:
+        """project_id 별 락: 같은 세션의 턴은 도착 순서대로 하나씩 처리."""
+        lock = self._session_locks.get(cid)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[cid] = lock
+        return lock
+
+    @asynccontextmanager
+    async def _turn(self, cid: str) -> AsyncIterator[None]:
+        """
+        같은 project_id 의 턴을 하나씩 처리. 프로세스 안에서는 _session_lock, 공유 저장소(SESSION_STORE=sqlite)를
+        쓰면 워커 사이에서도 저장소 임대로 직렬화(처리 중에는 SESSION_LEASE_S/3 마다 연장, 워커가 죽으면 만료 후 회수).
+        """
+        async with self._session_lock(cid):
+            if self.store is None:
+                yield
+                return
+            loop = asyncio.get_running_loop()
+            key, owner = f"turn:{cid}", f"{os.getpid()}:{uuid.uuid4().hex}"
+            delay = 0.01
+            while not await loop.run_in_executor(None, self.store.try_lease, key, owner, SESSION_LEASE_S):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.25)
+
+            async def heartbeat() -> None:
+                while True:
+                    await asyncio.sleep(SESSION_LEASE_S / 3)
+                    await loop.run_in_executor(None, self.store.try_lease, key, owner, SESSION_LEASE_S)
+
+            renew = asyncio.create_task(heartbeat())
+            try:
+                yield
+            finally:
+                renew.cancel()
+                await loop.run_in_executor(None, self.store.release_lease, key, owner)
+
+    def warmup(self, path: str) -> None:
+        """
+        첫 요청 전에 한 경로를 미리 실행(히스토리/세션에 남기지 않음). 커널·토크나이저 템플릿·접두 KV 가 준비됨.
+        - router: 운영 설정의 LLM 라우팅 단계 1회
+        - schema: 모든 도구 스키마 지침의 접두 KV 등록 + 첫 도구로 인자 추출 1회(제약 디코딩 포함)
+        - chat: 시스템 프롬프트 + 짧은 대화 생성
+        """
+        ctx = {"projectId": 0}
+        if path == "router":
+            self.router.warmup(WARMUP_UTTERANCE, context=ctx)
+        elif path == "schema":
+            schemas = self.catalog.list()
+            for schema in schemas:
+                self.extract_llm.register_prefix(
+                    f"schema:{schema['name']}", [{"role": "system", "content": build_schema_instructions(schema)}]
+                )
+            if schemas:
+                self._extract_params(schemas[0], WARMUP_UTTERANCE, context=ctx, max_new_tokens=WARMUP_MAX_NEW_TOKENS)
+        elif path == "chat":
+            self.llm.complete(
+                [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}, {"role": "user", "content": "안녕하세요"}],
+                max_new_tokens=WARMUP_MAX_NEW_TOKENS, temperature=0.7,
+            )
+        else:
+            raise ValueError(f"unknown warmup path: {path}")
+
+    def _extract_params(self, schema: Dict[str, Any], user_input: str, prefix_hint: str | None = None, context: Dict[str, Any] | None = None, max_new_tokens: int = 256) -> Dict[str, Any]:
+        """
+        스키마 프롬프트로 JSON 파라미터 추출. 도구별 고정 지침은 접두 KV 캐시로 재사용.
+        CONSTRAINED_JSON_ENABLED 이면 parameters 스키마로 제약 디코딩(항상 유효한 객체, 닫히면 종료).
+        """
+        self.extract_llm.register_prefix(
+            f"schema:{schema['name']}", [{"role": "system", "content": build_schema_instructions(schema)}]
+        )
+        schema_prompt = build_schema_prompt(schema, prefix_hint=prefix_hint, context=context)
+        messages = [{"role": "system", "content": schema_prompt}, {"role": "user", "content": user_input}]
+        if CONSTRAINED_JSON_ENABLED:
+            return self.extract_llm.complete_json(messages, schema.get("parameters") or {}, max_new_tokens=max_new_tokens, temperature=0.2)
+        raw = self.extract_llm.complete(messages, max_new_tokens=max_new_tokens, temperature=0.2, stop=[JsonObjectEnd()])
+        return parse_json_object(raw)
+
+    async def _run_chat(self, cid: str, user_input: str, on_token: Optional[Callable[[str], None]] = None) -> ChatResponse:
+        await self._store_io(self.memory.append_chat, cid, "user", user_input)
+        history = await self._store_io(self.memory.get_chat, cid)
+        with tracing.span("chat"):
+            answer = await self._infer(
+                self.llm.complete, history, max_new_tokens=512, temperature=0.7, session=cid, on_token=on_token
+            )
+        await self._store_io(self.memory.append_chat, cid, "assistant", answer)
         return ChatResponse(project_id=cid, route="chat", output=answer)
 
 
-    def _run_mcp(self, cid: str, tool_name: str, schema: Dict[str, Any], user_input: str) -> ChatResponse:
-        schema_prompt = build_schema_prompt(schema, context={"projectId": cid})
-        raw = self.llm.complete(
-            [{"role": "system", "content": schema_prompt}, {"role": "user", "content": user_input}],
-            max_new_tokens=256, temperature=0.2
-        )
-        params = parse_json_object(raw)
+    async def _run_mcp(self, cid: str, tool_name: str, schema: Dict[str, Any], user_input: str, params: Dict[str, Any] | None = None) -> ChatResponse:
+        if params is None:
+            with tracing.span("extract"):
+                params = await self._infer(self._extract_params, schema, user_input, context={"projectId": cid})
         params = apply_defaults_and_coerce(schema, params)
 
         ok, missing = validate_required(schema, params)
         if not ok:
-            self.clarify.set_pending(cid, tool_name, schema, params)
+            await self._store_io(self.clarify.set_pending, cid, tool_name, schema, params)
             question = self.clarify.make_question_kor(tool_name, schema, missing)
-            self.memory.append_tool(
-                cid, "assistant", question,
+            await self._store_io(
+                self.memory.append_tool, cid, "assistant", question,
                 meta={"type": "clarify", "tool": tool_name, "missing": missing}
             )
             return ChatResponse(project_id=cid, route="clarify", output=question, missing=missing)
 
-        spec_dict = self.dispatcher.pick(
-            tool_name, params, context={"projectId": cid, "env": os.getenv("APP_ENV", "prod")}
-        )
-        allowed = {"type", "name", "url", "method", "mapping"}
-        spec = ExecSpec(**{k: v for k, v in spec_dict.items() if k in allowed})
-        result = self.executor.execute(tool_name, params, spec)
+        with tracing.span("dispatch"):
+            spec_dict = self.dispatcher.pick(
+                tool_name, params, context={"projectId": cid, "env": os.getenv("APP_ENV", "prod")}
+            )
+            allowed = {"type", "name", "url", "method", "mapping", "connect_timeout", "read_timeout", "retry", "deadline_s"}
+            spec = ExecSpec(**{k: v for k, v in spec_dict.items() if k in allowed})
+        with tracing.span("tool"):
+            result = await self.executor.execute(tool_name, params, spec)
 
         route_label = "http" if (getattr(spec, "type", "") or "").lower() == "http" else "mcp"
+        history = await self._store_io(self.memory.get_chat, cid)
         try:
-            nlg = self.synth.compose(self.memory.get_chat(cid), tool_name, params, result)
+            with tracing.span("nlg"):
+                nlg = await self._infer(self.synth.compose, history, tool_name, params, result)
             result_out = {**result, "_answer": nlg}
-            self.memory.append_chat(cid, "assistant", nlg)
         except Exception:
             result_out = result
-            self.memory.append_chat(cid, "assistant", f"[{tool_name}] {result}")
-        self.memory.append_chat(cid, "user", user_input)
+            nlg = f"[{tool_name}] {result}"
+        await self._store_io(self.memory.append_chat, cid, "assistant", nlg)
+        await self._store_io(self.memory.append_chat, cid, "user", user_input)
         return ChatResponse(project_id=cid, route=route_label, output=result_out)
 
-    def _resume_from_clarify(self, cid: str, user_input: str) -> ChatResponse:
-        state = self.clarify.get(cid)
+    async def _resume_from_clarify(self, cid: str, user_input: str) -> ChatResponse:
+        state = await self._store_io(self.clarify.get, cid)
         if not state:
             return ChatResponse(project_id=cid, route="chat", output="이전 보류 요청을 찾지 못했습니다. 다시 요청해 주시겠습니까?")
 
         tool_name = state["tool_name"]
         schema = state["schema"]
         collected = state.get("collected", {}) or {}
+        tracing.set_labels(tool=tool_name)
 
         hint = (
             "You previously asked for missing parameters. "
             f"Here are collected params so far: {collected}. "
             "Merge the user's new info and return the full parameters object."
         )
-        schema_prompt = build_schema_prompt(schema, prefix_hint=hint, context={"projectId": cid})
-        raw = self.llm.complete(
-            [{"role": "system", "content": schema_prompt}, {"role": "user", "content": user_input}],
-            max_new_tokens=256, temperature=0.2
-        )
-        new_params = parse_json_object(raw)
+        with tracing.span("clarify"):
+            new_params = await self._infer(self._extract_params, schema, user_input, prefix_hint=hint, context={"projectId": cid})
         merged = apply_defaults_and_coerce(schema, {**collected, **new_params})
 
         def _normalize_change_role_params(p: dict) -> dict:
@@ -126,31 +296,35 @@ class ChatService:
                 ok = False
 
         if not ok:
-            self.clarify.update_collected(cid, merged)
+            await self._store_io(self.clarify.update_collected, cid, merged)
             question = self.clarify.make_question_kor(tool_name, schema, missing)
-            self.memory.append_tool(
-                cid, "assistant", question,
+            await self._store_io(
+                self.memory.append_tool, cid, "assistant", question,
                 meta={"type": "clarify", "tool": tool_name, "missing": missing}
             )
             return ChatResponse(project_id=cid, route="clarify", output=question, missing=missing)
 
-        self.clarify.clear(cid)
-        spec_dict = self.dispatcher.pick(
-            tool_name, merged, context={"projectId": merged.get("projectId", cid), "env": os.getenv("APP_ENV", "prod")}
-        )
-        allowed = {"type", "name", "url", "method", "mapping"}
-        spec = ExecSpec(**{k: v for k, v in spec_dict.items() if k in allowed})
-        result = self.executor.execute(tool_name, merged, spec)
+        await self._store_io(self.clarify.clear, cid)
+        with tracing.span("dispatch"):
+            spec_dict = self.dispatcher.pick(
+                tool_name, merged, context={"projectId": merged.get("projectId", cid), "env": os.getenv("APP_ENV", "prod")}
+            )
+            allowed = {"type", "name", "url", "method", "mapping", "connect_timeout", "read_timeout", "retry", "deadline_s"}
+            spec = ExecSpec(**{k: v for k, v in spec_dict.items() if k in allowed})
+        with tracing.span("tool"):
+            result = await self.executor.execute(tool_name, merged, spec)
         route_label = "http" if (getattr(spec, "type", "") or "").lower() == "http" else "mcp"
 
-        self.memory.append_tool(cid, "user", user_input, meta={"type": "clarify", "tool": tool_name})
+        await self._store_io(self.memory.append_tool, cid, "user", user_input, meta={"type": "clarify", "tool": tool_name})
+        history = await self._store_io(self.memory.get_chat, cid)
         try:
-            nlg = self.synth.compose(self.memory.get_chat(cid), tool_name, merged, result)
+            with tracing.span("nlg"):
+                nlg = await self._infer(self.synth.compose, history, tool_name, merged, result)
             out = {**result, "_answer": nlg}
-            self.memory.append_chat(cid, "assistant", nlg)
         except Exception:
             out = result
-            self.memory.append_chat(cid, "assistant", f"[{tool_name}] {result}")
+            nlg = f"[{tool_name}] {result}"
+        await self._store_io(self.memory.append_chat, cid, "assistant", nlg)
         return ChatResponse(project_id=cid, route=route_label, output=out)
 
     def _normalize_meeting_params(self, p: dict, cid: str) -> dict:
@@ -168,44 +342,193 @@ class ChatService:
                     pass
         return q
 
-    def _run_meeting(self, cid: str, schema: dict, user_input: str) -> ChatResponse:
-        schema_prompt = build_schema_prompt(schema, context={"projectId": int(cid)})
-        raw = self.llm.complete(
-            [{"role": "system", "content": schema_prompt}, {"role": "user", "content": user_input}],
-            max_new_tokens=256, temperature=0.2
-        )
-        params = parse_json_object(raw)
+    async def _run_meeting(self, cid: str, schema: dict, user_input: str, on_token: Optional[Callable[[str], None]] = None, params: Dict[str, Any] | None = None, async_job: Optional[bool] = None) -> ChatResponse:
+        if params is None:
+            with tracing.span("extract"):
+                params = await self._infer(self._extract_params, schema, user_input, context={"projectId": int(cid)})
         params = apply_defaults_and_coerce(schema, params)
         params = self._normalize_meeting_params(params, cid)
 
         ok, missing = validate_required(schema, params)
         if not ok:
-            self.clarify.set_pending(cid, "meeting_create", schema, params)
+            await self._store_io(self.clarify.set_pending, cid, "meeting_create", schema, params)
             ask = self.clarify.make_question_kor("meeting_create", schema, missing)
-            self.memory.append_tool(
-                cid, "assistant", ask,
+            await self._store_io(
+                self.memory.append_tool, cid, "assistant", ask,
                 meta={"type": "clarify", "tool": "meeting_create", "missing": missing}
             )
             return ChatResponse(project_id=cid, route="clarify", output=ask, missing=missing)
 
-        result = run_meeting_pipeline(self.executor, self.llm, params, user_input)
+        if MEETING_JOB_MODE if async_job is None else async_job:
+            # 작업 저장소 쓰기(sqlite)도 이벤트 루프 밖에서
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._submit_meeting_job, cid, params, user_input
+            )
+
+        result = await arun_meeting_pipeline(
+            self.executor, self.summary_llm, params, user_input, run_infer=self._infer, on_token=on_token,
+            cache=self.meeting_cache,
+        )
+        answer = self._meeting_answer(params, result)
+        await self._store_io(self.memory.append_chat, cid, "assistant", answer)
+        return ChatResponse(project_id=cid, route="http", output={**result, "_answer": answer})
 
+    @staticmethod
+    def _meeting_answer(params: Dict[str, Any], result: Dict[str, Any]) -> str:
         save_info = result.get("save") or {}
         http_status = save_info.get("http_status", 200) if isinstance(save_info, dict) else 500
         if http_status < 400:
             title = (result.get("summary") or {}).get("title", "회의록")
-            answer = (
+            return (
                 "회의록을 생성했습니다.\n"
                 f"- 범위: {params['startTime'].replace('T',' ')} ~ {params['endTime'].replace('T',' ')}\n"
                 f"- 제목: {title}\n"
             )
-        else:
-            answer = "[ERROR] 회의록 생성 중 오류가 발생했습니다. 서버 응답을 확인해 주세요."
-
+        return "[ERROR] 회의록 생성 중 오류가 발생했습니다. 서버 응답을 확인해 주세요."
+
+    def _submit_meeting_job(self, cid: str, params: Dict[str, Any], user_input: str) -> ChatResponse:
+        """파이프라인을 작업 큐에 넣고 작업 id 를 바로 반환. 진행/결과는 /ai/jobs/{id} 로 조회."""
+        err = prepare_meeting_params(params, user_input)
+        if err:
+            answer = f"[ERROR] 회의록 범위를 확인하지 못했습니다({err['error']})."
+            return ChatResponse(project_id=cid, route="http", output={**err, "_answer": answer})
+        job = self.jobs().submit(
+            "meeting_create", {"project_id": cid, "params": params, "utterance": user_input}, project_id=cid
+        )
+        answer = (
+            "회의록 생성을 시작했습니다. 완료되면 결과를 확인할 수 있습니다.\n"
+            f"- 범위: {params['startTime'].replace('T',' ')} ~ {params['endTime'].replace('T',' ')}\n"
+            f"- 작업: {job['id']}\n"
+        )
         self.memory.append_chat(cid, "assistant", answer)
-        return ChatResponse(project_id=cid, route="http", output={**result, "_answer": answer})
+        output = {"tool": "meeting_create", "job_id": job["id"], "status": job["status"], "_answer": answer}
+        return ChatResponse(project_id=cid, route="job", output=output)
+
+    def _meeting_job(self, payload: Dict[str, Any], steps: JobSteps) -> Dict[str, Any]:
+        """
+        작업 워커 스레드에서 실행. 생성 요청은 백그라운드 우선순위로 배처에 들어가 대화 요청에 양보.
+        결과에는 요약과 저장 결과만 남김(대화 원문은 작업 저장소에 넣지 않음). 회수된 작업은 끝난 단계를 건너뜀.
+        """
+        cid, params = payload["project_id"], payload["params"]
+        with tracing.trace("job", route="job_worker", tool="meeting_create"), self.summary_llm.background():
+            result = run_meeting_pipeline(
+                self._job_executor, self.summary_llm, params, payload["utterance"], cache=self.meeting_cache, on_step=steps
+            )
+        if result.get("error"):
+            return result
+        answer = self._meeting_answer(params, result)
+        self.memory.append_chat(cid, "assistant", answer)
+        return {**result, "_answer": answer}
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """handle() 전용 이벤트 루프(데몬 스레드에서 계속 실행). 세션 락·HTTP 클라이언트가 호출마다 새 루프에 묶이지 않도록."""
+        with self._sync_loop_lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="chat-sync-loop", daemon=True).start()
+                self._sync_loop = loop
+            return self._sync_loop
+
+    async def aclose(self) -> None:
+        """
+        종료: 백그라운드 작업(회의록 작업, 히스토리 요약)을 멈추고 → 비동기 HTTP 클라이언트를 닫고(현재 루프와
+        handle() 전용 루프) → 세션 저장소의 대기 중인 group commit 쓰기를 반영한 뒤 닫음.
+        """
+        loop = asyncio.get_running_loop()
+        if self._jobs is not None:
+            await loop.run_in_executor(None, self._jobs.stop)
+        if self.compactor is not None:
+            await loop.run_in_executor(None, self.compactor.stop)
+        transport = shared_async_transport()
+        await transport.aclose()
+        if self._sync_loop is not None:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(transport.aclose(), self._sync_loop))
+            self._sync_loop.call_soon_threadsafe(self._sync_loop.stop)
+        if self.store is not None:
+            await loop.run_in_executor(None, self.store.close)
+        self._infer_pool.shutdown(wait=False)
 
     def handle(self, req: ChatRequest) -> ChatResponse:
+        """동기 호출용(스크립트/테스트). 서버 경로는 ahandle 사용. 같은 세션 턴은 ahandle 과 같은 방식으로 직렬화."""
+        return asyncio.run_coroutine_threadsafe(self.ahandle(req), self._background_loop()).result()
+
+    async def ahandle(self, req: ChatRequest) -> ChatResponse:
+        async with self._turn(req.project_id):
+            return await self._dispatch(req)
+
+    async def astream(self, req: ChatRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        스트리밍 처리. ("delta", 텍스트 조각) 을 생성되는 대로 내보내고 마지막에 ("done", ChatResponse).
+        - 일반 대화/회의록 요약은 토큰 단위로, 도구 응답(템플릿/NLG)은 완성된 답변을 한 조각으로 전달
+        - 마스킹은 StreamSanitizer 로 청크 경계를 넘어서도 동일하게 적용, done 의 output 문자열 값에도 적용
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        gone = threading.Event()  # 소비자(SSE 클라이언트)가 사라짐 → 생성 중단
+
+        def on_token(delta: str) -> None:  # 추론 스레드에서 호출됨
+            if gone.is_set():
+                raise GenerationCancelled()
+            loop.call_soon_threadsafe(queue.put_nowait, ("delta", delta))
+
+        async def run() -> None:
+            try:
+                async with self._turn(req.project_id):
+                    resp = await self._dispatch(req, on_token=on_token)
+                queue.put_nowait(("done", resp))
+            except Exception as e:
+                queue.put_nowait(("error", e))
+
+        task = asyncio.create_task(run())
+        sanitizer = StreamSanitizer(self.synth)
+        streamed = False
+        try:
+            while True:
+                kind, data = await queue.get()
+                if kind == "delta":
+                    text = sanitizer.feed(data if streamed else data.lstrip())
+                    streamed = streamed or bool(data.strip())
+                    if text:
+                        yield "delta", text
+                    continue
+                if kind == "error":
+                    raise data
+                tail = sanitizer.flush()
+                if tail:
+                    yield "delta", tail
+                if not streamed:
+                    out = data.output
+                    answer = out.get("_answer") if isinstance(out, dict) else out
+                    if isinstance(answer, str) and answer:
+                        yield "delta", self.synth._sanitize(answer)
+                await task
+                yield "done", ChatResponse(project_id=data.project_id, route=data.route,
+                                           output=self._masked(data.output), missing=data.missing)
+                return
+        finally:
+            # 클라이언트가 끊겨 제너레이터가 닫히면: 생성을 다음 토큰에서 멈추고 턴(세션 락/임대)을 풀어 줌
+            if not task.done():
+                gone.set()
+                task.cancel()
+
+    def _masked(self, value: Any) -> Any:
+        """응답 payload 의 문자열 값(중첩 dict/list 포함)에 delta 와 같은 마스킹 적용."""
+        if isinstance(value, str):
+            return self.synth._sanitize(value)
+        if isinstance(value, dict):
+            return {k: self._masked(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._masked(v) for v in value]
+        return value
+
+    async def _dispatch(self, req: ChatRequest, on_token: Optional[Callable[[str], None]] = None) -> ChatResponse:
+        """요청 하나를 추적(core/tracing.py): 단계별 지연·토큰 수를 최종 route(응답 경로)/tool 라벨로 /metrics 에 집계."""
+        with tracing.trace("chat"):
+            resp = await self._dispatch_request(req, on_token=on_token)
+            tracing.set_labels(route=resp.route)
+            return resp
+
+    async def _dispatch_request(self, req: ChatRequest, on_token: Optional[Callable[[str], None]] = None) -> ChatResponse:
         cid = req.project_id
         user_input = req.user_input
         mode = (req.mode or "auto").lower()
@@ -217,24 +540,34 @@ class ChatService:
                 ctx["chatRoomId"] = int(chat_room_id)
             except:
                 pass
-        self.memory.ensure_context(cid, ctx)
+        await self._store_io(self.memory.ensure_context, cid, ctx)
 
-        if self.clarify.has(cid):
-            return self._resume_from_clarify(cid, user_input)
+        if await self._store_io(self.clarify.has, cid):
+            return await self._resume_from_clarify(cid, user_input)
 
         if mode == "chat":
-            return self._run_chat(cid, user_input)
+            return await self._run_chat(cid, user_input, on_token=on_token)
 
         if mode in ("auto", "mcp"):
-            route_token = self.router.decide(user_input, context={"projectId": cid})
+            args = None
+            with tracing.span("route"):
+                if ROUTER_FUNCTION_CALL:
+                    # 라우팅과 인자 추출을 한 번의 생성으로(빠른 단계가 결정한 경우 args 는 None → 기존 추출)
+                    route_token, args = await self._infer(self.router.decide_call, user_input, context={"projectId": cid})
+                else:
+                    route_token = await self._infer(self.router.decide, user_input, context={"projectId": cid})
             schema = self.catalog.find(route_token)
+            if schema is not None:
+                tracing.set_labels(tool=route_token)
 
             if route_token == "CHAT" or schema is None:
-                return self._run_chat(cid, user_input)
+                return await self._run_chat(cid, user_input, on_token=on_token)
 
             if route_token == "meeting_create":
-                return self._run_meeting(cid, schema, user_input)
+                return await self._run_meeting(
+                    cid, schema, user_input, on_token=on_token, params=args, async_job=getattr(req, "async_job", None)
+                )
 
-            return self._run_mcp(cid, route_token, schema, user_input)
+            return await self._run_mcp(cid, route_token, schema, user_input, params=args)
 
-        return self._run_chat(cid, user_input)
\ No newline at end of file
+        return await self._run_chat(cid, user_input, on_token=on_token)
\ No newline at end of file
@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from capstone_ai.config import JOB_STORE_PATH, JOB_WORKERS, JOB_LEASE_S, JOB_MAX_ATTEMPTS, JOB_POLL_S, JOB_RETENTION_S
+
+log = logging.getLogger("dna.jobs")
+
+# 작업 종류별 진행 단계(상태 조회 시 progress 계산에 사용)
+JOB_STEPS: Dict[str, List[str]] = {"meeting_create": ["fetch", "summarize", "save"]}
+
+# handler(payload, on_step) → 결과 dict. 결과에 "error" 가 있으면 failed 로 기록.
+# on_step 은 JobSteps(호출하면 단계 보고, .done/.record 로 끝난 단계 출력 조회·기록)
+JobHandler = Callable[[Dict[str, Any], "JobSteps"], Dict[str, Any]]
+
+
+class JobStore:
+    """
+    백그라운드 작업 상태 저장소(SQLite, WAL). 여러 uvicorn 워커가 같은 파일을 공유.
+    - status: queued → running → done | failed
+    - 실행 중인 작업은 owner/lease_until 로 점유. 하트비트가 끊겨 lease 가 지나면(워커 비정상 종료)
+      다른 워커가 다시 가져감(max_attempts 회까지, 넘으면 failed)
+    - checkpoints: 끝난 단계의 출력(JSON). 회수한 워커는 이를 이어받아 끝난 단계(특히 저장)를 다시 실행하지 않음
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, project_id TEXT,"
+            " status TEXT NOT NULL, step TEXT, payload TEXT NOT NULL, result TEXT, error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_until REAL,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        if "checkpoints" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)").fetchall()}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN checkpoints TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["checkpoints"] = json.loads(job["checkpoints"]) if job.get("checkpoints") else {}
+        return job
+
+    def create(self, kind: str, payload: Dict[str, Any], project_id: Optional[str] = None) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, project_id, status, payload, created_at, updated_at)"
+            " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, project_id, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # fetchall: 읽기 트랜잭션(WAL 스냅샷)을 바로 닫아 다음 조회가 최신 커밋을 봄
+        rows = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchall()
+        return self._row(rows[0]) if rows else None
+
+    def claim(self, owner: str, lease_s: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """대기 중이거나 lease 가 끝난 작업 하나를 원자적으로 점유. 없으면 None."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'worker lost (max attempts)', owner = NULL, updated_at = ?"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchall()
+            if not rows:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE id = ?",
+                (owner, now + lease_s, now, rows[0]["id"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(rows[0]["id"])
+
+    def set_step(self, job_id: str, owner: str, step: str, lease_s: float) -> bool:
+        """점유 중인 작업의 단계 갱신(+lease 연장). 다른 워커가 회수했으면 False."""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET step = ?, lease_until = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (step, now + lease_s, now, job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def checkpoint(self, job_id: str, owner: str, step: str, output: Any) -> bool:
+        """점유 중인 작업에 끝난 단계의 출력 기록. 다른 워커가 회수했으면 False."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT checkpoints FROM jobs WHERE id = ? AND owner = ? AND status = 'running'", (job_id, owner)
+            ).fetchall()
+            if rows:
+                done = json.loads(rows[0]["checkpoints"]) if rows[0]["checkpoints"] else {}
+                done[step] = output
+                conn.execute(
+                    "UPDATE jobs SET checkpoints = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(done, ensure_ascii=False, default=str), time.time(), job_id),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(rows)
+
+    def pending(self) -> int:
+        """끝나지 않은(queued/running) 작업 수. 시작 시 워커를 띄울지 판단."""
+        rows = self._conn().execute("SELECT COUNT(*) AS n FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        return int(rows[0]["n"])
+
+    def heartbeat(self, owner: str, lease_s: float) -> int:
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'", (now + lease_s, owner)
+        )
+        return cur.rowcount
+
+    def finish(self, job_id: str, owner: str, result: Dict[str, Any], error: Optional[str] = None) -> bool:
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, lease_until = NULL, updated_at = ?"
+            " WHERE id = ? AND owner = ? AND status = 'running'",
+            ("failed" if error else "done", json.dumps(result, ensure_ascii=False, default=str), error,
+             time.time(), job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def purge(self, older_than_s: float) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (time.time() - older_than_s,)
+        )
+        return cur.rowcount
+
+
+class JobSteps:
+    """
+    handler 에 넘기는 진행 보고 객체. steps("fetch") 처럼 호출하면 단계·lease 갱신.
+    done: 이전 시도까지 끝난 단계의 출력(회수된 작업이면 비어 있지 않음), record(): 끝난 단계 출력 저장.
+    """
+
+    def __init__(self, store: JobStore, job: Dict[str, Any], owner: str, lease_s: float):
+        self.store = store
+        self.job_id = job["id"]
+        self.owner = owner
+        self.lease_s = lease_s
+        self.done: Dict[str, Any] = dict(job.get("checkpoints") or {})
+
+    def __call__(self, step: str) -> None:
+        if not self.store.set_step(self.job_id, self.owner, step, self.lease_s):
+            log.warning("[JOB] %s lease lost at step %s", self.job_id, step)
+
+    def record(self, step: str, output: Any) -> None:
+        self.done[step] = output
+        if not self.store.checkpoint(self.job_id, self.owner, step, output):
+            log.warning("[JOB] %s lease lost recording step %s", self.job_id, step)
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """상태 조회용 요약(payload/result 제외). progress 는 끝난 단계 수 / 전체 단계 수."""
+    steps = JOB_STEPS.get(job["kind"], [])
+    if job["status"] == "done":
+        done = len(steps)
+    elif job["step"] in steps:
+        done = steps.index(job["step"])
+    else:
+        done = 0
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "project_id": job["project_id"],
+        "status": job["status"],
+        "step": job["step"],
+        "steps": steps,
+        "progress": {"done": done, "total": len(steps)},
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+class JobRunner:
+    """
+    작업 워커 풀(workers 개 스레드). 대화 요청용 추론 풀과 분리되어 긴 작업이 대화 스레드를 점유하지 않음.
+    - submit: 저장소에 queued 로 기록하고 즉시 반환(작업 id). 대기 중인 워커를 깨움
+    - 워커: claim → handler(payload, JobSteps) → finish. 단계마다 step/lease 갱신, 하트비트 스레드가 lease 연장
+    - 예외는 failed 로 기록(저장 등 부작용이 있어 자동 재시도하지 않음). 재시도는 워커가 죽어 lease 가 끝난 경우만.
+      이때 handler 는 JobSteps.done 으로 끝난 단계를 건너뜀(저장을 두 번 하지 않도록)
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], workers: int = JOB_WORKERS,
+                 lease_s: float = JOB_LEASE_S, max_attempts: int = JOB_MAX_ATTEMPTS, poll_s: float = JOB_POLL_S,
+                 retention_s: float = JOB_RETENTION_S):
+        self.store = store
+        self.handlers = dict(handlers)
+        self.workers = max(1, int(workers))
+        self.lease_s = float(lease_s)
+        self.max_attempts = max(1, int(max_attempts))
+        self.poll_s = float(poll_s)
+        self.retention_s = float(retention_s)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "reclaimed": 0}
+
+    def start(self) -> "JobRunner":
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """정지 후 워커를 timeout 초까지 기다림. 끝나지 않은 작업은 lease 만료 뒤 다른 워커(다음 실행)가 회수."""
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+    def submit(self, kind: str, payload: Dict[str, Any], project_id: Optional[str] = None) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise KeyError(f"unknown job kind: {kind}")
+        job = self.store.create(kind, payload, project_id)
+        self.stats["submitted"] += 1
+        self._wake.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(self.owner, self.lease_s, self.max_attempts)
+            except sqlite3.Error:
+                log.exception("[JOB] claim failed")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_s)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id, kind = job["id"], job["kind"]
+        if job["attempts"] > 1:
+            self.stats["reclaimed"] += 1
+            log.warning("[JOB] %s reclaimed (attempt %d, done=%s)", job_id, job["attempts"], sorted(job["checkpoints"]))
+        steps = JobSteps(self.store, job, self.owner, self.lease_s)
+        started = time.monotonic()
+        try:
+            result = self.handlers[kind](job["payload"], steps)
+            error = str(result["error"]) if isinstance(result, dict) and result.get("error") else None
+        except Exception as e:
+            log.exception("[JOB] %s failed", job_id)
+            result, error = {"tool": kind, "error": str(e)}, f"{type(e).__name__}: {e}"
+        if self.store.finish(job_id, self.owner, result, error):
+            self.stats["failed" if error else "done"] += 1
+            log.info("[JOB] %s %s in %.1fs", job_id, "failed" if error else "done", time.monotonic() - started)
+
+    def _heartbeat(self) -> None:
+        last_purge = 0.0
+        while not self._stop.wait(max(0.5, self.lease_s / 3)):
+            try:
+                self.store.heartbeat(self.owner, self.lease_s)
+                if self.retention_s > 0 and time.monotonic() - last_purge > 3600:
+                    self.store.purge(self.retention_s)
+                    last_purge = time.monotonic()
+            except sqlite3.Error:
+                log.exception("[JOB] heartbeat failed")
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from capstone_ai.config import WARMUP_ENABLED, WARMUP_PATHS
+
+log = logging.getLogger("dna.lifecycle")
+
+
+class NotReady(RuntimeError):
+    """서비스가 아직 로드/워밍업 중이거나 로드에 실패함."""
+
+
+class ServiceLifecycle:
+    """
+    ChatService 생성(토크나이저·모델 로드)과 워밍업을 백그라운드 스레드에서 진행.
+    서버는 바로 연결을 받고, /healthz·/readyz 가 단계별 진행 상황을 보고.
+    - 단계: import(torch/transformers) → load(서비스 생성) → warmup:<경로>... → ready
+      import/load 가 실패하면 failed(error 포함). 워밍업 실패는 경고만 남기고 계속(첫 요청이 느릴 뿐)
+    - get(): 준비된 서비스. 준비 전이면 NotReady
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None, warmup: bool = WARMUP_ENABLED,
+                 warmup_paths: Optional[List[str]] = None):
+        self._factory = factory
+        paths = list(WARMUP_PATHS if warmup_paths is None else warmup_paths) if warmup else []
+        self.steps: List[Dict[str, Any]] = [
+            {"name": name, "state": "pending", "elapsed_s": None} for name in ("import", "load")
+        ]
+        self.steps += [{"name": f"warmup:{p}", "state": "pending", "elapsed_s": None} for p in paths]
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.service: Any = None
+        self._loaded: Any = None   # 워밍업 중에도 모델 로드 통계를 보고하기 위해
+        self._started_at = time.monotonic()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "ServiceLifecycle":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="service-loader", daemon=True)
+                self._thread.start()
+        return self
+
+    def _import(self) -> None:
+        if self._factory is None:
+            import capstone_ai.core.llm  # noqa: F401  torch/transformers 로딩 시간을 따로 보고
+
+    def _make_service(self) -> Any:
+        if self._factory is not None:
+            return self._factory()
+        from capstone_ai.service.chat_service import ChatService
+        return ChatService()
+
+    def _step(self, step: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+        step["state"] = "running"
+        t0 = time.monotonic()
+        try:
+            return fn()
+        except Exception:
+            step["state"] = "failed"
+            raise
+        finally:
+            step["elapsed_s"] = round(time.monotonic() - t0, 3)
+            if step["state"] == "running":
+                step["state"] = "done"
+            log.info("[LIFECYCLE] %s %s in %.2fs", step["name"], step["state"], step["elapsed_s"])
+
+    def _run(self) -> None:
+        try:
+            self.status = "loading"
+            self._step(self.steps[0], self._import)
+            service = self._loaded = self._step(self.steps[1], self._make_service)
+            self.status = "warming_up"
+            for step in self.steps[2:]:
+                path = step["name"].split(":", 1)[1]
+                try:
+                    self._step(step, lambda: service.warmup(path))
+                except Exception:
+                    log.exception("[LIFECYCLE] %s failed; continuing", step["name"])
+            self.service = service
+            self.status = "ready"
+            self._ready.set()
+        except Exception as e:
+            log.exception("[LIFECYCLE] startup failed")
+            self.error = f"{type(e).__name__}: {e}"
+            self.status = "failed"
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def get(self) -> Any:
+        if not self.ready:
+            raise NotReady(self.error or f"service {self.status}")
+        return self.service
+
+    def report(self) -> Dict[str, Any]:
+        done = sum(1 for s in self.steps if s["state"] == "done")
+        out: Dict[str, Any] = {
+            "status": self.status,
+            "ready": self.ready,
+            "uptime_s": round(time.monotonic() - self._started_at, 3),
+            "progress": {"done": done, "total": len(self.steps)},
+            "steps": [dict(s) for s in self.steps],
+            "error": self.error,
+        }
+        llm = getattr(self._loaded, "llm", None)
+        if llm is not None and hasattr(llm, "load_stats"):
+            out["model"] = llm.load_stats
+        pool = getattr(self._loaded, "pool", None)
+        if pool is not None:
+            out["models"] = pool.report()
+        return out
+
+    async def shutdown(self) -> None:
+        """로드된 서비스 정리(작업 워커·요약기 정지, HTTP 클라이언트·세션 저장소 닫기). 로드 전이면 아무것도 안 함."""
+        aclose = getattr(self._loaded, "aclose", None)
+        if aclose is None:
+            return
+        try:
+            await aclose()
+        except Exception:
+            log.exception("[LIFECYCLE] shutdown failed")
+        else:
+            log.info("[LIFECYCLE] shutdown done")
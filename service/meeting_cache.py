@@ -0,0 +1,70 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from capstone_ai.config import MEETING_SUMMARY_CACHE_SIZE, MEETING_SUMMARY_CACHE_TTL_S, MEETING_SEGMENT_MINUTES
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class MeetingSummaryCache:
+    """
+    회의록 요약 캐시(LRU + TTL).
+    - 구간(segment) 요약: 키 (chatRoomId, 시간 버킷 시작), 값에 원문 조각의 content hash 를 함께 보관.
+      같은 버킷이라도 해시가 다르면(메시지 추가/수정) 변경으로 보고 다시 요약
+    - 최종 회의록: 키 (chatRoomId, 시작, 끝), 해시는 포함된 구간 해시들의 조합 → 같은 범위 재요청은 생성 없이 반환
+    """
+
+    def __init__(self, max_entries: int = MEETING_SUMMARY_CACHE_SIZE, ttl_s: float = MEETING_SUMMARY_CACHE_TTL_S,
+                 segment_minutes: int = MEETING_SEGMENT_MINUTES):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.segment = timedelta(minutes=max(1, int(segment_minutes)))
+        self._data: "OrderedDict[Hashable, Tuple[str, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "changed": 0, "evicted": 0, "expired": 0}
+
+    def bucket_of(self, ts: datetime) -> datetime:
+        """ts 가 속한 시간 버킷의 시작(자정 기준 segment_minutes 단위)."""
+        day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        return day + ((ts - day) // self.segment) * self.segment
+
+    def get(self, key: Hashable, digest: str) -> Optional[Any]:
+        with self._lock:
+            e = self._data.get(key)
+            if e is not None and self.ttl_s > 0 and time.monotonic() - e[2] > self.ttl_s:
+                del self._data[key]
+                self._stats["expired"] += 1
+                e = None
+            if e is None:
+                self._stats["misses"] += 1
+                return None
+            if e[0] != digest:
+                self._stats["misses"] += 1
+                self._stats["changed"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return e[1]
+
+    def put(self, key: Hashable, digest: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (digest, value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            looked = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._data),
+                "hit_rate": (self._stats["hits"] / looked) if looked else 0.0,
+                **self._stats,
+            }
@@ -1,9 +1,22 @@
-from typing import Dict, Any
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from capstone_ai.config import MEETING_CHUNK_TOKENS, MEETING_CHUNK_SUMMARY_TOKENS, MEETING_PREPROCESS_ENABLED
+from capstone_ai.core import tracing
 from capstone_ai.mcp.dispatch_table import DISPATCH_TABLE
-from capstone_ai.mcp.executor import ExecSpec, CompositeExecutor
-from capstone_ai.core.prompts import build_meeting_prompt
+from capstone_ai.mcp.executor import AsyncCompositeExecutor, ExecSpec, CompositeExecutor
+from capstone_ai.core.prompts import build_meeting_prompt, build_meeting_chunk_prompt
+from capstone_ai.core.stopping import StopStrings
+from capstone_ai.service.meeting_cache import MeetingSummaryCache, content_hash
+from capstone_ai.service.transcript import TranscriptPreprocessor, format_raw, iter_utterances
 from capstone_ai.utils.datetime import parse_ko_range_to_localdt, parse_date_only_to_full_day
 
+# 회의록 한 편을 다 쓴 뒤 두 번째 회의록이나 프롬프트 섹션을 다시 쓰기 시작하면 중단
+MEETING_STOP_STRINGS = ["\n제목:", "\n[원문 대화]", "\n[부분 요약", "\n[출력 형식]", "\n[작성 원칙]"]
+
+log = logging.getLogger("dna.meeting")
+
 
 def _auto_title(start: str, end: str) -> str:
     """예: 회의록(YYYY-MM-DD HH:MM~HH:MM)"""
@@ -12,19 +25,8 @@ def _auto_title(start: str, end: str) -> str:
     return f"회의록({sd[:16]}~{ed[11:16]})"
 
 
-def run_meeting_pipeline(
-    executor: CompositeExecutor,
-    llm,
-    params: Dict[str, Any],
-    utterance: str
-) -> Dict[str, Any]:
-    """
-    params: {projectId, chatRoomId, startTime, endTime, title?}
-    1) 시간 미기재 시 한국어 문장에서 (연도 규칙 포함) LocalDateTime 추론
-    2) meeting_chat 호출 → transcript 확보
-    3) LLM 요약 → title/contents 생성
-    4) meeting_save 호출
-    """
+def prepare_meeting_params(params: Dict[str, Any], utterance: str) -> Optional[Dict[str, Any]]:
+    """시간 미기재 시 한국어 문장에서 (연도 규칙 포함) LocalDateTime 추론. 필수값이 없으면 에러 dict 반환."""
     st, et = params.get("startTime"), params.get("endTime")
     if not st or not et:
         pst, pet = parse_ko_range_to_localdt(utterance)
@@ -40,14 +42,20 @@ def run_meeting_pipeline(
     for k in ("projectId", "chatRoomId", "startTime", "endTime"):
         if not params.get(k):
             return {"tool": "meeting_create", "error": f"missing {k}"}
+    return None
+
 
+def fetch_call(params: Dict[str, Any]) -> Tuple[str, Dict[str, Any], ExecSpec]:
     spec_fetch = ExecSpec(**DISPATCH_TABLE["meeting_chat"]["exec"])
     fetch_in = {
         "chatRoomId": params["chatRoomId"],
         "startTime": params["startTime"],
         "endTime": params["endTime"],
     }
-    fetched = executor.execute("meeting_chat", fetch_in, spec_fetch)
+    return "meeting_chat", fetch_in, spec_fetch
+
+
+def fetch_failed(fetched: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if fetched.get("http_status", 200) >= 400:
         return {
             "tool": "meeting_create",
@@ -56,28 +64,257 @@ def run_meeting_pipeline(
             "summary": None,
             "save": None,
         }
+    return None
+
+
+def transcript_entries(fetched: Dict[str, Any]) -> List[Tuple[Optional[datetime], str]]:
+    """
+    백엔드 응답 → (발언 시각 | None, 발언 문자열) 목록. 잘라내지 않음.
+    - 메시지 객체 목록: "[시각] 발언자: 내용"
+    - 문자열: '발언자:' 로 시작하는 줄에서 나누고, 그렇지 않은 줄은 앞 발언에 이어 붙임(시각 없음)
+    """
+    return [(u.ts, format_raw(u)) for u in iter_utterances(fetched)]
 
-    data = fetched.get("data")
-    if isinstance(data, dict):
-        raw = data.get("data") or data.get("message") or ""
-    else:
-        raw = data or ""
-    raw = raw or ""
 
-    MAX_CHARS = 12000
-    if len(raw) > MAX_CHARS:
-        raw = raw[-MAX_CHARS]
+def preprocess_entries(fetched: Dict[str, Any], count_tokens: Callable[[str], int],
+                       boundary: Optional[Callable[[datetime], Any]] = None) -> Tuple[List[Tuple[Optional[datetime], str]], Dict[str, Any]]:
+    """
+    transcript_entries + 노이즈 제거/압축(service/transcript.py). (발언 목록, 규칙별 절약 토큰 보고).
+    boundary: 캐시 버킷 함수. 버킷마다 전처리 상태를 초기화해 버킷 원문(해시)이 요청 범위와 무관하게 같음.
+    """
+    pre = TranscriptPreprocessor(count_tokens, boundary=boundary)
+    entries = list(pre.process(iter_utterances(fetched)))
+    report = pre.report.as_dict()
+    log.info("[MEETING] preprocess %d→%d messages, %d→%d tokens (%s)",
+             report["messages_in"], report["messages_out"], report["tokens_in"], report["tokens_out"],
+             ", ".join(f"{k}={v['tokens']}" for k, v in report["rules"].items() if v["hits"]))
+    return entries, report
+
+
+def transcript_messages(fetched: Dict[str, Any]) -> List[str]:
+    """백엔드 응답 → 메시지(발언) 단위 문자열 목록."""
+    return [text for _, text in transcript_entries(fetched)]
+
+
+def transcript_of(fetched: Dict[str, Any]) -> str:
+    return "\n".join(transcript_messages(fetched))
+
+
+def _split_long(message: str, count_tokens: Callable[[str], int], budget: int) -> List[str]:
+    """예산보다 긴 단일 발언은 공백 경계에서 예산 이하 조각으로 나눔(내용은 유지)."""
+    pieces: List[str] = []
+    rest = message
+    while count_tokens(rest) > budget:
+        n = count_tokens(rest)
+        cut = max(1, len(rest) * budget // n)
+        while cut > 1 and count_tokens(rest[:cut]) > budget:
+            cut = cut * 9 // 10
+        space = rest.rfind(" ", cut // 2, cut)
+        cut = space if space > 0 else cut
+        pieces.append(rest[:cut])
+        rest = rest[cut:].lstrip()
+    if rest:
+        pieces.append(rest)
+    return pieces
+
+
+def split_transcript(messages: List[str], count_tokens: Callable[[str], int], budget: int) -> List[str]:
+    """발언 경계를 유지하며 토큰 예산 이하의 구간으로 묶음(발언 하나가 예산을 넘을 때만 발언 안에서 나눔)."""
+    chunks: List[str] = []
+    cur: List[str] = []
+    used = 0
+    for msg in messages:
+        for piece in ([msg] if count_tokens(msg) <= budget else _split_long(msg, count_tokens, budget)):
+            n = count_tokens(piece) + 1   # 줄바꿈
+            if cur and used + n > budget:
+                chunks.append("\n".join(cur))
+                cur, used = [], 0
+            cur.append(piece)
+            used += n
+    if cur:
+        chunks.append("\n".join(cur))
+    return chunks
+
 
-    time_range = f"{params['startTime'].replace('T', ' ')} ~ {params['endTime'].replace('T', ' ')}"
-    prompt = build_meeting_prompt(raw, {"projectId": params["projectId"], "time_range": time_range})
-    summary = llm.complete([{"role": "system", "content": prompt}], max_new_tokens=800, temperature=0.2)
+def _map_summaries(llm, texts: List[str], time_range: str) -> List[str]:
+    """구간별 부분 요약을 한 번의 배치 작업으로 생성."""
+    total = len(texts)
+    outs = llm.complete_many([
+        {
+            "messages": [{"role": "system", "content": build_meeting_chunk_prompt(t, i + 1, total, time_range)}],
+            "max_new_tokens": MEETING_CHUNK_SUMMARY_TOKENS,
+            "temperature": 0.2,
+            "stop": [StopStrings(MEETING_STOP_STRINGS)],
+        }
+        for i, t in enumerate(texts)
+    ])
+    return [f"({i + 1}/{total})\n{o.strip()}" for i, o in enumerate(outs)]
+
+
+def _reduce(llm, summaries: List[str], time_range: str) -> List[str]:
+    """부분 요약이 합쳐서 예산을 넘으면 같은 방식으로 한 단계씩 더 요약."""
+    count = llm.count_tokens
+    while count("\n\n".join(summaries)) > MEETING_CHUNK_TOKENS and len(summaries) > 1:
+        groups = split_transcript(summaries, count, MEETING_CHUNK_TOKENS)
+        if len(groups) >= len(summaries):   # 더 줄어들지 않으면 그대로 최종 단계로
+            break
+        summaries = _map_summaries(llm, groups, time_range)
+    return summaries
+
+
+def _write_minutes(llm, text: str, partial: bool, params: Dict[str, Any], on_token: Optional[Callable[[str], None]]) -> Tuple[str, str]:
+    time_range = _time_range(params)
+    prompt = build_meeting_prompt(text, {"projectId": params["projectId"], "time_range": time_range}, partial=partial)
+    summary = llm.complete(
+        [{"role": "system", "content": prompt}], max_new_tokens=800, temperature=0.2, on_token=on_token,
+        stop=[StopStrings(MEETING_STOP_STRINGS)],
+    )
     title = params.get("title") or _auto_title(params["startTime"], params["endTime"])
-    contents = summary.strip()
+    return title, summary.strip()
+
+
+def _time_range(params: Dict[str, Any]) -> str:
+    return f"{params['startTime'].replace('T', ' ')} ~ {params['endTime'].replace('T', ' ')}"
+
+
+def summarize_meeting(llm, raw: Union[str, List[str]], params: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, str]:
+    """
+    LLM 요약 → (title, contents). on_token 이 있으면 최종 회의록을 생성되는 대로 전달.
+    - 대화가 MEETING_CHUNK_TOKENS 이하면 한 번에 요약
+    - 넘으면 map-reduce: 발언 경계로 나눈 구간들을 한 배치로 부분 요약 → (부분 요약이 여전히 길면 같은 방식으로 한 단계 더)
+      → build_meeting_prompt 형식으로 최종 회의록. 비용은 대화 길이에 선형이고 잘리는 내용이 없음
+    """
+    messages = raw.splitlines() if isinstance(raw, str) else list(raw)
+    count = llm.count_tokens
+    text = "\n".join(messages)
+    if count(text) <= MEETING_CHUNK_TOKENS:
+        return _write_minutes(llm, text, False, params, on_token)
+    parts = split_transcript(messages, count, MEETING_CHUNK_TOKENS)
+    log.info("[MEETING] map-reduce over %d chunks", len(parts))
+    summaries = _reduce(llm, _map_summaries(llm, parts, _time_range(params)), _time_range(params))
+    return _write_minutes(llm, "\n\n".join(summaries), True, params, on_token)
+
+
+def summarize_meeting_cached(
+    llm,
+    cache: MeetingSummaryCache,
+    chat_room_id: Any,
+    entries: List[Tuple[Optional[datetime], str]],
+    params: Dict[str, Any],
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, str]:
+    """
+    시간 버킷 단위로 구간 요약을 캐시해 겹치는 범위 요청에서 재사용.
+    대화 전체가 MEETING_CHUNK_TOKENS 이하면 버킷 요약 없이 원문으로 한 번에 작성(최종 회의록만 캐시).
+    1) 발언을 시각 기준 버킷으로 묶고(시각 없는 발언은 앞 발언의 버킷), 버킷 원문의 해시로 캐시 조회
+    2) 없거나 바뀐 버킷만 부분 요약(모든 버킷의 구간을 한 배치로) 후 저장
+    3) 버킷 요약들을 시간순으로 합쳐 최종 회의록. 같은 범위·같은 내용이면 최종 회의록도 캐시에서 반환
+    발언 시각을 알 수 없으면 summarize_meeting 으로 처리.
+    """
+    if not entries or all(ts is None for ts, _ in entries):
+        return summarize_meeting(llm, [text for _, text in entries], params, on_token=on_token)
+
+    final_key = (chat_room_id, params["startTime"], params["endTime"])
+    text = "\n".join(t for _, t in entries)
+    if llm.count_tokens(text) <= MEETING_CHUNK_TOKENS:
+        # 한 프롬프트에 들어가면 부분 요약(손실)을 거치지 않음
+        digest = content_hash(text + "|" + str(params.get("title") or ""))
+        cached = cache.get(final_key, digest)
+        if cached is None:
+            cached = _write_minutes(llm, text, False, params, on_token)
+            cache.put(final_key, digest, cached)
+        elif on_token:
+            on_token(cached[1])
+        return cached
+
+    buckets: "OrderedDict[datetime, List[str]]" = OrderedDict()
+    current: Optional[datetime] = None
+    for ts, text in entries:
+        if ts is not None:
+            current = cache.bucket_of(ts)
+        key = current if current is not None else cache.bucket_of(next(t for t, _ in entries if t is not None))
+        buckets.setdefault(key, []).append(text)
+
+    segments = []   # (버킷 시작, 해시, 요약 | None, 원문 발언들)
+    for start, texts in buckets.items():
+        digest = content_hash("\n".join(texts))
+        segments.append((start, digest, cache.get((chat_room_id, start.isoformat()), digest), texts))
+
+    final_digest = content_hash("|".join(d for _, d, _, _ in segments) + "|" + str(params.get("title") or ""))
+    cached = cache.get(final_key, final_digest)
+    if cached is not None:
+        title, contents = cached
+        if on_token:
+            on_token(contents)
+        return title, contents
+
+    # 2) 없거나 바뀐 버킷만 요약: 버킷별 구간들을 한 배치로
+    count = llm.count_tokens
+    jobs: List[Tuple[int, str, str]] = []   # (segments 인덱스, 구간 원문, 버킷 시간 범위)
+    for i, (start, _, summary, texts) in enumerate(segments):
+        if summary is None:
+            label = f"{start:%Y-%m-%d %H:%M} ~ {start + cache.segment:%H:%M}"
+            jobs.extend((i, part, label) for part in split_transcript(texts, count, MEETING_CHUNK_TOKENS))
+    if jobs:
+        log.info("[MEETING] summarizing %d/%d segments (%d chunks)",
+                 len({i for i, _, _ in jobs}), len(segments), len(jobs))
+        outs = llm.complete_many([
+            {
+                "messages": [{"role": "system", "content": build_meeting_chunk_prompt(part, 1, 1, label)}],
+                "max_new_tokens": MEETING_CHUNK_SUMMARY_TOKENS,
+                "temperature": 0.2,
+                "stop": [StopStrings(MEETING_STOP_STRINGS)],
+            }
+            for _, part, label in jobs
+        ])
+        fresh: Dict[int, List[str]] = {}
+        for (i, _, _), out in zip(jobs, outs):
+            fresh.setdefault(i, []).append(out.strip())
+        for i, parts in fresh.items():
+            start, digest, _, texts = segments[i]
+            summary = "\n".join(parts)
+            cache.put((chat_room_id, start.isoformat()), digest, summary)
+            segments[i] = (start, digest, summary, texts)
+
+    # 3) 최종 병합
+    summaries = [f"[{start:%H:%M}~{start + cache.segment:%H:%M}]\n{summary}" for start, _, summary, _ in segments]
+    summaries = _reduce(llm, summaries, _time_range(params))
+    title, contents = _write_minutes(llm, "\n\n".join(summaries), True, params, on_token)
+    cache.put(final_key, final_digest, (title, contents))
+    return title, contents
+
+
+def summarize_fetched(
+    llm,
+    fetched: Dict[str, Any],
+    params: Dict[str, Any],
+    cache: Optional[MeetingSummaryCache] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    report: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """
+    캐시가 있으면 구간 요약을 재사용, 없으면 전체를 요약.
+    MEETING_PREPROCESS_ENABLED 이면 요약 전에 대화를 정리하고, report(dict) 에 규칙별 절약 토큰을 채움.
+    """
+    if MEETING_PREPROCESS_ENABLED:
+        entries, pre = preprocess_entries(fetched, llm.count_tokens, boundary=cache.bucket_of if cache is not None else None)
+        if report is not None:
+            report.update(pre)
+    else:
+        entries = transcript_entries(fetched)
+    if cache is not None:
+        return summarize_meeting_cached(llm, cache, params["chatRoomId"], entries, params, on_token=on_token)
+    return summarize_meeting(llm, [text for _, text in entries], params, on_token=on_token)
+
 
+def save_call(params: Dict[str, Any], title: str, contents: str) -> Tuple[str, Dict[str, Any], ExecSpec]:
     spec_save = ExecSpec(**DISPATCH_TABLE["meeting_save"]["exec"])
     save_in = {"projectId": params["projectId"], "title": title, "contents": contents}
-    saved = executor.execute("meeting_save", save_in, spec_save)
+    return "meeting_save", save_in, spec_save
 
+
+def pipeline_result(fetched: Dict[str, Any], title: str, contents: str, saved: Dict[str, Any],
+                    preprocess: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     return {
         "tool": "meeting_create",
         "fetch": fetched,
@@ -85,11 +322,111 @@ def run_meeting_pipeline(
             "title": title,
             "text": contents,
             "length": len(contents),
+            "preprocess": preprocess or None,
         },
         "save": saved,
     }
 
 
+def run_meeting_pipeline(
+    executor: CompositeExecutor,
+    llm,
+    params: Dict[str, Any],
+    utterance: str,
+    cache: Optional[MeetingSummaryCache] = None,
+    on_step: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    params: {projectId, chatRoomId, startTime, endTime, title?}
+    1) 시간 미기재 시 한국어 문장에서 (연도 규칙 포함) LocalDateTime 추론
+    2) meeting_chat 호출 → transcript 확보
+    3) LLM 요약 → title/contents 생성(cache 가 있으면 겹치는 시간 구간의 요약 재사용)
+    4) meeting_save 호출
+    on_step: 각 단계 시작 시 "fetch" / "summarize" / "save" 로 호출(진행 상황 보고).
+      JobSteps(service/jobs.py)면 요약·저장 결과를 단계별로 기록하고, 회수된 작업은 기록된 단계를 건너뜀
+      (저장이 이미 성공했으면 다시 저장하지 않음). 이 경우 결과에 대화 원문(fetch)은 넣지 않음
+    """
+    step = on_step or (lambda name: None)
+    err = prepare_meeting_params(params, utterance)
+    if err:
+        return err
+    done = getattr(on_step, "done", None)
+    if done is not None:
+        return _resume_meeting_pipeline(executor, llm, params, cache, on_step, done)
+    step("fetch")
+    with tracing.span("meeting.fetch"):
+        fetched = executor.execute(*fetch_call(params))
+    failed = fetch_failed(fetched)
+    if failed:
+        return failed
+    step("summarize")
+    report: Dict[str, Any] = {}
+    with tracing.span("meeting.summarize"):
+        title, contents = summarize_fetched(llm, fetched, params, cache, report=report)
+    step("save")
+    with tracing.span("meeting.save"):
+        saved = executor.execute(*save_call(params, title, contents))
+    return pipeline_result(fetched, title, contents, saved, report)
+
+
+def _resume_meeting_pipeline(executor: CompositeExecutor, llm, params: Dict[str, Any],
+                              cache: Optional[MeetingSummaryCache], steps, done: Dict[str, Any]) -> Dict[str, Any]:
+    """작업 워커용: 끝난 단계(done)는 기록된 출력을 쓰고, 새로 끝난 단계는 steps.record 로 기록."""
+    summary = done.get("summarize")
+    if summary is None:
+        steps("fetch")
+        with tracing.span("meeting.fetch"):
+            fetched = executor.execute(*fetch_call(params))
+        failed = fetch_failed(fetched)
+        if failed:
+            return failed
+        steps("summarize")
+        report: Dict[str, Any] = {}
+        with tracing.span("meeting.summarize"):
+            title, contents = summarize_fetched(llm, fetched, params, cache, report=report)
+        summary = pipeline_result({}, title, contents, {}, report)["summary"]
+        steps.record("summarize", summary)
+    saved = done.get("save")
+    if saved is None:
+        steps("save")
+        with tracing.span("meeting.save"):
+            saved = executor.execute(*save_call(params, summary["title"], summary["text"]))
+        if isinstance(saved, dict) and not saved.get("error") and saved.get("http_status", 200) < 400:
+            steps.record("save", saved)
+    return {"tool": "meeting_create", "summary": summary, "save": saved}
+
+
+async def arun_meeting_pipeline(
+    executor: AsyncCompositeExecutor,
+    llm,
+    params: Dict[str, Any],
+    utterance: str,
+    run_infer: Callable[..., Awaitable[Any]],
+    on_token: Optional[Callable[[str], None]] = None,
+    cache: Optional[MeetingSummaryCache] = None,
+    on_step: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """run_meeting_pipeline 의 비동기 버전. 백엔드 호출은 비동기 실행기로, 요약은 run_infer 로 위임."""
+    step = on_step or (lambda name: None)
+    err = prepare_meeting_params(params, utterance)
+    if err:
+        return err
+    step("fetch")
+    with tracing.span("meeting.fetch"):
+        fetched = await executor.execute(*fetch_call(params))
+    failed = fetch_failed(fetched)
+    if failed:
+        return failed
+    step("summarize")
+    report: Dict[str, Any] = {}
+    with tracing.span("meeting.summarize"):
+        title, contents = await run_infer(summarize_fetched, llm, fetched, params, cache, on_token=on_token, report=report)
+    step("save")
+    with tracing.span("meeting.save"):
+        saved = await executor.execute(*save_call(params, title, contents))
+    return pipeline_result(fetched, title, contents, saved, report)
+
+
 def run_minutes_pipeline(executor: CompositeExecutor, llm, params: Dict[str, Any], utterance: str) -> Dict[str, Any]:
     """Deprecated: meeting 파이프라인으로 위임."""
     return run_meeting_pipeline(executor, llm, params, utterance)
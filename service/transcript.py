@@ -0,0 +1,249 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SENDER_KEYS = ("sender", "senderName", "userName", "nickname", "name")
+_CONTENT_KEYS = ("content", "message", "text")
+_TIME_KEYS = ("sentAt", "createdAt", "time", "timestamp")
+_TYPE_KEYS = ("type", "messageType", "kind")
+_SPEAKER_LINE = re.compile(r"^\s*(?:\[([^\]]*)\]\s*)?([^\s:：\[][^:：]{0,30})[:：]\s?(.*)$")
+
+_SYSTEM_TYPES = {"SYSTEM", "JOIN", "LEAVE", "ENTER", "EXIT", "INVITE", "KICK"}
+# 종류(type)도 발언자도 없는 줄만 본문으로 판정. 줄 전체가 안내 문장일 때만(“민수님이 들어왔으면 해요” 같은 대화는 제외)
+_SYSTEM_TEXT = re.compile(
+    r"^\s*\S.{0,40}?(?:님이\s*|\s)(?:\S.{0,40}?님을\s*)?"
+    r"(?:들어왔|나갔|입장했|입장하셨|퇴장했|퇴장하셨|초대했|초대하셨|내보냈)습니다\s*[.!]?\s*$|"
+    r"^\s*\S.{0,40}?\s(?:has\s+)?(?:joined|left)\s+(?:the\s+)?(?:room|chat|channel)\s*[.!]?\s*$",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[0-9A-Za-z가-힣ㄱ-ㅎㅏ-ㅣ一-鿿]")   # 숫자/영문/한글(자모만 쓴 “ㅇㅇ”, “ㅇㅋ” 포함)/한자
+_URL = re.compile(r"https?://([^/\s]+)\S*")
+_RUN = re.compile(r"([^\w\s]|[ㄱ-ㅎㅏ-ㅣ])\1{3,}")   # 기호/자모 반복(숫자·단어는 건드리지 않음)
+
+RULES = ("system", "emoji", "repeat", "url", "runs", "timestamp", "speaker")
+
+
+@dataclass
+class Utterance:
+    """파싱된 발언 하나. ts_label: 원문의 시각 표기(ts 는 해석에 성공했을 때만)."""
+    ts: Optional[datetime]
+    speaker: str
+    text: str
+    kind: str = ""
+    ts_label: str = ""
+
+
+def _first(d: Dict[str, Any], keys: Tuple[str, ...]) -> str:
+    return next((str(d[k]) for k in keys if d.get(k) not in (None, "")), "")
+
+
+def parse_ts(value: str) -> Optional[datetime]:
+    try:
+        ts = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts.replace(tzinfo=None)
+
+
+def _raw_of(fetched: Dict[str, Any]) -> Any:
+    data = fetched.get("data")
+    if isinstance(data, dict):
+        return data.get("data") or data.get("message") or ""
+    return data or ""
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end].rstrip("\r")
+        start = end + 1
+
+
+def iter_utterances(fetched: Dict[str, Any]) -> Iterator[Utterance]:
+    """
+    백엔드 응답을 발언 단위로 한 번 훑으며 생성(중간 목록/문자열 복사 없음).
+    - 메시지 객체 목록: 시각/발언자/내용/종류 키를 읽음
+    - 문자열: '[시각] 발언자:' 로 시작하는 줄에서 나누고, 그렇지 않은 줄은 앞 발언에 이어 붙임
+    """
+    raw = _raw_of(fetched)
+    if isinstance(raw, list):
+        for m in raw:
+            if isinstance(m, dict):
+                ts = _first(m, _TIME_KEYS)
+                parsed = parse_ts(ts) if ts else None
+                yield Utterance(parsed, _first(m, _SENDER_KEYS), _first(m, _CONTENT_KEYS),
+                                _first(m, _TYPE_KEYS).upper(), ts)
+            elif m:
+                yield Utterance(None, "", str(m))
+        return
+
+    cur: Optional[Utterance] = None
+    for line in _iter_lines(str(raw)):
+        if not line.strip():
+            continue
+        m = _SPEAKER_LINE.match(line)
+        if cur is not None and m is None:
+            cur.text += "\n" + line
+            continue
+        if cur is not None:
+            yield cur
+        if m is None:
+            cur = Utterance(None, "", line)
+        else:
+            label = m.group(1) or ""
+            parsed = parse_ts(label) if label else None
+            cur = Utterance(parsed, m.group(2).strip(), m.group(3), "", label)
+    if cur is not None:
+        yield cur
+
+
+def format_raw(u: Utterance) -> str:
+    """전처리 없는 원래 표기: "[시각] 발언자: 내용"."""
+    return f"{f'[{u.ts_label}] ' if u.ts_label else ''}{u.speaker + ': ' if u.speaker else ''}{u.text}"
+
+
+@dataclass
+class PreprocessReport:
+    """규칙별 적용 횟수와 절약한 토큰 수(근사: 바뀐 조각 단위로 토크나이저 계산)."""
+    messages_in: int = 0
+    messages_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    rules: Dict[str, Dict[str, int]] = field(default_factory=lambda: {r: {"hits": 0, "tokens": 0} for r in RULES})
+
+    def hit(self, rule: str, tokens: int) -> None:
+        self.rules[rule]["hits"] += 1
+        self.rules[rule]["tokens"] += tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        saved = self.tokens_in - self.tokens_out
+        return {
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "saved_ratio": (saved / self.tokens_in) if self.tokens_in else 0.0,
+            "rules": {k: dict(v) for k, v in self.rules.items()},
+        }
+
+
+class TranscriptPreprocessor:
+    """
+    회의록 요약 전 대화 정리(스트리밍: 발언마다 규칙을 한 번씩 적용하고 바로 내보냄).
+    - system: 입장/퇴장/초대 등 시스템 메시지 제거
+    - emoji: 글자·숫자 없이 이모지/기호/자모(ㅋㅋ, ㅠㅠ)만 있는 발언 제거
+    - url: 긴 URL 을 "호스트/…" 로 축약
+    - runs: 같은 기호/자모 4회 이상 반복(!!!!, ㅋㅋㅋㅋㅋ)을 3회로
+    - repeat: 연속된 같은 내용은 하나로 합치고 "(×n)" 표시(발언자가 다르면 발언자를 나열)
+    - timestamp: ISO 시각 → "HH:MM"(날짜가 바뀔 때만 날짜 포함), 같은 분이면 생략
+    - speaker: 직전과 같은 발언자면 이름 대신 들여쓰기
+    count_tokens 로 규칙별 절약 토큰을 report 에 누적. 반복되는 접두(시각/발언자) 토큰 수는 메모이즈.
+    boundary: 발언 시각 → 구간 키(예: MeetingSummaryCache.bucket_of). 구간이 바뀌면 직전 발언 상태(시각/발언자/반복)를
+    초기화해 각 구간의 출력이 앞 구간과 무관하게 같음(요청 범위가 달라도 구간 해시가 같도록).
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], rules: Iterable[str] = RULES, url_max_chars: int = 40,
+                 boundary: Optional[Callable[[datetime], Any]] = None):
+        self.count = count_tokens
+        self.rules = set(rules)
+        self.url_max_chars = int(url_max_chars)
+        self.report = PreprocessReport()
+        self._prefix_tokens: Dict[str, int] = {}
+        self._prev_ts: Optional[datetime] = None
+        self._prev_speaker: Optional[str] = None
+        self._boundary = boundary
+        self._segment: Any = None
+
+    def _tokens(self, prefix: str) -> int:
+        """시각/발언자 접두의 토큰 수(같은 접두가 반복되므로 메모이즈)."""
+        if not prefix:
+            return 0
+        n = self._prefix_tokens.get(prefix)
+        if n is None:
+            n = self._prefix_tokens[prefix] = self.count(prefix)
+        return n
+
+    def _shorten_url(self, m: "re.Match[str]") -> str:
+        return m.group(0) if len(m.group(0)) <= self.url_max_chars else f"{m.group(1)}/…"
+
+    def _clean_text(self, text: str) -> Tuple[str, int]:
+        saved = 0
+        for rule, pattern, repl in (("url", _URL, self._shorten_url), ("runs", _RUN, r"\1\1\1")):
+            if rule not in self.rules:
+                continue
+            new = pattern.sub(repl, text)
+            if new != text:
+                n = self.count(text) - self.count(new)
+                self.report.hit(rule, n)
+                saved += n
+                text = new
+        return text, saved
+
+    def _is_noise(self, u: Utterance, base: int) -> bool:
+        if "system" in self.rules and (u.kind in _SYSTEM_TYPES if u.kind else not u.speaker and _SYSTEM_TEXT.match(u.text)):
+            self.report.hit("system", base)
+            return True
+        if "emoji" in self.rules and not _WORD.search(u.text):
+            self.report.hit("emoji", base)
+            return True
+        return False
+
+    def process(self, utterances: Iterable[Utterance]) -> Iterator[Tuple[Optional[datetime], str]]:
+        """(발언 시각 | None, 정리된 한 줄) 을 순서대로 생성."""
+        pending: Optional[List[Any]] = None   # [Utterance, 발언자 목록, 반복 수]
+        for u in utterances:
+            base = self.count(format_raw(u))
+            self.report.messages_in += 1
+            self.report.tokens_in += base
+            if self._is_noise(u, base):
+                continue
+            u.text, saved = self._clean_text(u.text)
+            if self._boundary is not None and u.ts is not None:
+                segment = self._boundary(u.ts)
+                if segment != self._segment:
+                    if pending is not None:
+                        yield self._emit(*pending)
+                        pending = None
+                    self._segment, self._prev_ts, self._prev_speaker = segment, None, None
+            if pending is not None and "repeat" in self.rules and u.text == pending[0].text:
+                pending[2] += 1
+                if u.speaker and u.speaker not in pending[1]:
+                    pending[1].append(u.speaker)
+                # 합쳐진 발언의 토큰 - 접미 "(×n)" 증가분
+                self.report.hit("repeat", base - saved - 1)
+                continue
+            if pending is not None:
+                yield self._emit(*pending)
+            pending = [u, [u.speaker] if u.speaker else [], 1]
+        if pending is not None:
+            yield self._emit(*pending)
+
+    def _emit(self, u: Utterance, speakers: List[str], times: int) -> Tuple[Optional[datetime], str]:
+        prefix = f"[{u.ts_label}] " if u.ts_label else ""
+        if u.ts is not None and "timestamp" in self.rules:
+            prev = self._prev_ts
+            if prev is not None and prev.replace(second=0, microsecond=0) == u.ts.replace(second=0, microsecond=0):
+                short = ""
+            elif prev is not None and prev.date() == u.ts.date():
+                short = f"[{u.ts:%H:%M}] "
+            else:
+                short = f"[{u.ts:%Y-%m-%d %H:%M}] "
+            self.report.hit("timestamp", self._tokens(prefix) - self._tokens(short))
+            prefix = short
+            self._prev_ts = u.ts
+
+        who = ", ".join(speakers)
+        label = f"{who}: " if who else ""
+        if who and "speaker" in self.rules and who == self._prev_speaker and not prefix:
+            self.report.hit("speaker", self._tokens(label) - self._tokens("  "))
+            label = "  "
+        self._prev_speaker = who or None
+
+        line = f"{prefix}{label}{u.text}{f' (×{times})' if times > 1 else ''}"
+        self.report.messages_out += 1
+        self.report.tokens_out += self.count(line)
+        return u.ts, line
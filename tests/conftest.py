@@ -0,0 +1,48 @@
+"""
+저장소 루트가 capstone_ai 패키지 자체이므로, 체크아웃 폴더 이름과 상관없이 capstone_ai 로 import 되게 등록.
+capstone_ai/config.py 가 없으면(로컬 설정 전) config_example 을 그대로 사용.
+tiny_model_dir: LLMClient 테스트용 작은 랜덤 Llama(어휘 t3..t63 단어 단위, 대화 템플릿은 내용을 공백으로 잇고 끝에 t3).
+"""
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+if "capstone_ai" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("capstone_ai", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["capstone_ai"] = module
+    spec.loader.exec_module(module)
+
+try:
+    importlib.import_module("capstone_ai.config")
+except ImportError:
+    sys.modules["capstone_ai.config"] = importlib.import_module("capstone_ai.config_example")
+
+
+TINY_CHAT_TEMPLATE = "{% for m in messages %}{{ m['content'] }} {% endfor %}{% if add_generation_prompt %}t3 {% endif %}"
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    tokenizers = pytest.importorskip("tokenizers")
+    path = tmp_path_factory.mktemp("tiny-llama")
+    vocab = {"<pad>": 0, "<s>": 1, "</s>": 2, **{f"t{i}": i for i in range(3, 64)}}
+    tok = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<pad>"))
+    tok.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    fast = transformers.PreTrainedTokenizerFast(tokenizer_object=tok, pad_token="<pad>", bos_token="<s>", eos_token="</s>")
+    fast.chat_template = TINY_CHAT_TEMPLATE
+    fast.save_pretrained(path)
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=4,
+        num_key_value_heads=2, max_position_embeddings=128, pad_token_id=0, bos_token_id=1, eos_token_id=2,
+    )
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    return str(path)
@@ -0,0 +1,109 @@
+"""BatchScheduler 실패 격리: 가짜 엔진으로 한 행의 prefill/스텝 실패가 같은 배치의 다른 요청에 번지지 않는지 확인."""
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pytest
+
+from capstone_ai.core.batching import BatchScheduler, BatchStepError, GenRequest
+
+
+@dataclass
+class FakeState:
+    reqs: List[GenRequest]
+    pending: bool = False
+
+
+class FakeEngine:
+    """행마다 0, 1, 2, ... 를 생성. input_ids[0] 이 poison 값인 행은 지정한 단계에서 배치 전체를 실패시킴."""
+
+    def __init__(self, fail_prefill: Optional[int] = None, fail_step: Optional[int] = None,
+                 fail_forward: Optional[int] = None, row_error: Optional[int] = None):
+        self.fail_prefill = fail_prefill
+        self.fail_step = fail_step
+        self.fail_forward = fail_forward
+        self.row_error = row_error
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _has(self, reqs, poison):
+        return poison is not None and any(r.input_ids[0] == poison for r in reqs)
+
+    def size(self, state):
+        return len(state.reqs)
+
+    def requests(self, state):
+        return state.reqs
+
+    def prefill(self, reqs):
+        self.gate.wait(5)
+        if self._has(reqs, self.fail_prefill):
+            raise RuntimeError("prefill boom")
+        return FakeState(list(reqs))
+
+    def merge(self, a, b):
+        return FakeState(a.reqs + b.reqs)
+
+    def split(self, state):
+        return [FakeState([r], state.pending) for r in state.reqs]
+
+    def step(self, state):
+        finished, keep = [], []
+        if not state.pending:
+            if self._has(state.reqs, self.fail_step):
+                raise RuntimeError("step boom")
+            for r in state.reqs:
+                if r.input_ids[0] == self.row_error:
+                    r.error = ValueError("row boom")
+                    finished.append(r)
+                    continue
+                r.output_ids.append(len(r.output_ids))
+                (finished if len(r.output_ids) >= r.max_new_tokens else keep).append(r)
+            if not keep:
+                return None, finished
+        state = FakeState(keep if not state.pending else state.reqs, pending=True)
+        if self._has(state.reqs, self.fail_forward):
+            raise BatchStepError(state, finished, RuntimeError("forward boom"))
+        return FakeState(state.reqs), finished
+
+
+def _submit_all(scheduler, engine, reqs):
+    engine.gate.clear()  # 모두 대기열에 넣은 뒤 한 배치로 prefill 되도록
+    futures = [scheduler.submit(r) for r in reqs]
+    time.sleep(0.05)
+    engine.gate.set()
+    return futures
+
+
+def _req(tag: int, n: int = 4) -> GenRequest:
+    return GenRequest(input_ids=[tag], max_new_tokens=n)
+
+
+@pytest.mark.parametrize("kind", ["fail_prefill", "fail_step", "fail_forward", "row_error"])
+def test_one_bad_row_does_not_fail_the_batch(kind):
+    engine = FakeEngine(**{kind: 99})
+    scheduler = BatchScheduler(engine, max_batch_size=8, window_ms=200)
+    reqs = [_req(1), _req(99), _req(2, n=6)]
+    futures = _submit_all(scheduler, engine, reqs)
+    assert futures[0].result(5) == [0, 1, 2, 3]
+    assert futures[2].result(5) == [0, 1, 2, 3, 4, 5]
+    with pytest.raises(Exception):
+        futures[1].result(5)
+    assert scheduler.stats["failed_rows"] == 1
+
+
+def test_failed_forward_retry_keeps_tokens_once():
+    # forward 가 실패한 스텝에서 이미 추가한 토큰은 재시도 때 다시 추가하지 않음
+    engine = FakeEngine(fail_forward=99)
+    scheduler = BatchScheduler(engine, max_batch_size=8, window_ms=200)
+    futures = _submit_all(scheduler, engine, [_req(1, n=3), _req(99)])
+    assert futures[0].result(5) == [0, 1, 2]
+
+
+def test_single_row_failure_is_reported():
+    engine = FakeEngine(fail_step=99)
+    scheduler = BatchScheduler(engine, max_batch_size=8, window_ms=0)
+    with pytest.raises(RuntimeError, match="step boom"):
+        scheduler.submit(_req(99)).result(5)
+    assert scheduler.submit(_req(1, n=2)).result(5) == [0, 1]
@@ -0,0 +1,85 @@
+"""
+작업 저장소(tmp 경로): lease 가 끝난 작업을 다른 워커가 회수하면 이전 owner 의 갱신/완료는 거부되고,
+기록된 단계 출력(checkpoints)은 회수한 워커로 이어져 끝난 단계(저장)를 다시 실행하지 않음.
+"""
+import threading
+import time
+
+import pytest
+
+from capstone_ai.service.jobs import JobRunner, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_reclaimed_job_rejects_old_owner_and_keeps_checkpoints(store):
+    job = store.create("meeting_create", {"project_id": "7"}, project_id="7")
+    first = store.claim("w1", lease_s=0.2, max_attempts=3)
+    assert first["id"] == job["id"] and first["attempts"] == 1 and first["checkpoints"] == {}
+    assert store.checkpoint(job["id"], "w1", "summarize", {"title": "주간 회의"})
+    assert store.checkpoint(job["id"], "w1", "save", {"http_status": 201})
+    assert store.claim("w2", lease_s=10, max_attempts=3) is None  # lease 가 남아 있으면 회수하지 않음
+
+    time.sleep(0.3)
+    second = store.claim("w2", lease_s=10, max_attempts=3)
+    assert second["id"] == job["id"] and second["attempts"] == 2
+    assert second["checkpoints"] == {"summarize": {"title": "주간 회의"}, "save": {"http_status": 201}}
+
+    # 죽은 줄 알았던 이전 owner 가 뒤늦게 돌아와도 아무것도 바꾸지 못함
+    assert not store.set_step(job["id"], "w1", "save", 10)
+    assert not store.checkpoint(job["id"], "w1", "save", {"http_status": 500})
+    assert not store.finish(job["id"], "w1", {"save": {"http_status": 500}})
+    assert store.get(job["id"])["checkpoints"]["save"] == {"http_status": 201}
+
+    assert store.finish(job["id"], "w2", {"save": {"http_status": 201}})
+    done = store.get(job["id"])
+    assert done["status"] == "done" and done["owner"] is None and done["result"] == {"save": {"http_status": 201}}
+    assert store.pending() == 0
+
+
+def test_runner_resumes_reclaimed_job_without_repeating_save(store):
+    job = store.create("meeting_create", {"project_id": "7"}, project_id="7")
+    # 첫 워커: 저장까지 마치고 기록한 뒤 완료 전에 죽음(하트비트 없음 → lease 만료)
+    store.claim("dead-worker", lease_s=0.1, max_attempts=3)
+    store.checkpoint(job["id"], "dead-worker", "save", {"http_status": 201})
+    time.sleep(0.2)
+
+    saves, seen = [], []
+    finished = threading.Event()
+
+    def handler(payload, steps):
+        seen.append(dict(steps.done))
+        steps("save")
+        if "save" not in steps.done:
+            saves.append(payload)
+            steps.record("save", {"http_status": 201})
+        finished.set()
+        return {"tool": "meeting_create", "save": steps.done["save"]}
+
+    runner = JobRunner(store, {"meeting_create": handler}, workers=1, lease_s=5, poll_s=0.05).start()
+    try:
+        assert finished.wait(5)
+        deadline = time.monotonic() + 5
+        while store.get(job["id"])["status"] != "done" and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        runner.stop()
+    assert seen == [{"save": {"http_status": 201}}]
+    assert saves == []
+    result = store.get(job["id"])
+    assert result["status"] == "done" and result["attempts"] == 2
+    assert result["result"] == {"tool": "meeting_create", "save": {"http_status": 201}}
+    assert runner.stats["reclaimed"] == 1
+
+
+def test_job_fails_after_max_attempts(store):
+    job = store.create("meeting_create", {}, project_id="7")
+    for owner in ("w1", "w2"):
+        assert store.claim(owner, lease_s=0.05, max_attempts=2)["id"] == job["id"]
+        time.sleep(0.1)
+    assert store.claim("w3", lease_s=10, max_attempts=2) is None
+    failed = store.get(job["id"])
+    assert failed["status"] == "failed" and "max attempts" in failed["error"]
@@ -0,0 +1,195 @@
+"""
+JSON 제약 디코딩: 작은 가짜 어휘에서 허용 토큰 중 무작위로 골라 끝까지 생성해도 출력이 항상 파싱되고 스키마와 맞는지 확인.
+중첩 객체, 이스케이프, 바이트 조각으로 나뉜 한글(UTF-8), enum/정수/실수/boolean, max_tokens 에서 잘라 닫기.
+"""
+import json
+import random
+import re
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from capstone_ai.core.json_constraint import FunctionCallConstraint, JsonObjectConstraint, TokenClasses
+
+_BYTE = re.compile(r"^<0x([0-9A-F]{2})>$")
+
+PIECES = (
+    ['{"', '":', ',"', "}", "{}", '"', "{", ",", ":", "-", ".", "CHAT", '":"', '","'] +
+    ["name", "age", "score", "ok", "kind", "meta", "tag", "n", "tool", "arguments", "todo", "meeting"] +
+    ["null", "nu", "ll", "true", "tr", "ue", "false"] +
+    ["0", "1", "7", "12", "-1", "-0", ".5", ".25", "3"] +
+    ['"lo', 'w"', '"high"', '"a', "b", "c d", 'x"', '"회', "의", '록"'] +
+    ['\\"', "\\\\", "\\n", 'a\\"b', "\\", 'a"b', '\\"x"'] +
+    [chr(c) for c in range(ord("a"), ord("z") + 1)] +
+    # 한(ED 95 9C), 글(EA B8 80), 😀(F0 9F 98 80), 대리 코드가 되는 ED A0
+    [f"<0x{b:02X}>" for b in (0xED, 0x95, 0x9C, 0xEA, 0xB8, 0x80, 0xF0, 0x9F, 0x98, 0xA0)]
+)
+
+SCHEMA = {"type": "object", "properties": {
+    "name": {"type": "string"},
+    "age": {"type": "integer"},
+    "score": {"type": "number"},
+    "ok": {"type": "boolean"},
+    "kind": {"type": "string", "enum": ["low", "high"]},
+    "meta": {"type": "object", "properties": {"tag": {"type": "string"}, "n": {"type": "integer"}}},
+}}
+
+
+class FakeTokenizer:
+    """조각 목록이 곧 어휘. <0xNN> 은 바이트 조각(단독 디코딩이 �), 인코딩은 가장 긴 조각부터 탐욕적으로."""
+
+    def __init__(self, pieces):
+        self.pieces = ["</s>"] + list(pieces)
+        self.all_special_ids = [0]
+        self.added_tokens_decoder = {}
+
+    def __len__(self):
+        return len(self.pieces)
+
+    def convert_ids_to_tokens(self, i):
+        return self.pieces[i]
+
+    def raw(self, ids):
+        out = b""
+        for i in ids:
+            m = _BYTE.match(self.pieces[i])
+            out += bytes([int(m.group(1), 16)]) if m else self.pieces[i].encode("utf-8")
+        return out
+
+    def decode(self, ids):
+        return self.raw(ids).decode("utf-8", errors="replace")
+
+    def __call__(self, text, add_special_tokens=False):
+        ids, i = [], 0
+        while i < len(text):
+            best = max((j for j, p in enumerate(self.pieces) if j and not _BYTE.match(p) and text.startswith(p, i)),
+                       key=lambda j: len(self.pieces[j]))
+            ids.append(best)
+            i += len(self.pieces[best])
+        return {"input_ids": ids}
+
+
+@pytest.fixture(scope="module")
+def tok():
+    return FakeTokenizer(PIECES)
+
+
+@pytest.fixture(scope="module")
+def classes(tok):
+    return TokenClasses(tok, len(tok))
+
+
+def _walk(constraint, tok, rng, prefer=()):
+    """허용 토큰 중 무작위 선택(prefer 조각이 허용되면 우선)으로 done 까지 생성. 생성 토큰 id 반환."""
+    out = []
+    while not constraint.done:
+        allowed = constraint.mask().nonzero().flatten().tolist()
+        assert allowed, f"no allowed token after {[tok.pieces[i] for i in out]}"
+        preferred = [i for i in allowed if tok.pieces[i] in prefer]
+        i = rng.choice(preferred if preferred and rng.random() < 0.7 else allowed)
+        assert tok.pieces[i] not in ("\\", 'a"b'), "incomplete escape / bare quote inside a string"
+        constraint.advance(i)
+        out.append(i)
+        assert len(out) <= constraint.max_tokens
+    return out
+
+
+def _conforms(value, schema):
+    if value is None:
+        return True
+    if "enum" in schema:
+        return value in schema["enum"]
+    typ = schema.get("type", "object" if "properties" in schema else "string")
+    if typ in ("object", "dict"):
+        props = schema.get("properties") or {}
+        return (isinstance(value, dict) and list(value) == list(props)
+                and all(_conforms(value[k], s) for k, s in props.items()))
+    if typ == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if typ == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if typ == "boolean":
+        return isinstance(value, bool)
+    return isinstance(value, str)
+
+
+def _minimum(classes):
+    return JsonObjectConstraint(SCHEMA, classes)._rest(0)
+
+
+@pytest.mark.parametrize("budget", ["min", 25, 40, 80, 256])
+def test_random_walks_always_parse_and_match_schema(tok, classes, budget):
+    max_tokens = _minimum(classes) if budget == "min" else budget
+    rng = random.Random(budget)
+    for _ in range(200):
+        out = _walk(JsonObjectConstraint(SCHEMA, classes, max_tokens=max_tokens), tok, rng)
+        text = tok.raw(out).decode("utf-8")  # 깨진 UTF-8 이면 여기서 실패
+        value = json.loads(text)
+        assert _conforms(value, SCHEMA), text
+
+
+def test_korean_split_across_byte_tokens(tok, classes):
+    rng = random.Random(1)
+    korean = 0
+    prefer = {f"<0x{b:02X}>" for b in (0xED, 0x95, 0x9C, 0xEA, 0xB8, 0x80, 0xF0, 0x9F, 0x98, 0xA0)}
+    for max_tokens in (30, 60, 120) * 50:
+        out = _walk(JsonObjectConstraint(SCHEMA, classes, max_tokens=max_tokens), tok, rng, prefer=prefer)
+        value = json.loads(tok.raw(out).decode("utf-8"))
+        assert _conforms(value, SCHEMA)
+        korean += any(ch in str(value) for ch in "한글😀")
+    assert korean
+
+
+def test_byte_fragments_only_continue_valid_utf8(classes, tok):
+    ids = {p: i for i, p in enumerate(tok.pieces)}
+    after_ed = classes.utf8_next(bytes([0xED])).nonzero().flatten().tolist()
+    assert ids["<0x95>"] in after_ed and ids["<0xA0>"] not in after_ed  # ED A0.. 는 대리 코드
+    # 글자를 마무리만 할 수 있으면(모자란 바이트 수가 줄어드는) 이어지는 바이트(80..BF) 조각만, 새 글자 시작은 금지
+    finishing = set(classes.utf8_next(bytes([0xED, 0x95]), max_missing=0).nonzero().flatten().tolist())
+    assert finishing == {ids[f"<0x{b:02X}>"] for b in (0x95, 0x9C, 0x80, 0x9F, 0x98, 0xB8, 0xA0)}
+    assert ids["<0xED>"] not in set(classes.utf8_next(b"", max_missing=1).nonzero().flatten().tolist())
+    assert classes.utf8_next(b"", max_missing=-1).sum().item() == 0
+
+
+def test_escapes_are_complete_within_a_token(tok, classes):
+    rng = random.Random(2)
+    escaped = 0
+    prefer = {'\\"', "\\\\", "\\n", 'a\\"b', '\\"x"'}
+    for _ in range(100):
+        out = _walk(JsonObjectConstraint(SCHEMA, classes, max_tokens=60), tok, rng, prefer=prefer)
+        value = json.loads(tok.raw(out).decode("utf-8"))
+        assert _conforms(value, SCHEMA)
+        escaped += any(ch in (value.get("name") or "") + ((value.get("meta") or {}).get("tag") or "") for ch in '"\\\n')
+    assert escaped
+
+
+def test_enum_and_nested_object_values(tok, classes):
+    rng = random.Random(3)
+    kinds, metas = set(), 0
+    for _ in range(300):
+        out = _walk(JsonObjectConstraint(SCHEMA, classes, max_tokens=120), tok, rng)
+        value = json.loads(tok.raw(out).decode("utf-8"))
+        kinds.add(value["kind"])
+        metas += isinstance(value["meta"], dict)
+    assert kinds == {"low", "high", None}
+    assert metas
+
+
+def test_function_call_output_is_chat_or_valid_call(tok, classes):
+    tools = [{"name": "todo", "parameters": {"properties": {"name": {"type": "string"}, "age": {"type": "integer"}}}},
+             {"name": "meeting", "parameters": SCHEMA}]
+    rng = random.Random(4)
+    labels = set()
+    for max_tokens in (40, 80, 256) * 60:
+        c = FunctionCallConstraint(tools, classes, max_tokens=max_tokens)
+        text = tok.raw(_walk(c, tok, rng)).decode("utf-8")
+        labels.add(c.label)
+        if c.label == "CHAT":
+            assert text == "CHAT"
+            continue
+        value = json.loads(text)
+        assert value["tool"] == c.label
+        assert json.loads(tok.raw(c.arg_ids).decode("utf-8")) == value["arguments"]  # 기록한 인자 토큰만으로 같은 값
+        assert _conforms(value["arguments"], next(t for t in tools if t["name"] == c.label)["parameters"])
+    assert labels == {"CHAT", "todo", "meeting"}
@@ -0,0 +1,109 @@
+"""
+KV 캐시: 접두/세션 캐시로 이어서 prefill 한 logits 가 처음부터 prefill 한 것과 같은지, 세션 캐시가 바이트 예산에서
+LRU 로 제거되는지, 히스토리 재작성(add_rewrite_listener)이 세션 KV 를 무효화하는지 확인.
+"""
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from capstone_ai.core.batching import GenRequest
+from capstone_ai.core.kv_cache import PrefixCache, SessionKVCache, layers_nbytes
+from capstone_ai.core.llm import LLMClient, _legacy
+from capstone_ai.core.memory import InMemoryHistory
+
+PROMPT = [5, 9, 13, 7, 3, 22, 41, 8, 30, 12, 19, 4, 27, 11, 2, 33, 17, 6, 40, 44, 45, 46]
+
+
+@pytest.fixture(scope="module")
+def client(tiny_model_dir):
+    return LLMClient(model_id=tiny_model_dir, profile="fp32")
+
+
+@pytest.fixture
+def session_cache(client):
+    saved = client.session_cache
+    client.session_cache = SessionKVCache(budget_bytes=64 * 1024 * 1024)
+    yield client.session_cache
+    client.session_cache = saved
+
+
+def _cold_logits(client, ids):
+    return client._prefill_rows([GenRequest(input_ids=list(ids), max_new_tokens=1, do_sample=False)]).logits
+
+
+def _layers(client, ids):
+    with torch.no_grad():
+        out = client.model(input_ids=torch.tensor([ids]), use_cache=True)
+    return _legacy(out.past_key_values)
+
+
+def test_prefix_cached_prefill_matches_cold(client):
+    saved = client.prefix_cache
+    client.prefix_cache = PrefixCache(min_tokens=4)
+    try:
+        client.prefix_cache.put("system", "d1", PROMPT[:16], _layers(client, PROMPT[:16]))
+        state = client.prefill([GenRequest(input_ids=list(PROMPT), max_new_tokens=1, do_sample=False)])
+        assert client.prefix_cache.stats["hits"] == 1 and client.prefix_cache.stats["reused_tokens"] == 16
+        assert torch.allclose(state.logits, _cold_logits(client, PROMPT), atol=1e-5)
+        # 접두가 갈라지는 프롬프트는 공통 부분만 재사용
+        other = PROMPT[:10] + [50, 51, 52, 53, 54]
+        state = client.prefill([GenRequest(input_ids=other, max_new_tokens=1, do_sample=False)])
+        assert client.prefix_cache.stats["reused_tokens"] == 26
+        assert torch.allclose(state.logits, _cold_logits(client, other), atol=1e-5)
+    finally:
+        client.prefix_cache = saved
+
+
+def test_prefix_lookup_prefers_longest_match_and_replaces_by_name():
+    cache = PrefixCache(min_tokens=2)
+    layers = lambda n: ((torch.zeros(1, 1, n, 1), torch.zeros(1, 1, n, 1)),)
+    cache.put("a", "d1", [1, 2, 3], layers(3))
+    cache.put("b", "d1", [1, 2, 3, 4, 5], layers(5))
+    assert cache.lookup([1, 2, 3, 4, 9])[1] == 4
+    assert cache.lookup([1, 2, 3, 4, 5])[1] == 4   # 마지막 토큰은 새로 넣어야 다음 logits 가 나옴
+    assert cache.lookup([7, 8, 9]) is None
+    cache.put("b", "d2", [7, 8, 9, 10], layers(4))  # 같은 이름이면 교체(이전 내용은 더 이상 적중하지 않음)
+    assert cache.lookup([1, 2, 3, 4, 5])[1] == 3
+    assert cache.stats["evictions"] == 1
+
+
+def test_session_cached_next_turn_matches_cold(client, session_cache):
+    first = GenRequest(input_ids=list(PROMPT[:12]), max_new_tokens=6, do_sample=False, session="c1")
+    out = client._run([first])[0]
+    assert session_cache.stats["hits"] == 0
+    turn2 = PROMPT[:12] + out + [50, 51, 52]
+    state = client.prefill([GenRequest(input_ids=turn2, max_new_tokens=1, do_sample=False, session="c1")])
+    assert session_cache.stats["hits"] == 1
+    assert session_cache.stats["reused_tokens"] == 12 + len(out) - 1
+    assert torch.allclose(state.logits, _cold_logits(client, turn2), atol=1e-5)
+
+
+def test_session_cache_evicts_lru_at_byte_budget():
+    layers = lambda n: ((torch.zeros(1, 2, n, 4), torch.zeros(1, 2, n, 4)),)
+    one = layers_nbytes(layers(8))
+    cache = SessionKVCache(budget_bytes=2 * one)
+    cache.store("a", list(range(8)), layers(8))
+    cache.store("b", list(range(8)), layers(8))
+    assert cache.used_bytes == 2 * one
+    assert cache.lookup("a", list(range(9))) is not None  # a 를 최근 사용으로
+    cache.store("c", list(range(8)), layers(8))
+    assert cache.lookup("b", list(range(9))) is None      # 가장 오래 쓰지 않은 b 가 제거
+    assert cache.lookup("a", list(range(9))) is not None and cache.lookup("c", list(range(9))) is not None
+    assert cache.used_bytes == 2 * one and cache.stats["evictions"] == 1
+    cache.store("a", list(range(4)), layers(4))            # 같은 세션을 다시 저장하면 이전 크기를 빼고 계산
+    assert cache.used_bytes == one + one // 2
+    cache.store("huge", list(range(24)), layers(24))       # 예산보다 큰 항목은 저장하지 않음(다른 세션도 유지)
+    assert cache.lookup("huge", list(range(25))) is None and cache.used_bytes == one + one // 2
+
+
+def test_history_rewrite_invalidates_session_kv(client, session_cache):
+    memory = InMemoryHistory()
+    memory.add_rewrite_listener(client.invalidate_session)
+    memory.append_chat("c2", "user", "안녕하세요")
+    layers = ((torch.zeros(1, 2, 4, 4), torch.zeros(1, 2, 4, 4)),)
+    session_cache.store("c2", [1, 2, 3, 4], layers)
+    memory.append_chat("c2", "assistant", "네")            # 뒤에 덧붙이기만 하면 유지
+    assert session_cache.lookup("c2", [1, 2, 3, 4, 5]) is not None
+    memory.ensure_context("c2", {"projectId": 7})           # 앞쪽 [CONTEXT] 삽입 → 무효화
+    assert session_cache.lookup("c2", [1, 2, 3, 4, 5]) is None
+    assert session_cache.stats["invalidations"] == 1 and session_cache.used_bytes == 0
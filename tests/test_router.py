@@ -0,0 +1,91 @@
+"""
+LLM 라우터: 기본은 생성 방식, score 는 선택이며 확신도가 낮으면 CHAT 이 아니라 생성 방식으로 다시 판정.
+LLMClient.score_labels 는 토큰당 평균 로그확률이라 여러 토큰 도구명이 한 토큰 라벨보다 불리하지 않음.
+"""
+import math
+
+import pytest
+
+from capstone_ai.core import router as router_mod
+from capstone_ai.core.router import AutoRouter
+from capstone_ai.mcp.catalog import ToolCatalog
+
+TOOLS = [{"name": "todo_create", "description": "할 일 생성", "parameters": {"type": "object", "properties": {}}}]
+
+
+class FakeRouteLLM:
+    def __init__(self, generated="todo_create", scored=("CHAT", 0.9)):
+        self.generated, self.scored = generated, scored
+        self.calls = []
+
+    def register_prefix(self, *args, **kwargs):
+        pass
+
+    def complete(self, messages, **kwargs):
+        self.calls.append("complete")
+        return self.generated
+
+    def score_labels(self, messages, labels):
+        self.calls.append("score")
+        label, p = self.scored
+        return [(label, p)] + [(l, (1 - p) / (len(labels) - 1)) for l in labels if l != label]
+
+
+def _router(llm):
+    return AutoRouter(llm, ToolCatalog(TOOLS), fast_path=False)
+
+
+def test_default_mode_generates():
+    assert router_mod.ROUTER_MODE == "generate"
+    llm = FakeRouteLLM()
+    assert _router(llm).decide("할 일 추가해줘") == "todo_create"
+    assert llm.calls == ["complete"]
+
+
+def test_score_mode_uses_confident_label(monkeypatch):
+    monkeypatch.setattr(router_mod, "ROUTER_MODE", "score")
+    llm = FakeRouteLLM(scored=("todo_create", 0.9))
+    assert _router(llm).decide("할 일 추가해줘") == "todo_create"
+    assert llm.calls == ["score"]
+
+
+def test_score_mode_low_confidence_falls_back_to_generate(monkeypatch):
+    monkeypatch.setattr(router_mod, "ROUTER_MODE", "score")
+    llm = FakeRouteLLM(generated="todo_create", scored=("CHAT", 0.4))
+    assert _router(llm).decide("할 일 추가해줘") == "todo_create"
+    assert llm.calls == ["score", "complete"]
+
+
+def _bigram_logits(torch, vocab):
+    """직전 토큰별 다음 토큰 분포: 프롬프트 끝(t3) 뒤 t5 0.30 / t10 0.35, t10 → t11 0.8, t11 → t12 0.8."""
+    probs = torch.full((vocab, vocab), 1.0)
+    for prev, nxt in {3: {5: 0.30, 10: 0.35}, 10: {11: 0.8}, 11: {12: 0.8}}.items():
+        rest = (1 - sum(nxt.values())) / (vocab - len(nxt))
+        probs[prev] = rest
+        for tok, p in nxt.items():
+            probs[prev, tok] = p
+    return probs.log()
+
+
+def test_score_labels_is_length_normalized(tiny_model_dir, monkeypatch):
+    torch = pytest.importorskip("torch")
+    from capstone_ai.core.llm import LLMClient
+
+    client = LLMClient(model_id=tiny_model_dir, profile="fp32")
+    table = _bigram_logits(torch, client.model.config.vocab_size)
+    forward = client.model.forward
+
+    def bigram(*args, **kwargs):
+        out = forward(*args, **kwargs)
+        out.logits = table[kwargs["input_ids"]]
+        return out
+
+    monkeypatch.setattr(client.model, "forward", bigram)
+    assert client._label_ids([{"role": "user", "content": "t7 t8"}], ["t5", "t10 t11 t12"]) == [[5], [10, 11, 12]]
+    ranked = client.score_labels([{"role": "user", "content": "t7 t8"}], ["t5", "t10 t11 t12"])
+    # 합계로는 t5(log 0.30) > t10 t11 t12(log 0.35 + 2·log 0.8), 토큰당 평균으로는 도구명이 앞섬
+    assert math.log(0.30) > math.log(0.35) + 2 * math.log(0.8)
+    assert ranked[0][0] == "t10 t11 t12"
+    mean = (math.log(0.35) + 2 * math.log(0.8)) / 3
+    expected = math.exp(mean) / (math.exp(mean) + 0.30)
+    assert ranked[0][1] == pytest.approx(expected, rel=1e-4)
@@ -0,0 +1,120 @@
+"""
+SQLite 세션 저장소(tmp 경로): 버전 CAS 충돌, 히스토리 _mutate 의 충돌 후 재적용, 워커 간 임대 만료/회수, TTL 정리.
+"""
+import threading
+import time
+
+import pytest
+
+from capstone_ai.core.memory import STORE_NS, InMemoryHistory
+from capstone_ai.core.session_store import SQLiteSessionStore, VersionConflict
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """같은 파일을 여는 저장소 둘(워커 두 개)."""
+    path = str(tmp_path / "sessions.db")
+    a, b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_stale_version_conflicts(stores):
+    a, b = stores
+    assert a.save("ns", "c", {"n": 1}, 0) == 1
+    with pytest.raises(VersionConflict):
+        b.save("ns", "c", {"n": 0}, 0)  # 새 키를 둘 다 만들려고 함
+    assert b.save("ns", "c", {"n": 2}, 1) == 2
+    with pytest.raises(VersionConflict):
+        a.save("ns", "c", {"n": 3}, 1)  # a 는 아직 버전 1 을 기준으로 씀
+    assert a.load("ns", "c") == (2, {"n": 2})
+    assert a.stats["conflicts"] == 1 and b.stats["conflicts"] == 1
+
+
+def test_concurrent_saves_exactly_one_wins(stores):
+    a, b = stores
+    a.save("ns", "c", {"n": 0}, 0)
+    results = []
+
+    def save(store, n):
+        try:
+            results.append(store.save("ns", "c", {"n": n}, 1))
+        except VersionConflict:
+            results.append("conflict")
+
+    threads = [threading.Thread(target=save, args=(s, i)) for i, s in enumerate([a, b, a, b])]
+    [t.start() for t in threads]
+    [t.join(10) for t in threads]
+    assert sorted(results, key=str) == [2, "conflict", "conflict", "conflict"]
+
+
+def test_history_retries_after_conflict(stores):
+    a, b = stores
+    first, second = InMemoryHistory(store=a), InMemoryHistory(store=b)
+    first.append_chat("c", "user", "안녕하세요")
+    assert second.get_chat("c")[-1]["content"] == "안녕하세요"
+
+    save = b.save
+    raced = []
+
+    def racing_save(*args, **kwargs):
+        # second 가 읽은 뒤 저장하기 직전에 first 가 먼저 씀 → second 의 저장은 충돌, 다시 읽고 변경을 재적용
+        if not raced:
+            raced.append(True)
+            first.append_chat("c", "assistant", "무엇을 도와드릴까요?")
+        return save(*args, **kwargs)
+
+    b.save = racing_save
+    second.append_chat("c", "user", "회의록 만들어줘")
+    assert second.stats()["store_conflicts"] == 1
+    contents = [m["content"] for m in first.get_chat("c")[1:]]
+    assert contents == ["안녕하세요", "무엇을 도와드릴까요?", "회의록 만들어줘"]
+    assert a.load(STORE_NS, "c")[0] == 3
+
+
+def test_lease_expires_and_can_be_taken_over(stores):
+    a, b = stores
+    assert a.try_lease("turn:1", "w1", 0.2)
+    assert not b.try_lease("turn:1", "w2", 10)
+    assert a.try_lease("turn:1", "w1", 0.2)  # 같은 owner 는 연장
+    time.sleep(0.3)
+    assert b.try_lease("turn:1", "w2", 10)  # 만료된 임대는 다른 워커가 회수
+    a.release_lease("turn:1", "w1")  # 이미 뺏긴 임대를 풀어도 새 owner 의 임대는 유지
+    assert not a.try_lease("turn:1", "w3", 10)
+    b.release_lease("turn:1", "w2")
+    assert a.try_lease("turn:1", "w3", 10)
+
+
+def test_prune_removes_idle_sessions_and_expired_leases(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_s=0.2)
+    try:
+        store.save("ns", "old", {"n": 1}, 0)
+        store.try_lease("turn:old", "w1", 0.1)
+        time.sleep(0.3)
+        store.save("ns", "new", {"n": 1}, 0)
+        assert store.prune() == 1
+        assert store.version("ns", "old") is None and store.load("ns", "old") is None
+        assert store.load("ns", "new") == (1, {"n": 1})
+        rows = store._reader().execute("SELECT key FROM leases").fetchall()
+        assert rows == []
+        assert store.save("ns", "old", {"n": 2}, 0) == 1  # 정리된 키는 새 키로 다시 저장
+    finally:
+        store.close()
+
+
+def test_close_commits_queued_writes_and_rejects_later_ones(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, batch_window_ms=500)
+    threads = [threading.Thread(target=store.save, args=("ns", f"c{i}", {"n": i}, 0)) for i in range(5)]
+    [t.start() for t in threads]
+    time.sleep(0.05)  # 쓰기가 모두 대기열에 들어가고 writer 는 아직 배치 창(500ms) 안
+    store.close()  # 대기열에 남은 쓰기를 커밋한 뒤 종료
+    [t.join(10) for t in threads]
+    with pytest.raises(RuntimeError):
+        store.save("ns", "late", {"n": 0}, 0)
+    reopened = SQLiteSessionStore(path)
+    try:
+        assert [reopened.load("ns", f"c{i}") for i in range(5)] == [(1, {"n": i}) for i in range(5)]
+    finally:
+        reopened.close()
@@ -0,0 +1,89 @@
+"""
+추측 디코딩: greedy 출력이 일반 greedy(model.generate)와 토큰 단위로 같은지(ngram/draft), 거절된 초안의 KV 가
+잘려 대상·초안 모델 KV 길이가 확정 토큰 수와 맞는지 확인.
+"""
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from capstone_ai.core.batching import GenRequest
+from capstone_ai.core.llm import LLMClient
+from capstone_ai.core.speculative import DraftModelDrafter, NgramDrafter, crop_cache
+
+# 반복이 있어야 n-gram 초안이 나옴
+PROMPTS = [[5, 9, 13, 5, 9, 13, 5, 9], [7, 3, 22, 41, 8, 7, 3, 22], [11, 2, 33, 17, 6], [40]]
+
+
+@pytest.fixture(scope="module")
+def client(tiny_model_dir):
+    return LLMClient(model_id=tiny_model_dir, profile="fp32")
+
+
+def _reference(client, prompt, n):
+    ids = torch.tensor([prompt])
+    out = client.model.generate(ids, attention_mask=torch.ones_like(ids), max_new_tokens=n, do_sample=False, pad_token_id=0)
+    return out[0, len(prompt):].tolist()
+
+
+def _speculate(client, prompt, n, drafter):
+    return client._speculate(GenRequest(input_ids=list(prompt), max_new_tokens=n, do_sample=False), drafter)
+
+
+class _Recording:
+    """초안기 감싸기: 라운드마다 accept(n_valid) 뒤의 초안 KV 길이를 기록."""
+
+    def __init__(self, drafter):
+        self.drafter, self.name = drafter, drafter.name
+        self.proposed, self.kv = 0, []
+
+    def propose(self, ids, k):
+        out = self.drafter.propose(ids, k)
+        self.proposed += len(out)
+        return out
+
+    def accept(self, n_valid):
+        self.drafter.accept(n_valid)
+        past = getattr(self.drafter, "past", None)
+        if past is not None:
+            self.kv.append((n_valid, self.drafter.n, past[0][0].shape[2]))
+
+
+def _draft_model(tiny_model_dir, seed):
+    if seed is None:
+        return transformers.LlamaForCausalLM.from_pretrained(tiny_model_dir).eval()
+    torch.manual_seed(seed)
+    config = transformers.LlamaConfig.from_pretrained(tiny_model_dir)
+    return transformers.LlamaForCausalLM(config).eval()
+
+
+def test_ngram_greedy_matches_plain_greedy(client):
+    drafted = 0
+    for prompt in PROMPTS:
+        expected = _reference(client, prompt, 16)
+        drafter = _Recording(NgramDrafter(max_ngram=3, min_ngram=1))
+        assert _speculate(client, prompt, 16, drafter) == expected
+        drafted += drafter.proposed
+    assert drafted > 0
+
+
+# seed None: 대상 모델과 같은 가중치(초안이 모두 수락), seed 1: 다른 가중치(대부분 거절 → KV 자르기)
+@pytest.mark.parametrize("seed", [None, 1])
+def test_draft_model_greedy_matches_plain_greedy(client, tiny_model_dir, seed):
+    draft = _draft_model(tiny_model_dir, seed)
+    vocab = client.model.config.vocab_size
+    for prompt in PROMPTS:
+        expected = _reference(client, prompt, 12)
+        drafter = _Recording(DraftModelDrafter(draft, vocab))
+        assert _speculate(client, prompt, 12, drafter) == expected
+        assert drafter.proposed > 0
+        for n_valid, n, kv_len in drafter.kv:
+            # accept 후 초안 KV 는 확정 토큰 수를 넘지 않고, 기록한 길이와 실제 텐서 길이가 같음
+            assert n <= n_valid and n == kv_len
+
+
+def test_crop_cache_keeps_prefix():
+    layers = tuple((torch.arange(2 * 6, dtype=torch.float).view(1, 2, 6, 1), torch.zeros(1, 2, 6, 1)) for _ in range(2))
+    cropped = crop_cache(layers, 4)
+    assert cropped[0][0].shape[2] == 4
+    assert torch.equal(cropped[1][0], layers[1][0][:, :, :4, :])
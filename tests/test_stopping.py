@@ -0,0 +1,61 @@
+"""중단 조건: 출력 맨 앞의 중단 문자열은 무시, 스트리밍에는 중단 지점 뒤(중단 문자열 조각 포함)를 내보내지 않음."""
+from capstone_ai.core.stopping import JsonObjectEnd, Newline, SentenceEnd, StopChecker, StopStrings
+
+STOPS = ["\n제목:", "\n[원문 대화]"]
+
+
+def _stream(chunks, conditions=None):
+    checker = StopChecker(conditions or [StopStrings(STOPS)])
+    out, stopped = [], False
+    for i, delta in enumerate(chunks):
+        stopped = checker.feed(delta)
+        out.append(checker.release(stopped or i == len(chunks) - 1))
+        if stopped:
+            break
+    return stopped, "".join(out)
+
+
+def test_leading_stop_string_does_not_stop():
+    stopped, text = _stream(["\n", "제목", ":", " 주간 회의", "\n", "내용"])
+    assert not stopped
+    assert text == "\n제목: 주간 회의\n내용"
+    assert StopStrings(STOPS).trim("\n제목: 회의\n본문\n제목: 반복") == "\n제목: 회의\n본문"
+
+
+def test_stream_holds_back_partial_stop_string():
+    stopped, text = _stream(["요약", "\n[", "원문", " 대화]", "뒤"])
+    assert stopped
+    assert text == "요약"
+
+
+def test_held_tail_is_released_when_it_is_not_a_stop():
+    checker = StopChecker([StopStrings(STOPS)])
+    checker.feed("요약")
+    assert checker.release(False) == "요약"
+    checker.feed("\n제")
+    assert checker.release(False) == ""
+    checker.feed("안")
+    assert checker.release(False) == "\n제안"
+
+
+def test_stream_cuts_at_sentence_end_inside_delta():
+    checker = StopChecker([SentenceEnd()])
+    stopped, text = _stream(["안녕하세요", ". 다음"], [SentenceEnd()])
+    assert stopped
+    assert text == "안녕하세요." == checker.trim("안녕하세요. 다음")
+
+
+def test_stream_cuts_at_newline_inside_delta():
+    stopped, text = _stream(["  첫 줄\n둘째"], [Newline()])
+    assert stopped
+    assert text.strip() == "첫 줄" == Newline().trim("  첫 줄\n둘째")
+
+
+def test_stream_cuts_at_earliest_condition():
+    conditions = [StopStrings(["\n제목:"]), SentenceEnd()]
+    stopped, text = _stream(["요약입니다", ". 끝\n제목: x"], conditions)
+    assert stopped
+    assert text == "요약입니다."
+    stopped, text = _stream(['{"a": "b.c"}', " 뒤"], [JsonObjectEnd(), StopStrings(["뒤"])])
+    assert stopped
+    assert text == '{"a": "b.c"}'
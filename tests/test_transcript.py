@@ -0,0 +1,23 @@
+"""대화 정리 규칙: 자모만 쓴 답변은 내용으로 남기고, 시스템 메시지는 종류 필드나 줄 전체가 안내 문장일 때만 제거."""
+from capstone_ai.service.transcript import TranscriptPreprocessor, Utterance
+
+
+def _kept(utterances):
+    pre = TranscriptPreprocessor(count_tokens=len)
+    return [text for _, text in pre.process(utterances)]
+
+
+def test_jamo_only_replies_are_content():
+    kept = _kept([Utterance(None, "a", "ㅇㅇ"), Utterance(None, "b", "ㄴㄴ"), Utterance(None, "c", "ㅇㅋ"), Utterance(None, "d", "👍")])
+    assert [t.split(": ")[-1].strip() for t in kept] == ["ㅇㅇ", "ㄴㄴ", "ㅇㅋ"]
+
+
+def test_system_messages_need_type_or_whole_line():
+    kept = _kept([
+        Utterance(None, "", "민수님이 들어왔습니다.", "SYSTEM"),
+        Utterance(None, "", "영희님이 나갔습니다."),
+        Utterance(None, "", "민수님이 들어왔으면 해요"),
+        Utterance(None, "철수", "저 나갔습니다"),
+        Utterance(None, "철수", "영희님이 입장했습니다", "TEXT"),
+    ])
+    assert [t.strip() for t in kept] == ["민수님이 들어왔으면 해요", "철수: 저 나갔습니다", "영희님이 입장했습니다"]